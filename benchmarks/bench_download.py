@@ -0,0 +1,118 @@
+"""Benchmark: download throughput of Collection.download
+
+A local HTTP server (in another process) serves a file of the given
+size. It is downloaded with the old loop (1 KB blocks and a progress
+bar update per block) and with Collection.download. The speed (MB/s)
+and the CPU time used by the client are shown
+
+Usage:
+  python benchmarks/bench_download.py [size in MB] [repetitions]
+"""
+
+import sys
+import time
+import tempfile
+import multiprocessing
+from pathlib import Path
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+import requests
+from tqdm import tqdm
+
+from icm.commons import commons
+
+PORT = 8771
+
+
+def serve(size: int) -> None:
+    """Serve a file of the given size (bytes) in any url"""
+
+    data = bytes(range(256)) * (size // 256)
+
+    class Handler(BaseHTTPRequestHandler):
+        """Send the data"""
+
+        protocol_version = "HTTP/1.1"
+
+        def do_GET(self):  # pylint: disable=invalid-name
+            """Answer all the requests with the data"""
+            self.send_response(200)
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, *args):  # pylint: disable=arguments-differ
+            """No logs"""
+
+    ThreadingHTTPServer(("127.0.0.1", PORT), Handler).serve_forever()
+
+
+def download_old(url: str, destfile: Path) -> None:
+    """Download loop used before: 1 KB blocks"""
+
+    response = requests.get(url, stream=True, timeout=10)
+    total_size = int(response.headers.get("content-length", 0))
+
+    with open(destfile, "wb") as file:
+        with tqdm(
+            total=total_size, unit="B", unit_scale=True, desc="• Download"
+        ) as pbar:
+            for chunk in response.iter_content(chunk_size=1024):
+                if chunk:
+                    file.write(chunk)
+                    pbar.update(len(chunk))
+
+
+def download_new(url: str, destfile: Path) -> None:
+    """Current download loop"""
+
+    collection = commons.Collection(commons.Folders())
+    collection.download(url, destfile)
+
+
+def measure(function, url: str, destfile: Path, repetitions: int) -> tuple:
+    """Return the best (wall time, cpu time) of the given download"""
+
+    results = []
+    for _ in range(repetitions):
+        wall, cpu = time.perf_counter(), time.process_time()
+        function(url, destfile)
+        results.append((time.perf_counter() - wall, time.process_time() - cpu))
+    return min(results)
+
+
+def main() -> None:
+    """Run the benchmark"""
+
+    size_mb = int(sys.argv[1]) if len(sys.argv) > 1 else 64
+    repetitions = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+    size = size_mb * 1024 * 1024
+
+    server = multiprocessing.Process(target=serve, args=(size,), daemon=True)
+    server.start()
+    time.sleep(0.5)
+
+    url = f"http://127.0.0.1:{PORT}/collection.zip"
+
+    try:
+        with tempfile.TemporaryDirectory() as folder:
+            destfile = Path(folder) / "collection.zip"
+            results = [
+                (name, measure(function, url, destfile, repetitions))
+                for name, function in (
+                    ("before (1 KB blocks)", download_old),
+                    ("after (readinto)", download_new),
+                )
+            ]
+    finally:
+        server.terminate()
+
+    print()
+    print(f"Download of {size_mb} MB (best of {repetitions})")
+    print(f"{'Loop':<22} {'MB/s':>8} {'Wall (s)':>9} {'CPU (s)':>8}")
+    for name, (wall, cpu) in results:
+        print(f"{name:<22} {size_mb / wall:>8.1f} {wall:>9.3f} {cpu:>8.3f}")
+
+
+if __name__ == "__main__":
+    main()
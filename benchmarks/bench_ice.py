@@ -0,0 +1,185 @@
+"""Benchmark: throughput of the .ice text extraction (MB/s)
+
+A big synthetic example project is created: a design with all its
+dependencies embedded (as Icestudio saves them), with verilog code,
+images and texts in spanish. Its texts are extracted with the old
+whole-file regular expressions and with the current scanner, and both
+results are compared (same texts in the same order)
+
+Usage:
+  python benchmarks/bench_ice.py [dependencies] [repetitions]
+"""
+
+import re
+import sys
+import json
+import time
+import random
+import tempfile
+from pathlib import Path
+
+from icm.commons.ice import read_texts
+
+# -- Regular expressions used before
+PATTERN_DESC = re.compile(r'"description":\s*"(.*?)"')
+PATTERN_INFO = re.compile(r'"info":\s*"(.*?)",[\n|\s]*"readonly": true')
+
+# -- Blocks in the design of every dependency
+BLOCKS = 40
+
+# -- Verilog code of the code blocks
+CODE = (
+    "// -- Registro de {n} bits con habilitación\n"
+    "reg [{n}:0] q = INI;\n"
+    "always @(posedge clk)\n"
+    "  if (rst)\n"
+    "    q <= INI;  // -- Inicialización\n"
+    "  else if (ena)\n"
+    "    q <= d;\n"
+) * 6
+
+# -- Image of the blocks (svg, url encoded)
+IMAGE = (
+    "%3Csvg%20xmlns=%22http://www.w3.org/2000/svg%22%20viewBox=%220%200"
+    "%20100%2050%22%3E%3Cpath%20d=%22M10%2010h80v30H10z%22%20fill=%22"
+    "none%22%20stroke=%22#00f%22/%3E%3C/svg%3E"
+) * 25
+
+
+def block(number: int, rand: random.Random) -> dict:
+    """Return a block of a design: code, info or input"""
+
+    ident = f"{rand.getrandbits(128):032x}"
+    position = {"x": rand.randrange(1000), "y": rand.randrange(1000)}
+    if number % 8 == 0:
+        return {
+            "id": ident,
+            "type": "basic.info",
+            "data": {
+                "info": f"Información del bloque {number}: señal de reloj",
+                "readonly": number % 16 == 0,
+            },
+            "position": position,
+            "size": {"width": 320, "height": 64},
+        }
+    if number % 4 == 0:
+        return {
+            "id": ident,
+            "type": "basic.code",
+            "data": {
+                "code": CODE.format(n=number),
+                "params": [{"name": "INI"}],
+                "ports": {
+                    "in": [{"name": "clk"}, {"name": "d", "range": "[7:0]"}],
+                    "out": [{"name": "q", "range": "[7:0]"}],
+                },
+            },
+            "position": position,
+            "size": {"width": 512, "height": 384},
+        }
+    return {
+        "id": ident,
+        "type": "basic.input",
+        "data": {"name": f"e{number}", "clock": False},
+        "position": position,
+    }
+
+
+def design(rand: random.Random) -> dict:
+    """Return the design of a block: its blocks and wires"""
+
+    blocks = [block(number, rand) for number in range(BLOCKS)]
+    wires = [
+        {
+            "source": {"block": source["id"], "port": "out"},
+            "target": {"block": target["id"], "port": "in"},
+            "vertices": [{"x": 10, "y": 20}],
+        }
+        for source, target in zip(blocks, blocks[1:])
+    ]
+    return {"graph": {"blocks": blocks, "wires": wires}}
+
+
+def ice_project(dependencies: int) -> dict:
+    """Return an example project with its dependencies embedded"""
+
+    rand = random.Random(1)
+    return {
+        "version": "1.2",
+        "package": {
+            "name": "Ejemplo",
+            "version": "0.1.0",
+            "description": "Ejemplo con todas sus dependencias",
+            "author": "Obijuan",
+            "image": IMAGE,
+        },
+        "design": design(rand),
+        "dependencies": {
+            f"{rand.getrandbits(160):040x}": {
+                "package": {
+                    "name": f"Bloque {i}",
+                    "version": "0.1",
+                    "description": f"Descripción del bloque {i} (señal)",
+                    "author": "Juan González",
+                    "image": IMAGE,
+                },
+                "design": design(rand),
+            }
+            for i in range(dependencies)
+        },
+    }
+
+
+def read_texts_old(filepath: Path) -> list:
+    """Extraction used before: regular expressions on the whole file"""
+
+    with open(filepath, "r", encoding="utf-8") as file:
+        project = file.read()
+    descriptions = PATTERN_DESC.findall(project)
+    infos = PATTERN_INFO.findall(project)
+    return [text for text in descriptions + infos if text]
+
+
+def measure(function, filepath: Path, repetitions: int) -> tuple:
+    """Return the best (time, texts) of the extraction"""
+
+    times = []
+    for _ in range(repetitions):
+        start = time.perf_counter()
+        texts = function(filepath)
+        times.append(time.perf_counter() - start)
+    return min(times), texts
+
+
+def main() -> None:
+    """Run the benchmark"""
+
+    dependencies = int(sys.argv[1]) if len(sys.argv) > 1 else 300
+    repetitions = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+
+    with tempfile.TemporaryDirectory() as folder:
+        filepath = Path(folder) / "example.ice"
+
+        # -- Saved as Icestudio does: indented, utf-8 characters
+        with open(filepath, "w", encoding="utf-8") as file:
+            json.dump(
+                ice_project(dependencies), file, indent=2, ensure_ascii=False
+            )
+        size = filepath.stat().st_size / 1e6
+
+        old, old_texts = measure(read_texts_old, filepath, repetitions)
+        new, new_texts = measure(read_texts, filepath, repetitions)
+
+    same = old_texts == new_texts
+
+    print()
+    print(f"Project of {size:.1f} MB: {len(new_texts)} texts")
+    print(f"{'Extraction':<22} {'Time (s)':>9} {'MB/s':>8}")
+    print(f"{'before (regex)':<22} {old:>9.3f} {size / old:>8.0f}")
+    print(f"{'after (scanner)':<22} {new:>9.3f} {size / new:>8.0f}")
+    print(f"Same texts and order: {same}")
+    sys.exit(0 if same else 1)
+
+
+if __name__ == "__main__":
+    main()
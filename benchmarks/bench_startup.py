@@ -0,0 +1,126 @@
+"""Benchmark: cold-start time of the icm commands
+
+Every command is run in a new python process with -X importtime, in
+an empty HOME. The best wall time and the time spent importing
+modules (after the interpreter startup) are shown, with the heavy
+dependencies imported (if any)
+
+The commands that do not use the network should not import them: if
+they do, or if their import time is over the budget, the benchmark
+fails (exit code 1)
+
+Usage:
+  python benchmarks/bench_startup.py [repetitions] [budget in ms]
+"""
+
+import os
+import sys
+import time
+import tempfile
+import subprocess
+from pathlib import Path
+
+# -- Modules that only the network commands (install, lsgit...) and
+# -- the collection development commands (create, update...) need
+HEAVY = ("requests", "tqdm", "polib", "semantic_version")
+
+# -- Commands that should start without the heavy modules
+LIGHT = (
+    ["--version"],
+    ["--help"],
+    ["ls"],
+    ["ls", "--json"],
+    ["du"],
+    ["search", "and"],
+    ["cache", "ls"],
+    ["info"],
+    ["install", "--help"],
+    ["lsgit", "--help"],
+    ["lock", "--help"],
+    ["index", "build", "--help"],
+)
+
+# -- The rest: they are measured, but not checked
+OTHERS = (["validate"],)
+
+# -- Run icm from the sources
+RUN = "import sys; from icm.__main__ import cli; cli(sys.argv[1:])"
+SOURCES = str(Path(__file__).resolve().parent.parent)
+
+
+def run(args: list, home: str) -> tuple:
+    """Run icm with the given arguments
+    Return the (wall time, import time, heavy modules imported)
+    """
+
+    env = dict(os.environ, HOME=home, PYTHONPATH=SOURCES)
+    wall = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", RUN, *args],
+        cwd=home,
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+        text=True,
+        check=False,
+    )
+    wall = time.perf_counter() - wall
+
+    # -- Lines: "import time: self [us] | cumulative | imported package"
+    # -- The modules imported by the interpreter startup (site) are
+    # -- not counted: they do not depend on icm
+    imports = 0
+    modules = set()
+    startup = True
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        fields = line.split("|")
+        if not startup:
+            imports += int(fields[0].split(":")[1])
+        startup = startup and fields[2] != " site"
+        modules.add(fields[2].strip())
+
+    return wall, imports / 1e6, [name for name in HEAVY if name in modules]
+
+
+def measure(args: list, home: str, repetitions: int) -> tuple:
+    """Return the best (wall time, import time) and the heavy modules"""
+
+    # -- First run: it creates the inventory, the caches...
+    run(args, home)
+
+    results = [run(args, home) for _ in range(repetitions)]
+    wall = min(result[0] for result in results)
+    imports = min(result[1] for result in results)
+    return wall, imports, results[0][2]
+
+
+def main() -> None:
+    """Run the benchmark"""
+
+    repetitions = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    budget = float(sys.argv[2]) if len(sys.argv) > 2 else 120
+
+    failed = []
+    print(f"Cold start (best of {repetitions}, budget {budget:.0f} ms)")
+    print(f"{'Command':<22} {'Wall (ms)':>10} {'Imports (ms)':>13}  Heavy")
+
+    with tempfile.TemporaryDirectory() as home:
+        for args in LIGHT + OTHERS:
+            wall, imports, heavy = measure(args, home, repetitions)
+            print(
+                f"{' '.join(args):<22} {wall * 1000:>10.1f} "
+                f"{imports * 1000:>13.1f}  {' '.join(heavy)}"
+            )
+            if args in LIGHT and (heavy or imports * 1000 > budget):
+                failed.append(" ".join(args))
+
+    if failed:
+        print()
+        print(f"Too slow: {', '.join(failed)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+"""Benchmark: extraction of the texts to translate (icm update)
+
+A synthetic collection is created with the given number of .ice
+files. Every file has its own texts and some texts shared with other
+files, and the folders reuse some file names. The texts are extracted
+with the old list based loop and with the current one, and both
+results are compared (same texts in the same order). The current
+one is also run with several processes reading the files (1, 2,
+4... up to the given jobs)
+
+Usage:
+  python benchmarks/bench_update.py [files] [texts per file] [jobs]
+"""
+
+import os
+import sys
+import time
+import json
+import tempfile
+from pathlib import Path
+
+from icm.commands import cmd_update
+from icm.commons.collection import walk
+from icm.commons.ice import read_texts
+
+# -- Number of files per folder
+FILES_PER_FOLDER = 50
+
+# -- Texts repeated in many files (Ex. the description of a common
+# -- dependency)
+SHARED = [f"Shared block {i}" for i in range(20)]
+
+
+def ice_project(name: str, texts: list) -> dict:
+    """Return an Icestudio project with the given texts: half of them
+    as descriptions of its dependencies and half as info blocks
+    """
+
+    half = len(texts) // 2
+    return {
+        "version": "1.2",
+        "package": {"name": name, "description": f"{name} block"},
+        "design": {
+            "graph": {
+                "blocks": [
+                    {
+                        "id": f"info{i}",
+                        "type": "basic.info",
+                        "data": {"info": text, "readonly": True},
+                    }
+                    for i, text in enumerate(texts[half:])
+                ],
+                "wires": [],
+            }
+        },
+        "dependencies": {
+            f"dep{i}": {"package": {"name": f"dep{i}", "description": text}}
+            for i, text in enumerate(texts[:half])
+        },
+    }
+
+
+def make_collection(folder: Path, files: int, texts: int) -> None:
+    """Create a synthetic collection (blocks folder) in the folder"""
+
+    for i in range(files):
+        subfolder = folder / "blocks" / f"Group{i // FILES_PER_FOLDER}"
+        subfolder.mkdir(parents=True, exist_ok=True)
+        own = [f"Text {j} of block {i}" for j in range(texts)]
+        shared = [text for j, text in enumerate(SHARED) if j % 3 == i % 3]
+        project = ice_project(f"block{i}", own + shared)
+
+        # -- The same file names in every folder (the names are repeated)
+        name = f"block{i % FILES_PER_FOLDER}.ice"
+        with open(subfolder / name, "w", encoding="utf-8") as file:
+            json.dump(project, file, indent=2)
+
+
+def find_texts_old(path: str, translations: list) -> None:
+    """Extraction loop used before: list with a linear search"""
+
+    for root, dirs, files in sorted(os.walk(path)):
+        for directory in sorted(dirs):
+            if directory != "ice-build":
+                translations.append(directory)
+        for file in sorted(files):
+            if root.find("ice-build") == -1 and file.endswith(".ice"):
+                translations.append(os.path.splitext(file)[0])
+                for text in read_texts(os.path.join(root, file)):
+                    if text not in translations:
+                        translations.append(text)
+
+
+def find_texts_new(path: str, translations: list, jobs: int) -> None:
+    """Current extraction: the tree is walked first (collection model)"""
+
+    cmd_update._find_texts(  # pylint: disable=W0212
+        walk(path), translations, jobs=jobs
+    )
+
+
+def measure(function, translations, **kwargs) -> tuple:
+    """Return the (time, texts) of the extraction"""
+
+    start = time.perf_counter()
+    function(cmd_update.BLOCKS_FOLDER, translations, **kwargs)
+    return time.perf_counter() - start, list(translations)
+
+
+def main() -> None:
+    """Run the benchmark"""
+
+    files = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    texts = int(sys.argv[2]) if len(sys.argv) > 2 else 16
+    jobs = int(sys.argv[3]) if len(sys.argv) > 3 else os.cpu_count() or 1
+
+    # -- Number of processes: 1, 2, 4... and jobs
+    counts = sorted({2**i for i in range(jobs.bit_length())} | {jobs})
+
+    with tempfile.TemporaryDirectory() as folder:
+        make_collection(Path(folder), files, texts)
+        os.chdir(folder)
+
+        old, old_texts = measure(find_texts_old, [])
+        new = {
+            count: measure(find_texts_new, [], jobs=count) for count in counts
+        }
+
+    # -- All the processes counts should give the same texts as before
+    same = all(texts == old_texts for _, texts in new.values())
+
+    print()
+    print(f"Texts of {files} files: {len(old_texts)} texts")
+    print(f"{'Loop':<22} {'Time (s)':>9}")
+    print(f"{'before (list)':<22} {old:>9.3f}")
+    for count, (elapsed, _) in new.items():
+        label = f"after (jobs={count})"
+        print(f"{label:<22} {elapsed:>9.3f}")
+    print(f"Same texts and order: {same}")
+
+    if not same:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
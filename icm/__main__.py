@@ -8,16 +8,19 @@
 
 import click
 
-from icm.commands import (
-    cmd_create,
-    cmd_validate,
-    cmd_update,
-    cmd_info,
-    cmd_install,
-    cmd_ls,
-    cmd_rm,
-    cmd_list,
+# -- The command modules (and their dependencies: requests, tqdm...)
+# -- are imported by every command when it is run, not here. The
+# -- command line (help, completion...) only needs this module
+# pylint: disable=import-outside-toplevel
+
+from icm.commands import defaults
+from icm.commons.complete import (
+    complete_coltag,
+    complete_installed,
+    complete_name,
 )
+from icm.commons.dedup import METHODS
+from icm.commons.metadata import DEFAULT_TTL
 
 
 @click.group()
@@ -29,63 +32,415 @@ def cli():
 @cli.command()
 def create():
     """Create a collection structure."""
+    from icm.commands import cmd_create
+
     cmd_create.create()
 
 
 @cli.command()
-def update():
+@click.option(
+    "-j",
+    "--jobs",
+    type=click.IntRange(min=1),
+    default=defaults.UPDATE_JOBS,
+    show_default=True,
+    help="Number of processes reading the .ice files",
+)
+@click.option(
+    "-w",
+    "--watch",
+    is_flag=True,
+    help="Keep watching the collection and update it when it changes",
+)
+@click.option(
+    "--write",
+    type=click.Choice(defaults.UPDATE_WRITE),
+    help="Replace the files with changes: ask (default), "
+    "always (default with --watch) or never",
+)
+def update(jobs, watch, write):
     """Update docs and translation."""
-    cmd_update.update()
+    from icm.commands import cmd_update
+
+    cmd_update.update(jobs, write, watch)
 
 
 @cli.command()
 def validate():
     """Validate a collection."""
+    from icm.commands import cmd_validate
+
     cmd_validate.validate()
 
 
 @cli.command()
 def info():
     """Show system information"""
+    from icm.commands import cmd_info
+
     cmd_info.main()
 
 
 @cli.command()
-@click.argument("coltag", nargs=-1)
+@click.argument("coltag", nargs=-1, shell_complete=complete_coltag)
 @click.option(
     "-d", "--dev", is_flag=True, help="Install latest development version"
 )
 @click.option(
     "-a", "--all", is_flag=True, help="Install all stable collections"
 )
+@click.option(
+    "-j",
+    "--jobs",
+    type=click.IntRange(min=1),
+    default=1,
+    show_default=True,
+    help="Number of collections installed in parallel",
+)
+@click.option(
+    "--stream/--no-stream",
+    default=True,
+    show_default=True,
+    help="Uncompress the collections while they are downloaded",
+)
+@click.option(
+    "--cache/--no-cache",
+    default=True,
+    show_default=True,
+    help="Use the local cache of downloaded collections",
+)
+@click.option(
+    "--dedup",
+    is_flag=True,
+    help="Hard link the identical files of the installed collections",
+)
+@click.option(
+    "--offline",
+    is_flag=True,
+    help="Do not download anything. Use only the cached information",
+)
+@click.option(
+    "--ttl",
+    type=click.FloatRange(min=0),
+    default=DEFAULT_TTL,
+    show_default=True,
+    help="Seconds the cached package.json files are valid",
+)
 # def install(coltag, dev, all):
 def install(**kwargs):
     """Install collections"""
 
+    from icm.commands import cmd_install
+
     coltag = kwargs["coltag"]
     dev = kwargs["dev"]
     all_ = kwargs["all"]
+    options = cmd_install.Options(
+        jobs=kwargs["jobs"],
+        stream=kwargs["stream"],
+        cache=kwargs["cache"],
+        dedup=kwargs["dedup"],
+        offline=kwargs["offline"],
+        ttl=kwargs["ttl"],
+    )
+
+    cmd_install.main(coltag, dev, all_, options)
+
+
+@cli.command()
+@click.argument("name", nargs=-1, shell_complete=complete_name)
+def upgrade(name):
+    """Upgrade development collections (only the changed files)"""
+
+    from icm.commands import cmd_upgrade
+
+    cmd_upgrade.main(name)
+
 
-    cmd_install.main(coltag, dev, all_)
+@cli.command()
+@click.argument("name", nargs=-1, shell_complete=complete_name)
+@click.option(
+    "-m",
+    "--method",
+    type=click.Choice(METHODS),
+    default="auto",
+    show_default=True,
+    help="How the identical files are linked",
+)
+@click.option(
+    "-n", "--dry-run", is_flag=True, help="Only show the space to reclaim"
+)
+def dedup(name, method, dry_run):
+    """Link the identical files of the installed collections"""
+
+    from icm.commands import cmd_dedup
+
+    cmd_dedup.main(name, method, dry_run)
 
 
 @cli.command()
-def ls():
+@click.argument("coltag", nargs=-1, shell_complete=complete_coltag)
+@click.option(
+    "-r",
+    "--requirements",
+    type=click.Path(exists=True, dir_okay=False),
+    help="File with the collections to lock (one per line)",
+)
+@click.option(
+    "-d", "--dev", is_flag=True, help="Lock the development versions"
+)
+@click.option(
+    "-o",
+    "--output",
+    default=defaults.LOCK_FILE,
+    show_default=True,
+    help="Lock file to write",
+)
+@click.option(
+    "-j",
+    "--jobs",
+    type=click.IntRange(min=1),
+    default=defaults.LOCK_JOBS,
+    show_default=True,
+    help="Number of collections resolved in parallel",
+)
+def lock(**kwargs):
+    """Resolve collections into a lock file (exact versions)"""
+
+    from icm.commands import cmd_lock
+
+    cmd_lock.lock(
+        kwargs["coltag"],
+        kwargs["requirements"],
+        kwargs["dev"],
+        kwargs["output"],
+        kwargs["jobs"],
+    )
+
+
+@cli.command()
+@click.argument("lock_file", default=defaults.LOCK_FILE)
+@click.option(
+    "-j",
+    "--jobs",
+    type=click.IntRange(min=1),
+    default=defaults.LOCK_JOBS,
+    show_default=True,
+    help="Number of collections installed in parallel",
+)
+def sync(lock_file, jobs):
+    """Install exactly the collections of a lock file"""
+
+    from icm.commands import cmd_lock
+
+    cmd_lock.sync(lock_file, jobs)
+
+
+@cli.command()
+@click.option(
+    "-l", "--long", is_flag=True, help="Show all the collection information"
+)
+@click.option("--json", "json_", is_flag=True, help="Print in JSON format")
+@click.option(
+    "--rescan",
+    is_flag=True,
+    help="Rebuild the inventory from the collections folder",
+)
+def ls(long, json_, rescan):
     """List installed collections"""
 
-    cmd_ls.main()
+    from icm.commands import cmd_ls
+
+    cmd_ls.main(long, json_, rescan)
+
+
+@cli.command()
+@click.argument("name", nargs=-1, shell_complete=complete_name)
+@click.option(
+    "-t",
+    "--top",
+    type=click.IntRange(min=0),
+    default=defaults.DU_TOP,
+    show_default=True,
+    help="Number of largest subfolders shown per collection",
+)
+@click.option(
+    "--cache/--no-cache",
+    default=True,
+    show_default=True,
+    help="Reuse the contents of the unchanged folders",
+)
+def du(**kwargs):
+    """Show the disk usage of the installed collections"""
+
+    from icm.commands import cmd_du
+
+    cmd_du.main(kwargs["name"], kwargs["top"], kwargs["cache"])
 
 
 @cli.command()
-@click.argument("collection", nargs=-1)
+@click.argument("terms", nargs=-1, required=True)
+@click.option(
+    "-n",
+    "--limit",
+    type=click.IntRange(min=0),
+    default=defaults.SEARCH_LIMIT,
+    show_default=True,
+    help="Maximum number of results (0: all)",
+)
+@click.option(
+    "--update/--no-update",
+    default=True,
+    show_default=True,
+    help="Update the index with the changed files before searching",
+)
+def search(**kwargs):
+    """Search blocks and examples in the installed collections"""
+
+    from icm.commands import cmd_search
+
+    cmd_search.main(kwargs["terms"], kwargs["limit"], kwargs["update"])
+
+
+@cli.command()
+@click.argument("collection", nargs=-1, shell_complete=complete_installed)
 @click.option("-y", "--yes", is_flag=True, help="Respond yes automatically")
-def rm(collection, yes):
+@click.option(
+    "-a",
+    "--all-versions",
+    is_flag=True,
+    help="Remove all the versions of the given collections",
+)
+@click.option(
+    "--wait",
+    is_flag=True,
+    help="Delete the files before returning (not in the background)",
+)
+def rm(collection, yes, all_versions, wait):
     """Remove colections"""
 
-    cmd_rm.main(collection, yes)
+    from icm.commands import cmd_rm
+
+    cmd_rm.main(collection, yes, all_versions, wait)
 
 
 @cli.command()
-def lsgit():
+@click.option(
+    "--offline",
+    is_flag=True,
+    help="Do not download anything. Use only the cached information",
+)
+@click.option(
+    "--ttl",
+    type=click.FloatRange(min=0),
+    default=DEFAULT_TTL,
+    show_default=True,
+    help="Seconds the cached package.json files are valid",
+)
+@click.option(
+    "-j",
+    "--jobs",
+    type=click.IntRange(min=1),
+    default=defaults.LIST_JOBS,
+    show_default=True,
+    help="Number of collections queried in parallel",
+)
+@click.option(
+    "--deadline",
+    type=click.FloatRange(min=0),
+    default=defaults.LIST_DEADLINE,
+    show_default=True,
+    help="Seconds to wait for all the collections",
+)
+@click.option(
+    "--index/--no-index",
+    default=True,
+    show_default=True,
+    help="Read the collections from the index (if built)",
+)
+def lsgit(**kwargs):
     """List available collections in github"""
-    cmd_list.main()
+    from icm.commands import cmd_list
+
+    cmd_list.main(
+        kwargs["offline"],
+        kwargs["ttl"],
+        kwargs["jobs"],
+        kwargs["deadline"],
+        kwargs["index"],
+    )
+
+
+@cli.group()
+def index():
+    """Manage the index of the collections in the store"""
+
+
+@index.command("build")
+@click.option(
+    "-j",
+    "--jobs",
+    type=click.IntRange(min=1),
+    default=defaults.INDEX_JOBS,
+    show_default=True,
+    help="Number of collections processed in parallel",
+)
+def index_build(jobs):
+    """Build the index of the collections from scratch"""
+    from icm.commands import cmd_index
+
+    cmd_index.build(jobs)
+
+
+@index.command("update")
+@click.option(
+    "-j",
+    "--jobs",
+    type=click.IntRange(min=1),
+    default=defaults.INDEX_JOBS,
+    show_default=True,
+    help="Number of collections processed in parallel",
+)
+def index_update(jobs):
+    """Refresh the index (only the changed collections)"""
+    from icm.commands import cmd_index
+
+    cmd_index.update(jobs)
+
+
+@cli.command()
+def outdated():
+    """List the installed collections with newer versions"""
+    from icm.commands import cmd_index
+
+    cmd_index.outdated()
+
+
+@cli.group()
+def cache():
+    """Manage the cache of downloaded collections"""
+
+
+@cache.command("ls")
+def cache_ls():
+    """List the cached collections"""
+    from icm.commands import cmd_cache
+
+    cmd_cache.ls()
+
+
+@cache.command("clean")
+@click.argument("name", nargs=-1)
+def cache_clean(name):
+    """Remove collections from the cache (all if no names given)"""
+    from icm.commands import cmd_cache
+
+    cmd_cache.clean(name)
+
+
+@cache.command("stats")
+def cache_stats():
+    """Show the cache statistics"""
+    from icm.commands import cmd_cache
+
+    cmd_cache.stats()
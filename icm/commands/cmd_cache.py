@@ -0,0 +1,99 @@
+"""Manage the local cache of downloaded collections"""
+
+import datetime
+
+import click
+from icm.commons import context
+from icm.commons.cache import ArchiveCache
+from icm.commons.metadata import MetadataCache
+
+
+def get_cache(folders: context.Folders) -> ArchiveCache:
+    """Return the archives cache"""
+    return ArchiveCache(folders.archives)
+
+
+def human_size(size: float) -> str:
+    """Return the given size in bytes as a human readable string
+    Ex. 1536 --> "1.5 KB"
+    """
+
+    for unit in ("B", "KB", "MB", "GB"):
+        if size < 1024:
+            break
+        size /= 1024
+    else:
+        unit = "TB"
+
+    return f"{size:.0f} {unit}" if unit == "B" else f"{size:.1f} {unit}"
+
+
+def ls() -> None:
+    """ENTRY POINT: List the archives in the cache"""
+
+    # -- Get context information
+    ctx = context.Context()
+    folders = context.Folders()
+    cache = get_cache(folders)
+
+    # -- Header
+    print()
+    click.secho(ctx.line, fg="blue")
+    click.secho("CACHED COLLECTIONS", fg="blue")
+    click.secho(ctx.line, fg="blue")
+
+    entries = cache.entries()
+
+    if not entries:
+        print("No cached collections")
+        return
+
+    for entry in entries:
+        used = datetime.datetime.fromtimestamp(entry.used)
+        click.secho(
+            f"• {entry.key:<35} {human_size(entry.size):>9}  "
+            f"{used:%Y-%m-%d %H:%M}",
+            fg="blue",
+        )
+
+
+def clean(names: tuple) -> None:
+    """ENTRY POINT: Remove archives from the cache
+    * names: Collection names. If empty, all the cache is removed
+    """
+
+    folders = context.Folders()
+    cache = get_cache(folders)
+
+    freed = cache.clean(names)
+
+    # -- Cleaning all the cache: the package.json files too
+    if not names:
+        MetadataCache(folders.metadata).clean()
+    click.secho(f"Cache cleaned: {human_size(freed)} freed", fg="green")
+
+
+def stats() -> None:
+    """ENTRY POINT: Show the cache statistics"""
+
+    # -- Get context information
+    ctx = context.Context()
+    folders = context.Folders()
+    cache = get_cache(folders)
+
+    info = cache.stats()
+
+    # -- Header
+    print()
+    click.secho(ctx.line, fg="yellow")
+    click.secho("CACHE STATISTICS", fg="yellow")
+    click.secho(ctx.line, fg="yellow")
+
+    click.echo(click.style("• Folder: ", fg="yellow") + f"{cache.folder}")
+    click.echo(click.style("• Entries: ", fg="yellow") + f"{info['entries']}")
+    click.echo(
+        click.style("• Size: ", fg="yellow")
+        + f"{human_size(info['size'])} / {human_size(info['max_size'])}"
+    )
+    click.echo(click.style("• Hits: ", fg="yellow") + f"{info['hits']}")
+    click.echo(click.style("• Misses: ", fg="yellow") + f"{info['misses']}")
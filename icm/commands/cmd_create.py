@@ -21,6 +21,8 @@ import os
 from string import Template
 import click
 
+from icm.commons.textcache import CACHE_FILE
+
 
 def create():
     """Create a collection structure."""
@@ -86,8 +88,8 @@ def create():
         "README.md", "## MyCollection\nUpdate this file using `icm update`"
     )
 
-    # Create .gitignore file
-    _create_file(".gitignore", "*.mo")
+    # Create .gitignore file. The cache of icm update is not included
+    _create_file(".gitignore", f"*.mo\n{CACHE_FILE}\n")
 
 
 def _create_directory(name):
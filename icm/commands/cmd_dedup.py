@@ -0,0 +1,74 @@
+"""Deduplicate the files of the installed collections"""
+
+import sys
+
+import click
+from icm.commons import context
+from icm.commons import dedup as dedup_files
+from icm.commands.cmd_cache import human_size
+
+
+def main(names: tuple, method: str = "auto", dry_run: bool = False) -> None:
+    """ENTRY POINT: Replace the identical files of the installed
+    collections by links
+    * names: Collection names (Ex. (iceK, iceIO)). If empty, all the
+      installed collections are deduplicated
+    * method: "auto", "hardlink" or "reflink"
+    * dry_run: Only report the space that would be freed
+    """
+
+    folders = context.Folders()
+
+    print()
+    dedup(folders, names, method, dry_run)
+
+
+def dedup(
+    folders: context.Folders,
+    names: tuple = (),
+    method: str = "auto",
+    dry_run: bool = False,
+) -> dedup_files.DedupResult:
+    """Deduplicate the installed collections and print the report
+    * folders: Icestudio folders (context)
+    * names: Collection names. All the versions of every collection are
+      included (Ex. iceK --> iceK-0.1.4, iceK-main...). If empty, all
+    * method: "auto", "hardlink" or "reflink"
+    * dry_run: Only report, do not change anything
+    """
+
+    installed = collection_folders(folders, names)
+
+    click.secho(
+        f"Deduplicating {len(installed)} installed collections", fg="yellow"
+    )
+
+    try:
+        result = dedup_files.dedup(installed, method, context.JOBS, dry_run)
+    except OSError as exc:
+        click.secho(f"Error: {exc}", fg="red")
+        sys.exit(1)
+
+    action = "Would link" if dry_run else "Linked"
+    click.secho(
+        f"  {action} {result.linked} of {result.files} files: "
+        f"{human_size(result.reclaimed)} reclaimed",
+        fg="green",
+    )
+    return result
+
+
+def collection_folders(folders: context.Folders, names: tuple) -> list:
+    """Return the folders of the installed collections with the given
+    names (all the installed collections if no names are given)
+    """
+
+    return [
+        folder
+        for folder in folders.installed()
+        if not names
+        or any(
+            folder.name == name or folder.name.startswith(f"{name}-")
+            for name in names
+        )
+    ]
@@ -0,0 +1,66 @@
+"""Disk usage of the installed collections"""
+
+import click
+from icm.commons import context
+from icm.commons.usage import Totals, UsageCache, disk_usage
+from icm.commands import defaults
+from icm.commands.cmd_cache import human_size
+from icm.commands.cmd_dedup import collection_folders
+
+# -- Number of largest subfolders shown for every collection
+TOP = defaults.DU_TOP
+
+
+def main(names: tuple, top: int = TOP, cache: bool = True) -> None:
+    """ENTRY POINT: Show the disk usage of the installed collections
+    * names: Collection names (Ex. (iceK, iceIO)). If empty, all the
+      installed collections
+    * top: Number of largest subfolders shown for every collection
+    * cache: Use the cache of the folder contents
+    """
+
+    # -- Get context information
+    ctx = context.Context()
+    folders = context.Folders()
+
+    usages = disk_usage(
+        collection_folders(folders, names),
+        UsageCache(folders.usage) if cache else None,
+        context.JOBS,
+    )
+
+    # -- Header
+    print()
+    click.secho(ctx.line, fg="blue")
+    click.secho("DISK USAGE", fg="blue")
+    click.secho(ctx.line, fg="blue")
+
+    if not usages:
+        print("No installed collections")
+        return
+
+    click.secho(
+        f"  {'Collection':<25} {'Size':>9} {'Files':>7} {'.ice':>6} "
+        f"{'ice-build':>10}",
+        fg="blue",
+    )
+
+    total = Totals()
+    for usage in usages:
+        print_usage(usage.nametag, usage.totals)
+        for name, size in usage.subfolders[:top]:
+            click.echo(f"    {name + '/':<23} {human_size(size):>9}")
+        total += usage.totals
+
+    print()
+    print_usage("TOTAL", total)
+
+
+def print_usage(label: str, totals: Totals) -> None:
+    """Print one line of the disk usage report"""
+
+    click.secho(
+        f"• {label:<25} {human_size(totals.size):>9} {totals.files:>7} "
+        f"{totals.ice:>6} {human_size(totals.build_size):>10}",
+        fg="blue",
+    )
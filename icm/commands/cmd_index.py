@@ -0,0 +1,206 @@
+"""Catalog (index) of the collections in the store"""
+
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import click
+import semantic_version
+from icm.commons import commons
+from icm.commons import store
+from icm.commons.cache import ArchiveCache
+from icm.commons.catalog import Catalog, CatalogEntry
+from icm.commons.context import split_nametag
+from icm.commons.metadata import MetadataCache
+from icm.commands import cmd_install, defaults
+from icm.commands.cmd_cache import human_size
+
+# -- Number of collections refreshed at the same time
+JOBS = defaults.INDEX_JOBS
+
+
+def build(jobs: int = JOBS) -> None:
+    """ENTRY POINT: Build the catalog from scratch
+    * jobs: Number of collections processed at the same time
+    """
+    refresh(jobs, full=True)
+
+
+def update(jobs: int = JOBS) -> None:
+    """ENTRY POINT: Refresh the catalog. Only the collections that have
+    changed are downloaded again
+    * jobs: Number of collections processed at the same time
+    """
+    refresh(jobs, full=False)
+
+
+def refresh(jobs: int, full: bool) -> None:
+    """Build or update the catalog
+    The package.json of every collection is revalidated with the server
+    (If-None-Match). The archives are stored in the archives cache, so
+    their sizes and digests are known (and they are ready for installing)
+    * jobs: Number of collections processed at the same time
+    * full: Ignore the current catalog entries
+    """
+
+    # -- Get context information
+    ctx = commons.Context()
+    folders = commons.Folders()
+    catalog = Catalog(folders.catalog)
+    collection = index_collection(folders, jobs)
+
+    # -- Header
+    print()
+    click.secho(ctx.line, fg="yellow")
+    click.secho("BUILDING INDEX" if full else "UPDATING INDEX", fg="yellow")
+    click.secho(ctx.line, fg="yellow")
+
+    current = {} if full else catalog.entries
+    names = [
+        (kind, name)
+        for kind in ("stable", "dev")
+        for name in store.COLLECTIONS[kind]
+    ]
+
+    entries = []
+    with ThreadPoolExecutor(max_workers=jobs) as pool:
+        results = pool.map(
+            lambda item: refresh_entry(
+                collection, *item, current.get(item[1])
+            ),
+            names,
+        )
+
+        # -- Print the collections in order, as they are refreshed
+        for (_, name), (entry, status) in zip(names, results):
+            print_entry(name, entry, status)
+            if entry:
+                entries.append(entry)
+
+    catalog.save(entries)
+    click.secho(f"Index: {catalog.path} ({len(entries)} collections)")
+
+
+def print_entry(name: str, entry: CatalogEntry, status: str) -> None:
+    """Print a collection of the catalog and its refresh status"""
+
+    color = {"error": "red", "unchanged": "white"}.get(status, "green")
+    version = entry.version if entry else "xxx"
+    size = human_size(entry.size) if entry and entry.size else "-"
+    click.secho(f"• {name:<20} {version:<8} {size:>9}  {status}", fg=color)
+
+
+def index_collection(folders: commons.Folders, jobs: int):
+    """Return the Collection (context) used for refreshing the catalog
+    The package.json files are always revalidated with the server, and
+    the archives are kept in the cache
+    """
+
+    collection = commons.Collection(
+        folders,
+        progress=False,
+        cache=ArchiveCache(folders.archives),
+        metadata=MetadataCache(folders.metadata, ttl=0),
+    )
+
+    # -- Allow one connection per job to the same host
+    if collection.transport.per_host < jobs:
+        collection.transport.configure(per_host=jobs)
+
+    return collection
+
+
+def refresh_entry(
+    collection: commons.Collection, kind: str, name: str, entry=None
+) -> tuple:
+    """Refresh the catalog entry of the given collection
+    * collection: Collection class (Context)
+    * kind: "stable" or "dev"
+    * name: Collection name (Ex. iceK)
+    * entry: Current catalog entry (or None)
+    Return the new entry (the current one if there was an error) and
+    its status: "new", "updated", "unchanged" or "error"
+    """
+
+    package = collection.download_package(collection.package_url(name))
+    if not package:
+        return entry, "error"
+
+    # -- The dev collections are downloaded from their main branch
+    version = package["version"] if kind == "stable" else ""
+    url = collection.url(name, version)
+
+    # -- Stable archives never change: no need for downloading them again
+    if (
+        entry
+        and kind == "stable"
+        and entry.version == package["version"]
+        and entry.digest
+    ):
+        return entry, "unchanged"
+
+    # -- Get the archive (it is downloaded only if it has changed)
+    try:
+        cmd_install.cached_archive(collection, name, version)
+        cached = collection.cache.lookup(name, collection.ref(version))
+        size, digest = cached.size, cached.digest
+    except commons.DownloadError:
+        size, digest = 0, ""
+
+    new = CatalogEntry(
+        name,
+        kind,
+        package["version"],
+        package.get("description", ""),
+        url,
+        size,
+        digest,
+        time.time(),
+    )
+
+    if not entry:
+        return new, "new"
+
+    if (entry.version, entry.digest) == (new.version, new.digest):
+        return new, "unchanged"
+
+    return new, "updated"
+
+
+def outdated() -> None:
+    """ENTRY POINT: List the installed collections with newer versions
+    in the catalog
+    """
+
+    # -- Get context information
+    ctx = commons.Context()
+    folders = commons.Folders()
+    catalog = Catalog(folders.catalog)
+
+    if not catalog.exists():
+        click.secho("No index found. Run 'icm index build' first", fg="red")
+        sys.exit(1)
+
+    # -- Header
+    print()
+    click.secho(ctx.line, fg="blue")
+    click.secho("OUTDATED COLLECTIONS", fg="blue")
+    click.secho(ctx.line, fg="blue")
+
+    # -- Latest installed version of every collection
+    installed = {}
+    for folder in folders.installed():
+        name, version = split_nametag(folder.name)
+        if version:
+            version = semantic_version.Version.coerce(version)
+            installed[name] = max(installed.get(name, version), version)
+
+    found = False
+    for name, version in sorted(installed.items()):
+        entry = catalog.get(name)
+        if entry and semantic_version.Version.coerce(entry.version) > version:
+            found = True
+            click.secho(f"• {name:<20} {version} --> {entry.version}")
+
+    if not found:
+        print("All the collections are up to date")
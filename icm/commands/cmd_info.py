@@ -10,10 +10,10 @@
 
 import platform
 import click
-from icm.commons import commons
+from icm.commons import context
 
 
-def print_system_info(ctx: commons.Context) -> None:
+def print_system_info(ctx: context.Context) -> None:
     """Print System information"""
 
     # -- Header
@@ -32,7 +32,7 @@ def print_system_info(ctx: commons.Context) -> None:
     click.echo(click.style("• Version: ", fg="green") + f"{plat.version}")
 
 
-def print_folders_info(ctx: commons.Context, folders: commons.Folders) -> None:
+def print_folders_info(ctx: context.Context, folders: context.Folders) -> None:
     """Print Sytem folders info"""
 
     # -- Header
@@ -65,8 +65,8 @@ def main():
     """ENTRY POINT: Show system information"""
 
     # -- Get context information
-    ctx = commons.Context()
-    folders = commons.Folders()
+    ctx = context.Context()
+    folders = context.Folders()
 
     # --------------------------------
     # -- Print System information
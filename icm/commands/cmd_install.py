@@ -2,36 +2,304 @@
 
 import os
 import sys
+import sqlite3
+import zipfile
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+from typing import NamedTuple
 
 import click
+import requests
+from tqdm import tqdm
+
 from icm.commons import commons
 from icm.commons import store
+from icm.commons import transport
+from icm.commons.cache import ArchiveCache, entry_key
+from icm.commons.catalog import Catalog
+from icm.commons.inventory import Inventory, from_archive, scan
+from icm.commons.metadata import DEFAULT_TTL, MetadataCache
+from icm.commands import cmd_dedup
+
+
+class InstallResult(NamedTuple):
+    """Result of installing one collection in the parallel mode
+    * coltag: Collection tag as given by the user (Ex. iceK@0.1.4)
+    * nametag: Collection name+tag installed (Ex. iceK-0.1.4)
+    * status: "installed", "exists" or "error"
+    * message: Extra information (the error message)
+    """
+
+    coltag: str
+    nametag: str
+    status: str
+    message: str = ""
+
+
+# -- Errors that make a collection installation fail
+INSTALL_ERRORS = (
+    commons.DownloadError,
+    requests.RequestException,
+    zipfile.BadZipFile,
+    OSError,
+    sqlite3.Error,
+)
+
+
+class Options(NamedTuple):
+    """Install options
+    * jobs: Number of collections installed at the same time
+    * stream: Uncompress the collections while they are downloaded
+    * cache: Use the local cache of downloaded archives
+    * dedup: Link the identical files of the installed collections
+    * offline: Do not download anything. Use only the caches
+    * ttl: Time (seconds) the cached package.json files are valid
+    """
 
+    jobs: int = 1
+    stream: bool = True
+    cache: bool = True
+    dedup: bool = False
+    offline: bool = False
+    ttl: float = DEFAULT_TTL
 
-def main(coltags: tuple, dev: bool = False, all_: bool = False) -> None:
+
+def main(
+    coltags: tuple,
+    dev: bool = False,
+    all_: bool = False,
+    options: Options = Options(),
+) -> None:
     """ENTRY POINT: Install collections
     * coltag: tupla de nombres de la coleccion + tag opcional
       Ex. (iceK, iceK@0.1.4)
     * dev: Install development version
     * all: Install ALL stable collections
+    * options: Other install options (jobs, stream, cache, dedup...)
     """
 
     # -- Get context information
     folders = commons.Folders()
-    collection = commons.Collection(folders)
+    cache = ArchiveCache(folders.archives)
+    collection = commons.Collection(
+        folders,
+        stream=options.stream,
+        cache=cache if options.cache else None,
+        metadata=MetadataCache(folders.metadata, options.ttl),
+    )
+    collection.offline = options.offline
 
     print()
 
     # -- "--all" has the highest priority
     # -- First check it!
     if all_:
-        for coltag in store.COLLECTIONS["stable"]:
-            install_collection(collection, coltag, dev)
-        return
+        coltags = store.COLLECTIONS["stable"]
+
+    # -- Parallel mode: Only if there are more than one collection
+    if options.jobs > 1 and len(coltags) > 1:
+        install_parallel(collection, coltags, dev, options.jobs)
 
     # -- Install the collections!
+    else:
+        for coltag in coltags:
+            install_collection(collection, coltag, dev)
+
+    # -- Share the files that are the same in different versions
+    if options.dedup:
+        print()
+        cmd_dedup.dedup(folders)
+
+
+def install_parallel(
+    collection: commons.Collection, coltags: tuple, dev: bool, jobs: int
+) -> None:
+    """Install several collections at the same time
+    * collection: Collection class (context)
+    * coltags: Collection names + optional tags (Ex. (iceK, iceIO@0.1.2))
+    * dev: Install the development versions
+    * jobs: Maximum number of collections installed at the same time
+
+    A single progress bar is shown while installing. When all the
+    collections are done, a summary is printed in the same order
+    as the collections were given
+    """
+
+    # -- Remove the duplicated collections (keeping the order)
+    coltags = list(dict.fromkeys(coltags))
+
+    # -- Check all the collection tags before installing anything
     for coltag in coltags:
-        install_collection(collection, coltag, dev)
+        if not collection.parse_coltag(coltag):
+            print(f"---> coleccion incorrecta! ({coltag})")
+            sys.exit(1)
+
+    # -- The same collection can be given in several ways (Ex. iceK and
+    # -- iceK@0.1.4, if it is the latest version). It is installed only
+    # -- once: by its name+tag
+    targets = resolve_all(collection, coltags, dev, jobs)
+    nametags = {}
+    for name, version, _ in targets.values():
+        if version is not None:
+            nametags.setdefault(
+                collection.nametag(name, version), (name, version)
+            )
+
+    click.secho(
+        f"Installing {len(nametags)} collections ({jobs} jobs)", fg="yellow"
+    )
+
+    installed = run_parallel(
+        collection,
+        jobs,
+        lambda nametag: install_job(collection, *nametags[nametag]),
+        list(nametags),
+    )
+
+    # -- Results by collection tag (as given by the user)
+    results = {}
+    for coltag, (name, version, message) in targets.items():
+        if version is None:
+            results[coltag] = InstallResult(coltag, name, "error", message)
+        else:
+            nametag = collection.nametag(name, version)
+            results[coltag] = installed[nametag]._replace(coltag=coltag)
+
+    # -- Some collections could not be installed
+    if not print_summary(coltags, results):
+        sys.exit(1)
+
+
+def resolve_all(
+    collection: commons.Collection, coltags: list, dev: bool, jobs: int
+) -> dict:
+    """Return the (name, version, message) of every collection tag,
+    resolved at the same time (the package.json files could be
+    downloaded). The version is None if it could not be known, and the
+    message tells why
+    """
+
+    def resolve(coltag: str) -> tuple:
+        try:
+            name, version = resolve_version(collection, coltag, dev)
+            return name, version, "No package.json downloaded"
+
+        # -- An unexpected error (Ex. not valid package.json) only
+        # -- affects to this collection
+        except Exception as exc:  # pylint: disable=W0718
+            name = collection.parse_coltag(coltag)["name"]
+            return name, None, f"{type(exc).__name__}: {exc}"
+
+    with ThreadPoolExecutor(max_workers=jobs) as pool:
+        return dict(zip(coltags, pool.map(resolve, coltags)))
+
+
+def run_parallel(  # pylint: disable=too-many-arguments
+    collection: commons.Collection, jobs: int, job, items: list, label=str
+) -> dict:
+    """Run the given install job for all the items at the same time
+    * collection: Collection class (context)
+    * jobs: Maximum number of items processed at the same time
+    * job: Function called for every item. It returns an InstallResult
+    * items: Items to process (Ex. collection tags)
+    * label: Function that returns the name of an item, for the
+      errors not handled by the job
+    Return the InstallResults by item
+
+    A single progress bar is shown while installing
+    """
+
+    # -- Allow at least one connection per job to the same host
+    shared = transport.get_transport()
+    if shared.per_host < jobs:
+        shared.configure(per_host=jobs)
+
+    # -- No progress bars for every collection. Only the global one
+    collection.progress = False
+
+    # -- The collections are already installed in parallel: uncompress
+    # -- every one with only one thread
+    collection.unzip_jobs = 1
+
+    # -- Results of the installation, by item
+    results = {}
+
+    # -- Launch the installations
+    with ThreadPoolExecutor(max_workers=jobs) as pool:
+        futures = {pool.submit(job, item): item for item in items}
+
+        # -- Global progress bar: one step per collection
+        with tqdm(total=len(futures), desc="• Install", unit="col") as pbar:
+            for future in as_completed(futures):
+                item = futures[future]
+
+                # -- An unexpected error in one job (Ex. a package.json
+                # -- without version) does not stop the others
+                try:
+                    result = future.result()
+                except Exception as exc:  # pylint: disable=W0718
+                    result = InstallResult(
+                        label(item),
+                        label(item),
+                        "error",
+                        f"{type(exc).__name__}: {exc}",
+                    )
+
+                results[item] = result
+                pbar.set_postfix_str(result.nametag)
+                pbar.update(1)
+
+    return results
+
+
+def print_summary(items: list, results: dict) -> bool:
+    """Print the results of a parallel installation, in the same order
+    as the items were given
+    Return False if some collection could not be installed
+    """
+
+    print()
+    ok = True
+    for item in items:
+        result = results[item]
+        if result.status == "installed":
+            click.secho(f"• {result.nametag:<25} Done!", fg="green")
+        elif result.status == "exists":
+            click.secho(f"• {result.nametag:<25} Already exists", fg="yellow")
+        else:
+            ok = False
+            click.secho(f"• {result.nametag:<25} {result.message}", fg="red")
+
+    return ok
+
+
+def install_job(
+    collection: commons.Collection, name: str, version=""
+) -> InstallResult:
+    """Install one collection without printing anything. It is the
+    task executed by the parallel installer
+    * collection: Collection class (context)
+    * Name: Collection name (ex. 'iceK')
+    * Version: (Optional) (ex. '0.1.4'). "" for the dev version
+    Returns the InstallResult
+    """
+
+    # -- Get the name+tag
+    nametag = collection.nametag(name, version)
+    coltag = f"{name}@{version}" if version else name
+
+    # -- Check if that collection already exists!
+    if (collection.folders.collections / nametag).exists():
+        return InstallResult(coltag, nametag, "exists")
+
+    # -- Download and uncompress it
+    try:
+        members = fetch(collection, name, version)
+        register(collection, name, version, members)
+    except INSTALL_ERRORS as exc:
+        return InstallResult(coltag, nametag, "error", str(exc))
+
+    return InstallResult(coltag, nametag, "installed")
 
 
 def install_collection(
@@ -85,11 +353,8 @@ def install_collection(
 
     # -- Case 3: Only collection name given
 
-    # Calculate the url for the collection package.json file
-    url = collection.package_url(name)
-
-    # -- Download the package.json
-    package = collection.download_package(url)
+    # -- Get the package.json (from the catalog or downloaded)
+    package = latest_package(collection, name)
 
     # -- Get the latest version
     if package:
@@ -100,7 +365,52 @@ def install_collection(
     else:
         click.secho(f"Collection: {name}", fg="red")
         click.secho("No package.json downloaded", fg="red")
-        click.secho(f"URL: {url}", fg="red")
+        click.secho(f"URL: {collection.package_url(name)}", fg="red")
+
+
+def resolve_version(
+    collection: commons.Collection, coltag: str, dev: bool = False
+) -> tuple:
+    """Return the collection name and the version to install
+    * collection: Collection class (context)
+    * coltag: name + optional version tag (Ex. iceK, iceK@0.1.4)
+    * dev: Development flag. The version is "" (main branch)
+    If only the name is given, the version is the latest stable one
+    (None if it could not be known)
+    """
+
+    parsed = collection.parse_coltag(coltag)
+    name, version = (parsed["name"], parsed["version"])
+
+    # -- Dev versions have the highest priority
+    if dev:
+        return name, ""
+
+    # -- Only the name given: Get the latest stable version
+    if not version:
+        package = latest_package(collection, name)
+        version = package.get("version") if package else None
+
+    return name, version
+
+
+def latest_package(collection: commons.Collection, name: str) -> dict:
+    """Return the package.json information of the latest version of the
+    given collection (or None if there was an error)
+    The catalog (icm index) is used if the collection is in it, and it
+    is not older than the TTL of the package.json files. If not, the
+    package.json is downloaded (or revalidated)
+    * collection: Collection class (Context)
+    * Name: Collection name (ex. 'iceK')
+    """
+
+    entry = Catalog(collection.folders.catalog).get(
+        name, collection.catalog_age()
+    )
+    if entry:
+        return entry.package
+
+    return collection.download_package(collection.package_url(name))
 
 
 def install(collection: commons.Collection, name: str, version="") -> None:
@@ -126,20 +436,230 @@ def install(collection: commons.Collection, name: str, version="") -> None:
         print("  Collection Already exists!")
         return
 
-    abs_filename = collection.abs_filename(version)
+    # -- Download and uncompress the collection
+    try:
+        members = fetch(collection, name, version)
+        register(collection, name, version, members)
+    except INSTALL_ERRORS as exc:
+        click.secho(str(exc), fg="red")
+        sys.exit(1)
+
+    click.secho("Done!", fg="green")
+
+
+def register(
+    collection: commons.Collection, name: str, version="", members=None
+) -> None:
+    """Add the installed collection to the inventory (or update it)
+    * collection: Collection class (Context)
+    * Name: Collection name (ex. 'iceK')
+    * Version: (Optional) (ex. '0.1.4')
+    * members: ZipInfo of the archive it was extracted from. Its sizes
+      and CRCs are used. The files are only read from disk if not given
+    """
+
+    folder = collection.folders.collections / collection.nametag(name, version)
     url = collection.url(name, version)
 
+    if members is None:
+        installed = scan(folder, name, version or "", url)
+    else:
+        installed = from_archive(
+            members, folder.name, name, version or "", url
+        )
+
+    Inventory(collection.folders.inventory).add(installed)
+
+
+def fetch(collection: commons.Collection, name: str, version="") -> list:
+    """Download the given collection and uncompress it in the
+    icestudio collection folder
+    * collection: Collection class (Context)
+    * Name: Collection name (ex. 'iceK')
+    * Version: (Optional) (ex. '0.1.4')
+    Return the ZipInfo of the members of its archive
+    """
+
+    # -- Offline mode: only the archives in the cache can be installed
+    if collection.offline:
+        return collection.uncompress(
+            offline_archive(collection, name, version)
+        )
+
+    url = collection.url(name, version)
+
+    # -- Use the archives cache
+    if collection.cache:
+        return fetch_cached(collection, name, version)
+
+    # -- Streaming mode: the collection is uncompressed while it
+    # -- is downloaded. No zip file is stored in the collections folder
+    if collection.stream:
+        return collection.download_extract(url).members
+
+    # -- The zip file is prefixed with the collection name, so that
+    # -- several collections can be downloaded at the same time
+    abs_filename = collection.abs_filename(version, name)
+
     # -- DEBUG!
     # print(f"* File: {abs_filename}")
     # print(f"* Url: {url}")
 
     # -- Download the collection
-    collection.download(url, abs_filename)
+    try:
+        collection.download(url, abs_filename)
 
-    # -- Uncompress the collection
-    collection.uncompress(abs_filename)
+        # -- Uncompress the collection
+        return collection.uncompress(abs_filename)
 
     # -- Remove the .zip file
-    os.remove(abs_filename)
+    finally:
+        if abs_filename.exists():
+            os.remove(abs_filename)
 
-    click.secho("Done!", fg="green")
+
+def fetch_cached(
+    collection: commons.Collection, name: str, version=""
+) -> list:
+    """Install the given collection using the archives cache
+    * collection: Collection class (Context). It has the cache
+    * Name: Collection name (ex. 'iceK')
+    * Version: (Optional) (ex. '0.1.4')
+
+    * Stable versions never change. If they are in the cache
+      they are not downloaded again
+    * Dev versions are downloaded only if they have changed in the server
+      (If-None-Match with the cached ETag)
+    Return the ZipInfo of the members of its archive
+    """
+
+    # -- Not streaming: get the archive and uncompress it
+    if not collection.stream:
+        return collection.uncompress(cached_archive(collection, name, version))
+
+    cache = collection.cache
+    url = collection.url(name, version)
+    ref = collection.ref(version)
+
+    # -- Only one process (or thread) downloads the same archive at the
+    # -- same time (they share its .part file). The others wait, and then
+    # -- find it in the cache
+    with cache.download_lock(name, ref):
+        # -- Look for the collection in the cache
+        entry = cache.lookup(name, ref)
+
+        # -- Stable version in the cache: use it
+        if entry and not entry.mutable:
+            cache.hit(entry)
+            return collection.uncompress(cache.path(entry))
+
+        # -- Download the collection (only if it has changed)
+        etag = entry.etag if entry else ""
+        tmpfile = cache.tmpfile(name, ref)
+
+        try:
+            # -- Interrupted download (in a previous execution): resume it
+            # -- from where it stopped, and then uncompress it
+            if commons.part_file(tmpfile).exists():
+                result = collection.download(url, tmpfile, etag)
+                members = (
+                    collection.uncompress(tmpfile) if result.modified else []
+                )
+            else:
+                result = collection.download_extract(
+                    url, etag, archive=tmpfile
+                )
+                members = result.members
+
+            # -- Not changed: use the cached version
+            if not result.modified:
+                cache.hit(entry)
+                return collection.uncompress(cache.path(entry))
+
+            # -- Store the new archive in the cache
+            cache.store(name, ref, url, tmpfile, result.etag)
+            return members
+
+        # -- Remove the temporary file, if it was not moved to the cache
+        finally:
+            tmpfile.unlink(missing_ok=True)
+
+
+def cached_archive(
+    collection: commons.Collection, name: str, version="", url=""
+) -> Path:
+    """Return the archive of the given collection from the cache
+    It is downloaded first if it is not in the cache, or if it is a dev
+    version that has changed in the server
+    * collection: Collection class (Context). It has the cache
+    * Name: Collection name (ex. 'iceK')
+    * Version: (Optional) (ex. '0.1.4')
+    * url: (Optional) Url of the archive. By default, the one of the
+      collection in the server
+    """
+
+    # -- Offline mode: nothing is downloaded
+    if collection.offline:
+        return offline_archive(collection, name, version)
+
+    cache = collection.cache
+    url = url or collection.url(name, version)
+    ref = collection.ref(version)
+
+    # -- Only one process (or thread) downloads the same archive at the
+    # -- same time (they share its .part file). The others wait, and then
+    # -- find it in the cache
+    with cache.download_lock(name, ref):
+        # -- Look for the collection in the cache
+        entry = cache.lookup(name, ref)
+
+        # -- Stable version in the cache: use it
+        if entry and not entry.mutable:
+            cache.hit(entry)
+            return cache.path(entry)
+
+        # -- Download the collection (only if it has changed)
+        etag = entry.etag if entry else ""
+        tmpfile = cache.tmpfile(name, ref)
+
+        try:
+            result = collection.download(url, tmpfile, etag)
+
+            # -- Not changed: use the cached version
+            if not result.modified:
+                cache.hit(entry)
+                return cache.path(entry)
+
+            # -- Store the new archive in the cache
+            entry = cache.store(name, ref, url, tmpfile, result.etag)
+            return cache.path(entry)
+
+        # -- Remove the temporary file, if it was not moved to the cache
+        # -- The .part file is kept if the download was interrupted, so
+        # -- that it can be resumed
+        finally:
+            tmpfile.unlink(missing_ok=True)
+
+
+def offline_archive(
+    collection: commons.Collection, name: str, version=""
+) -> Path:
+    """Return the archive of the given collection from the cache,
+    without asking the server (offline mode). Dev versions are not
+    revalidated: the last one downloaded is used
+    * collection: Collection class (Context). It has the cache
+    * Name: Collection name (ex. 'iceK')
+    * Version: (Optional) (ex. '0.1.4')
+    It raises DownloadError if the collection is not in the cache
+    """
+
+    ref = collection.ref(version)
+    entry = collection.cache.lookup(name, ref) if collection.cache else None
+
+    if not entry:
+        raise commons.DownloadError(
+            f"{entry_key(name, ref)} is not in the cache (offline mode)"
+        )
+
+    collection.cache.hit(entry)
+    return collection.cache.path(entry)
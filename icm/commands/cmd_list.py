@@ -1,29 +1,118 @@
 """List available collections"""
 
+import time
+import queue
+import threading
+import concurrent.futures
+
 import click
+import requests
 from icm.commons import commons
 from icm.commons import store
+from icm.commons.catalog import Catalog
+from icm.commons.metadata import DEFAULT_TTL, MetadataCache
+from icm.commands import defaults
+
+# -- Number of package.json files downloaded at the same time
+JOBS = defaults.LIST_JOBS
+
+# -- Maximum time (seconds) for getting all the package.json files
+DEADLINE = defaults.LIST_DEADLINE
+
+
+def fetch_packages(
+    collection: commons.Collection,
+    names: list,
+    jobs: int = JOBS,
+    catalog: Catalog = None,
+) -> dict:
+    """Download the package.json files of the given collections in
+    parallel. It returns immediately: the packages are Futures, that
+    are done when the package.json is downloaded
+    * collection: Context information
+    * names: Collection names
+    * jobs: Number of package.json downloaded at the same time
+    * catalog: If given, the collections in the catalog are not
+      downloaded. Their information is taken from there (if the
+      entries are not older than the package.json TTL)
+
+    The workers are daemon threads, so that the collections that are
+    still being downloaded when the deadline expires do not delay the
+    exit of the program
+    """
+
+    packages = {name: concurrent.futures.Future() for name in names}
+    max_age = collection.catalog_age() if catalog else None
+
+    tasks = queue.Queue()
+    for name, package in packages.items():
+        entry = catalog.get(name, max_age) if catalog else None
+        if entry:
+            package.set_result(entry.package)
+        else:
+            tasks.put(name)
+
+    def worker():
+        while True:
+            try:
+                name = tasks.get_nowait()
+            except queue.Empty:
+                return
+
+            # -- Download the package.json
+            url = collection.package_url(name)
+            try:
+                packages[name].set_result(collection.download_package(url))
+            except (requests.exceptions.RequestException, ValueError) as exc:
+                packages[name].set_exception(exc)
+
+    for _ in range(min(jobs, tasks.qsize())):
+        threading.Thread(target=worker, daemon=True).start()
+
+    return packages
 
 
 def list_collections(
-    collection: commons.Collection, typec: str, fg="white"
+    collection: commons.Collection,
+    typec: str,
+    fg="white",
+    packages: dict = None,
+    deadline: float = None,
 ) -> None:
     """List all the collections of a given type
     * collection: Context information
     * typec: Type of collections
       'stable': Estable collections
       'dev'   : Development collections
+    * packages: package.json Futures, by collection name (fetch_packages)
+      If not given, they are downloaded now
+    * deadline: Time (time.monotonic()) when the collections not
+      downloaded yet are given up. None: wait for all of them
+
+    The collections are printed in order, as soon as they are received
     """
 
+    names = store.COLLECTIONS[typec]
+    if packages is None:
+        packages = fetch_packages(collection, names)
+
     click.secho(f"{'Name':<15}   {'Version':<8}  Description", fg=fg)
     click.secho(f"{'─'*15:<15}   {'─'*8:<8}  {'─'*20}", fg=fg)
-    for name in store.COLLECTIONS[typec]:
-
-        # Calculate the url for the collection package.json file
-        url = collection.package_url(name)
-
-        # -- Download the package.json
-        package = collection.download_package(url)
+    for name in names:
+
+        # -- Wait for the package.json (until the deadline)
+        timeout = None
+        if deadline is not None:
+            timeout = max(0, deadline - time.monotonic())
+
+        try:
+            package = packages[name].result(timeout)
+        except (
+            concurrent.futures.TimeoutError,
+            requests.exceptions.RequestException,
+            ValueError,
+        ):
+            package = None
 
         # -- Get the collection information
         if package:
@@ -37,13 +126,42 @@ def list_collections(
             click.secho(f"• {name:<15} {'xxx':<8}  {'xxx'}", fg="red")
 
 
-def main():
-    """ENTRY POINT: List available collections"""
+def main(
+    offline: bool = False,
+    ttl: float = DEFAULT_TTL,
+    jobs: int = JOBS,
+    deadline: float = DEADLINE,
+    index: bool = True,
+):
+    """ENTRY POINT: List available collections
+    * offline: Do not download anything. Use only the cached information
+    * ttl: Time (seconds) the cached package.json files are valid
+    * jobs: Number of package.json downloaded at the same time
+    * deadline: Maximum time (seconds) for listing all the collections
+    * index: Read the collections from the catalog (icm index), if built
+    """
 
     # -- Get context information
     ctx = commons.Context()
     folders = commons.Folders()
-    collection = commons.Collection(folders)
+    collection = commons.Collection(
+        folders, metadata=MetadataCache(folders.metadata, ttl)
+    )
+    collection.offline = offline
+
+    # -- Allow one connection per job to the same host
+    if collection.transport.per_host < jobs:
+        collection.transport.configure(per_host=jobs)
+
+    # -- Start downloading all the package.json files
+    # -- (only the ones not in the catalog)
+    packages = fetch_packages(
+        collection,
+        store.COLLECTIONS["stable"] + store.COLLECTIONS["dev"],
+        jobs,
+        Catalog(folders.catalog) if index else None,
+    )
+    deadline = time.monotonic() + deadline
 
     print()
 
@@ -56,10 +174,10 @@ def main():
     click.secho("─" * 50, fg="green")
     click.secho("STABLE", fg="green")
     click.secho("─" * 50, fg="green")
-    list_collections(collection, "stable", fg="green")
+    list_collections(collection, "stable", "green", packages, deadline)
 
     print()
     click.secho("─" * 50, fg="blue")
     click.secho("DEV", fg="blue")
     click.secho("─" * 50, fg="blue")
-    list_collections(collection, "dev", fg="blue")
+    list_collections(collection, "dev", "blue", packages, deadline)
@@ -0,0 +1,299 @@
+"""Lock files: reproducible installation of a set of collections"""
+
+import sys
+import json
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import NamedTuple
+
+import click
+from icm.commons import commons
+from icm.commons.cache import ArchiveCache
+from icm.commons.inventory import from_archive, scan
+from icm.commons.metadata import MetadataCache
+from icm.commands import cmd_install, defaults
+
+# -- Default lock file
+LOCK_FILE = defaults.LOCK_FILE
+
+# -- Version of the lock file format
+LOCK_FORMAT = 1
+
+# -- Number of collections resolved / installed at the same time
+JOBS = defaults.LOCK_JOBS
+
+
+class LockEntry(NamedTuple):
+    """Collection in the lock file
+    * name: Collection name (Ex. iceK)
+    * version: Exact version (Ex. 0.1.4). "" for the development version
+    * url: Url of the archive
+    * digest: sha256 of the archive
+    * size: Archive size in bytes
+    """
+
+    name: str
+    version: str
+    url: str
+    digest: str
+    size: int
+
+    @property
+    def archive(self) -> str:
+        """Return the archive filename in the cache (blobs)"""
+        return f"{self.digest}.zip"
+
+
+def lock(
+    coltags: tuple,
+    requirements: str = None,
+    dev: bool = False,
+    output: str = LOCK_FILE,
+    jobs: int = JOBS,
+) -> None:
+    """ENTRY POINT: Resolve the given collections into a lock file
+    * coltags: Collection names + optional versions (Ex. (iceK, iceIO@0.1.2))
+    * requirements: File with more collections (one per line)
+    * dev: Lock the development versions
+    * output: Lock file to write
+    * jobs: Number of collections resolved at the same time
+    """
+
+    if requirements:
+        coltags = tuple(coltags) + tuple(read_requirements(requirements))
+
+    # -- Remove the duplicated collections (keeping the order)
+    coltags = list(dict.fromkeys(coltags))
+
+    folders = commons.Folders()
+    collection = lock_collection(folders, jobs)
+
+    # -- Check all the collection tags before resolving anything
+    for coltag in coltags:
+        if not collection.parse_coltag(coltag):
+            click.secho(f"Invalid collection: {coltag}", fg="red")
+            sys.exit(1)
+
+    print()
+    click.secho(f"Locking {len(coltags)} collections", fg="yellow")
+
+    with ThreadPoolExecutor(max_workers=jobs) as pool:
+        results = list(
+            pool.map(lambda coltag: resolve(collection, coltag, dev), coltags)
+        )
+
+    # -- Print the resolved collections (in order)
+    entries = []
+    for coltag, result in zip(coltags, results):
+        if isinstance(result, str):
+            click.secho(f"• {coltag:<25} {result}", fg="red")
+            continue
+
+        nametag = collection.nametag(result.name, result.version)
+        click.secho(f"• {nametag:<25} {result.digest[:12]}", fg="green")
+        entries.append(result)
+
+    # -- Do not write a partial lock file
+    if len(entries) != len(coltags):
+        sys.exit(1)
+
+    write_lock(Path(output), entries)
+    click.secho(f"Lock file: {output}", fg="green")
+
+
+def sync(lock_file: str = LOCK_FILE, jobs: int = JOBS) -> None:
+    """ENTRY POINT: Install exactly the collections of the lock file
+    No package.json is downloaded. The archives are taken from the
+    cache if they have the locked digests. If not, they are downloaded
+    and checked. The collections already installed are skipped if
+    their files are the ones of the locked archives
+    * lock_file: Lock file to install
+    * jobs: Number of collections installed at the same time
+    """
+
+    entries = read_lock(Path(lock_file))
+
+    folders = commons.Folders()
+    collection = lock_collection(folders, jobs)
+
+    print()
+    click.secho(
+        f"Syncing {len(entries)} collections ({jobs} jobs)", fg="yellow"
+    )
+
+    results = cmd_install.run_parallel(
+        collection,
+        jobs,
+        lambda entry: sync_job(collection, entry),
+        entries,
+        lambda entry: collection.nametag(entry.name, entry.version),
+    )
+
+    # -- Some collections could not be installed
+    if not cmd_install.print_summary(entries, results):
+        sys.exit(1)
+
+
+def lock_collection(folders: commons.Folders, jobs: int):
+    """Return the Collection (context) used for locking and syncing
+    The archives are always kept in the cache
+    """
+
+    collection = commons.Collection(
+        folders,
+        progress=False,
+        cache=ArchiveCache(folders.archives),
+        metadata=MetadataCache(folders.metadata),
+    )
+
+    # -- Allow one connection per job to the same host
+    if collection.transport.per_host < jobs:
+        collection.transport.configure(per_host=jobs)
+
+    return collection
+
+
+def resolve(collection: commons.Collection, coltag: str, dev: bool):
+    """Resolve the given collection tag into its lock entry
+    * collection: Collection class (context)
+    * coltag: name + optional version (Ex. iceK, iceK@0.1.4)
+    * dev: Lock the development version
+    Return the LockEntry, or the error message (str)
+    """
+
+    try:
+        name, version = cmd_install.resolve_version(collection, coltag, dev)
+        if version is None:
+            return "No package.json downloaded"
+
+        # -- Get the archive, for calculating its digest
+        archive = cmd_install.cached_archive(collection, name, version)
+
+    # -- Network problems, not valid package.json...
+    except (ValueError, *cmd_install.INSTALL_ERRORS) as exc:
+        return str(exc)
+
+    return LockEntry(
+        name,
+        version,
+        collection.url(name, version),
+        archive.stem,
+        archive.stat().st_size,
+    )
+
+
+def sync_job(
+    collection: commons.Collection, entry: LockEntry
+) -> cmd_install.InstallResult:
+    """Install one collection of the lock file. It is the task
+    executed by the parallel installer
+    * collection: Collection class (context)
+    * entry: Lock entry
+    Returns the InstallResult
+    """
+
+    nametag = collection.nametag(entry.name, entry.version)
+    installed = collection.folders.collections / nametag
+    cached = collection.cache.lookup(entry.name, collection.ref(entry.version))
+
+    try:
+        # -- The locked archive is in the cache: no need to ask the server
+        if cached and cached.digest == entry.digest:
+            collection.cache.hit(cached)
+            archive = collection.cache.path(cached)
+        else:
+            archive = cmd_install.cached_archive(
+                collection, entry.name, entry.version, entry.url
+            )
+
+        # -- The archive is not the locked one
+        if archive.name != entry.archive:
+            return cmd_install.InstallResult(
+                nametag,
+                nametag,
+                "error",
+                f"Digest mismatch: {archive.stem[:12]} "
+                f"(locked {entry.digest[:12]})",
+            )
+
+        # -- Already installed: its files should be the ones of the
+        # -- locked archive
+        if installed.exists():
+            with zipfile.ZipFile(archive) as zip_file:
+                locked = from_archive(
+                    zip_file.infolist(),
+                    nametag,
+                    entry.name,
+                    entry.version,
+                    entry.url,
+                )
+            current = scan(installed, entry.name, entry.version, entry.url)
+
+            if current.digest == locked.digest:
+                return cmd_install.InstallResult(nametag, nametag, "exists")
+
+            # -- Stable versions are never replaced
+            if entry.version:
+                return cmd_install.InstallResult(
+                    nametag,
+                    nametag,
+                    "error",
+                    "The installed files are not the locked ones",
+                )
+
+        # -- The dev versions are replaced (see commons.uncompress)
+        members = collection.uncompress(archive)
+        cmd_install.register(collection, entry.name, entry.version, members)
+
+    except cmd_install.INSTALL_ERRORS as exc:
+        return cmd_install.InstallResult(nametag, nametag, "error", str(exc))
+
+    return cmd_install.InstallResult(nametag, nametag, "installed")
+
+
+def read_requirements(requirements: str) -> list:
+    """Read the collection tags from a requirements file
+    One collection tag per line. Empty lines and comments (#) are ignored
+    Ex.
+      # -- Basic collections
+      iceK@0.1.4
+      iceIO
+    """
+
+    try:
+        with open(requirements, "r", encoding="utf-8") as file:
+            lines = [line.partition("#")[0].strip() for line in file]
+    except OSError as exc:
+        click.secho(f"Error: {exc}", fg="red")
+        sys.exit(1)
+
+    return [line for line in lines if line]
+
+
+def write_lock(lock_file: Path, entries: list) -> None:
+    """Write the lock file"""
+
+    data = {
+        "format": LOCK_FORMAT,
+        "collections": [entry._asdict() for entry in entries],
+    }
+
+    with open(lock_file, "w", encoding="utf-8") as file:
+        json.dump(data, file, indent=2)
+        file.write("\n")
+
+
+def read_lock(lock_file: Path) -> list:
+    """Read the lock file. Return the LockEntries"""
+
+    try:
+        with open(lock_file, "r", encoding="utf-8") as file:
+            data = json.load(file)
+        if data.get("format") != LOCK_FORMAT:
+            raise ValueError(f"format {data.get('format')} not supported")
+        return [LockEntry(**entry) for entry in data["collections"]]
+
+    except (OSError, ValueError, KeyError, TypeError, AttributeError) as exc:
+        click.secho(f"Invalid lock file: {lock_file} ({exc})", fg="red")
+        sys.exit(1)
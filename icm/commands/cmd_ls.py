@@ -1,15 +1,40 @@
 """List installed collections command"""
 
+import json
+import datetime
+
 import click
-from icm.commons import commons
+from icm.commons import context
+from icm.commons.inventory import Inventory, scan_all
+from icm.commands.cmd_cache import human_size
 
 
-def main():
-    """ENTRY POINT: List collections"""
+def main(long: bool = False, json_: bool = False, rescan: bool = False):
+    """ENTRY POINT: List collections
+    * long: Show all the information of the collections
+    * json_: Print the collections in JSON format
+    * rescan: Rebuild the inventory from the collections folder
+    """
 
     # -- Get context information
-    ctx = commons.Context()
-    folders = commons.Folders()
+    ctx = context.Context()
+    folders = context.Folders()
+    inventory = Inventory(folders.inventory)
+
+    # -- The inventory is read from disk the first time. Then only the
+    # -- collections added or removed without icm (Ex. by hand or by
+    # -- Icestudio) are read
+    if rescan or not inventory.exists():
+        rescan_inventory(folders, inventory)
+    else:
+        refresh_inventory(folders, inventory)
+
+    # -- Get all the collections (sorted)
+    list_col = inventory.entries()
+
+    if json_:
+        print(json.dumps([col._asdict() for col in list_col], indent=2))
+        return
 
     # -- Header
     print()
@@ -17,19 +42,70 @@ def main():
     click.secho("INSTALLED COLLECTIONS", fg="blue")
     click.secho(ctx.line, fg="blue")
 
-    # -- Get a list with all the collections (folders)
-    list_col = [
-        file.name for file in folders.collections.glob("*") if file.is_dir()
-    ]
-
-    # -- Sort the list of collections
-    list_col.sort()
-
     # -- List not empty: Print it!
     if list_col:
         # -- Print all the available collections
         for colection in list_col:
-            click.secho(f"• {colection}", fg="blue")
+            if long:
+                installed = datetime.datetime.fromtimestamp(
+                    colection.installed
+                )
+                click.secho(
+                    f"• {colection.nametag:<25} "
+                    f"{colection.files:>6} files "
+                    f"{human_size(colection.size):>9}  "
+                    f"{installed:%Y-%m-%d %H:%M}  {colection.digest[:12]}",
+                    fg="blue",
+                )
+            else:
+                click.secho(f"• {colection.nametag}", fg="blue")
 
     else:
         print("No installed collections")
+
+
+def rescan_inventory(folders: context.Folders, inventory: Inventory) -> None:
+    """Rebuild the inventory from the collections folder. All the
+    collections are read in parallel
+    """
+
+    list_col = folders.installed()
+    inventory.replace(scan_all(list_col, _describer(folders), context.JOBS))
+
+
+def refresh_inventory(folders: context.Folders, inventory: Inventory) -> None:
+    """Update the inventory with the collection folders created or
+    removed since it was written. Only the names of the folders are
+    compared: the collections already in the inventory are not read
+    """
+
+    list_col = folders.installed()
+    known = {col.nametag for col in inventory.entries()}
+
+    added = [folder for folder in list_col if folder.name not in known]
+    removed = known - {folder.name for folder in list_col}
+
+    if added or removed:
+        inventory.update(
+            scan_all(added, _describer(folders), context.JOBS), removed
+        )
+
+
+def _describer(folders: context.Folders):
+    """Return the function that gives the name, version and url of a
+    collection folder
+    """
+
+    # -- The download code (requests, tqdm...) is only imported when
+    # -- reading the collections, not in every ls
+    from icm.commons import commons  # pylint: disable=C0415
+
+    collection = commons.Collection(folders)
+
+    def describe(folder) -> tuple:
+        """Return the name, version and url of a collection folder"""
+
+        name, version = context.split_nametag(folder.name)
+        return name, version, collection.url(name, version)
+
+    return describe
@@ -1,16 +1,25 @@
 """Remove installed collections"""
 
-import shutil
+import fnmatch
 import click
 
 from icm.commons import commons
+from icm.commons.inventory import Inventory
+from icm.commons.context import split_nametag
+from icm.commons.trash import Trash
 
 
-def main(coltags: tuple, yes: bool) -> None:
+def main(
+    coltags: tuple, yes: bool, all_versions: bool = False, wait: bool = False
+) -> None:
     """ENTRY POINT: Remove collections
     * coltag: Name+version of the collection to remove
-      (Ex. iceK-0.1.4)
+      (Ex. iceK-0.1.4). Glob patterns are allowed (Ex. ice*-main)
     * yes: Respond "yes" automatically
+    * all_versions: Remove all the versions of the collections given
+      by name (Ex. iceK --> iceK-0.1.3, iceK-0.1.4, iceK-main)
+    * wait: Delete the collections before returning. If not, they are
+      deleted in the background
     """
 
     # -- Get context information
@@ -20,22 +29,35 @@ def main(coltags: tuple, yes: bool) -> None:
     print()
 
     # -- Remove the collection!
-    for coltag in coltags:
-        rm_collection(collection, folders, coltag, yes)
+    try:
+        for coltag in coltags:
+            rm_collection(collection, folders, coltag, yes, all_versions)
+
+    # -- Delete the removed collections (also the ones left in the
+    # -- trash by previous runs)
+    finally:
+        trash = Trash(folders.trash)
+        if wait:
+            trash.empty()
+        else:
+            trash.empty_background()
 
 
-def rm_collection(
+def rm_collection(  # pylint: disable=too-many-arguments
     collection: commons.Collection,
     folders: commons.Folders,
     coltag: str,
     yes: bool = False,
+    all_versions: bool = False,
 ) -> None:
     """Remove one collection
     * collection: Context information,
     * folders: Context information,
     * coltag: Name+version of the collection to remove
-      (Ex. iceK-0.1.4)
+      (Ex. iceK-0.1.4), or a glob pattern (Ex. ice*-main)
     * yes: Respond "yes" automatically
+    * all_versions: Remove all the collections with the given name,
+      not just the first
     """
 
     # -- Build the Path to the collection
@@ -44,49 +66,87 @@ def rm_collection(
     # -- Check if the collection exists, as it was typed bye the user
     if abs_collection.exists():
         # -- Remove it!
-        shutil.rmtree(abs_collection)
+        remove(folders, coltag)
         return
 
-    # -- Manage other cases
-    # -- Case 1: Remove the first collection that has the same name
-    # --    Ignore the version
+    # -- Manage other cases. The collections are looked for in the
+    # -- disk. The inventory entries without folder are just dropped
+    installed = [folder.name for folder in folders.installed()]
+    inventory = Inventory(folders.inventory)
+    stale = [
+        col.nametag
+        for col in inventory.entries()
+        if col.nametag not in installed
+    ]
 
-    # -- Parse the collection name: Get the name and version
-    parsed_coltag = collection.parse_coltag2(coltag)
-    name = parsed_coltag["name"]
-    version = parsed_coltag["version"]
+    # -- Case 1: Glob pattern. Remove all the matching collections
+    if glob_pattern(coltag):
+        list_col = fnmatch.filter(installed, coltag)
+        stale = fnmatch.filter(stale, coltag)
 
-    # -- If there is name and version: The collection does not exists
-    if name and version:
-        print(f"rm: cannot remove {coltag}: No such collection")
+    # -- Case 2: Remove the first collection that has the same name
+    # --    Ignore the version
+    else:
+        # -- Parse the collection name: Get the name and version
+        parsed_coltag = collection.parse_coltag2(coltag) or {}
+        name = parsed_coltag.get("name")
+        version = parsed_coltag.get("version")
+
+        # -- If there is name and version: The collection does not exists
+        if name and version:
+            name = None
+
+        # -- List all the collections with that name
+        list_col = [
+            tag for tag in installed if name and split_nametag(tag)[0] == name
+        ]
+        stale = [
+            tag
+            for tag in stale
+            if tag == coltag or (name and split_nametag(tag)[0] == name)
+        ]
+
+        # -- Only the first one (unless all the versions are removed)
+        if not all_versions:
+            list_col = list_col[:1]
+
+    # -- Removed by hand (or by Icestudio): drop them from the inventory
+    for nametag in stale:
+        inventory.remove(nametag)
+        print(f"  {nametag} not found: removed from the inventory")
+
+    # -- No collection found
+    if not list_col:
+        if not stale:
+            print(f"rm: cannot remove {coltag}: No such collection")
         return
 
-    # -- List all the collections that starts with "name-"
-    list_col = [
-        file.name
-        for file in folders.collections.glob(f"{name}-*")
-        if file.is_dir()
-    ]
-
-    # -- No collection has a name that starts with "<name>-"
-    if not list_col:
-        print(f"rm: cannot remove {coltag}: No such collection")
+    # -- Ask for confirmation!
+    if yes or click.confirm(f"{', '.join(list_col)}: Remove?"):
+        # -- Remove the collections!
+        for nametag in list_col:
+            remove(folders, nametag)
+            print(f"  {nametag} removed!")
         return
 
-    # -- There are collection with that name
-    # -- TODO: Remove ALL the collections, not just the first
+    print("Aborted.")
 
-    # -- Get the first collection name
-    coltag = list_col[0]
 
-    # -- Build the full path to the collection
-    abs_collection = folders.collections / coltag
+def glob_pattern(coltag: str) -> bool:
+    """Check if the collection tag is a glob pattern (Ex. ice*-main)"""
+    return any(char in coltag for char in "*?[")
 
-    # -- Ask for confirmation!
-    if yes or click.confirm(f"{coltag}: Remove?"):
-        # -- Remove the collection!
-        shutil.rmtree(abs_collection)
-        print(f"  {coltag} removed!")
-        return
 
-    print("Aborted.")
+def remove(folders: commons.Folders, coltag: str) -> None:
+    """Remove the collection folder and its entry in the inventory
+    The folder is moved to the trash. It is deleted later
+    * coltag: Name+version of the collection (Ex. iceK-0.1.4)
+    """
+
+    # -- It could have been removed by other process
+    try:
+        Trash(folders.trash).move(folders.collections / coltag)
+    except FileNotFoundError:
+        print(f"  {coltag} not found: removed from the inventory")
+
+    Inventory(folders.inventory).remove(coltag)
@@ -0,0 +1,61 @@
+"""Search the blocks and examples of the installed collections"""
+
+import time
+
+import click
+from icm.commons import context
+from icm.commons.search import SearchIndex
+from icm.commands import defaults
+from icm.commands.cmd_dedup import collection_folders
+
+# -- Default maximum number of results
+LIMIT = defaults.SEARCH_LIMIT
+
+
+def main(terms: tuple, limit: int = LIMIT, update: bool = True) -> None:
+    """ENTRY POINT: Search the installed blocks and examples
+    * terms: Words to search. All of them should match (Ex. (and, gate))
+    * limit: Maximum number of results (0: all)
+    * update: Update the index with the changed files first
+    """
+
+    # -- Get context information
+    ctx = context.Context()
+    folders = context.Folders()
+
+    start = time.perf_counter()
+    index = SearchIndex(folders.search).load()
+
+    # -- Only the modified .ice files are read again
+    if update:
+        read, removed = index.update(
+            collection_folders(folders, ()), context.JOBS
+        )
+        if read or removed:
+            index.save()
+
+    matches = index.search(" ".join(terms), limit)
+    elapsed = time.perf_counter() - start
+
+    # -- Header
+    print()
+    click.secho(ctx.line, fg="blue")
+    click.secho(f"SEARCH: {' '.join(terms)}", fg="blue")
+    click.secho(ctx.line, fg="blue")
+
+    if not matches:
+        print("No matches")
+        return
+
+    for match in matches:
+        click.secho(f"• {match.doc.collection}: ", fg="green", nl=False)
+        click.echo(match.doc.path)
+        if match.doc.text:
+            click.secho(f"    {match.doc.text}", fg="blue")
+
+    print()
+    click.secho(
+        f"{len(matches)} results, {len(index.docs)} files indexed "
+        f"({elapsed * 1000:.0f} ms)",
+        fg="yellow",
+    )
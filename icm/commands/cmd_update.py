@@ -7,24 +7,41 @@
 # -- Licence GPLv2
 
 import os
-import re
-import json
+import sys
 
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
 from string import Template
 import click
 import polib
 
-from icm.commands.cmd_validate import validate_collection
+from icm.commands.cmd_validate import scan_collection, validate_collection
+from icm.commons import collection
+from icm.commons.ice import read_texts
+from icm.commons.textcache import CACHE_FILE, TextCache
+from icm.commons.watch import watcher
 
 # -- Repo default branch. This value is used when the package.json
 # -- has not the "branch" field in it
 DEFAULT_BRANCH = "main"
 
 # -- Folder name where the blocks are located in the collection
-BLOCKS_FOLDER = "blocks"
+BLOCKS_FOLDER = collection.BLOCKS_FOLDER
 
 # -- Folder name where the examples are located in the collection
-EXAMPLES_FOLDER = "examples"
+EXAMPLES_FOLDER = collection.EXAMPLES_FOLDER
+
+# -- Folder name where the translations are located in the collection
+LOCALE_FOLDER = collection.LOCALE_FOLDER
+
+# -- Collection description file
+PACKAGE = collection.PACKAGE_FILE
+
+# -- File with the texts to be translated (generated)
+TRANSLATION_FILE = "locale/translation.js"
+
+# -- Parts of the collection the README sections are generated from
+README_PARTS = ("package", "blocks", "examples", "locale")
 
 # -- Folder name where the resources are located (templates, ...)
 RESOURCES_FOLDER = "resources"
@@ -32,6 +49,10 @@ RESOURCES_FOLDER = "resources"
 # -- Template for generating the translation.js file
 TRANSLATION_TEMPLATE_FILE = "translation.tpl.js"
 
+# -- Minimum number of .ice files for every process reading them. With
+# -- less files starting the processes takes longer than reading them
+FILES_PER_JOB = 16
+
 # -- Dictionary with the asociation between Lanaguje name and
 # -- its locale
 DICT_LANG = {
@@ -52,49 +73,203 @@ DICT_LANG = {
 }
 
 
-def update():
-    """ENTRY POINT: Update docs and translation."""
+def update(jobs: int = 1, write: str = None, watch: bool = False):
+    """ENTRY POINT: Update docs and translation.
+    * jobs: Number of processes reading the .ice files
+    * write: What to do with the files with changes: "ask", "always" or
+      "never". None: ask (always when watching)
+    * watch: Keep watching the collection and update it when it changes
+    """
+
+    # -- Nobody can answer when watching. Otherwise the answers are read
+    # -- from stdin, even if it is not a terminal (Ex. printf 'y\ny\n' |)
+    if write is None:
+        write = "always" if watch else "ask"
+    if watch and write == "ask":
+        click.secho(
+            "Error: --watch can not be used with --write ask", fg="red"
+        )
+        sys.exit(1)
 
     click.secho("Update the collection", fg="cyan")
 
+    # -- The collection is scanned only once: its folders, locales and
+    # -- package.json are used by all the steps
+    model = scan_collection()
+
     # The collection can only be updated if it is valid
-    if validate_collection():
+    if validate_collection(model):
+
+        # -- Texts and translated percentages of the files not modified
+        # -- since the last update
+        cache = TextCache(Path(CACHE_FILE)).load()
 
         # Read The contents from the package.json file
         # and generate a formated string
-        contents = _generate_readme_string()
+        sections = _readme_sections(model, cache)
 
         # Update README.md (or create a new one if it does not exist)
         # with the generated contents
-        _update_file("README.md", contents)
+        _update_file("README.md", _render_readme(sections), write)
 
         # Read the English text to be translated
-        lang_contents = _generate_translation_strings()
+        lang_contents = _generate_translation_strings(model, jobs, cache)
 
         # Update the locale/translation.js file with the new texts
         # to be translated
-        _update_file("locale/translation.js", lang_contents)
+        _update_file(TRANSLATION_FILE, lang_contents, write)
+
+        cache.save()
 
     else:
         click.secho("\nThe collection is not valid :(", fg="red")
+        if not watch:
+            return
+        cache, sections = TextCache(Path(CACHE_FILE)).load(), None
+
+    if watch:
+        _WatchSession(model, cache, sections, jobs, write).run()
+
+
+class _WatchSession:
+    """icm update --watch: the collection model, the README sections and
+    the cache are kept in memory. When some files change only the
+    affected parts are read again, and only the affected README
+    sections and translation texts are generated again
+    * model: Collection model
+    * cache: TextCache (already saved)
+    * sections: README sections (None: not generated yet)
+    * jobs: Number of processes reading the .ice files
+    * write: What to do with the files with changes ("always", "never")
+    """
+
+    # pylint: disable=R0913,R0917
+    def __init__(self, model, cache, sections, jobs, write):
+        self.model = model
+        self.cache = cache
+        self.sections = sections
+        self.jobs = jobs
+        self.write = write
+
+    def run(self) -> None:
+        """Update the collection every time it changes (until Ctrl-C)"""
+
+        files = watcher(
+            ".", (BLOCKS_FOLDER, EXAMPLES_FOLDER, LOCALE_FOLDER), (PACKAGE,)
+        )
+        click.secho("\nWatching the collection (Ctrl-C to stop)", fg="cyan")
+        try:
+            while True:
+                self.refresh(files.wait())
+        except KeyboardInterrupt:
+            click.secho("\nStopped", fg="cyan")
+        finally:
+            files.close()
+
+    def refresh(self, changed: set) -> None:
+        """Update the collection after the given files have changed
+        * changed: Paths changed, relative to the collection ("/"
+          separated). Ex. {"blocks/Logic/and.ice"}
+        """
+
+        parts = _changed_parts(changed)
+        if not parts:
+            return
+
+        # -- Nothing was generated before (the collection was not valid)
+        if self.sections is None:
+            parts = set(README_PARTS)
+
+        click.secho(f"\nChanged: {', '.join(sorted(parts))}", fg="cyan")
+        try:
+            self.model = _rescan(self.model, parts)
+        except ValueError:
+            click.secho(f" - Error: `{PACKAGE}` is not valid JSON", fg="red")
+            return
+
+        if not validate_collection(self.model):
+            click.secho("The collection is not valid :(", fg="red")
+            self.sections = None
+            return
+
+        # -- Only the affected sections
+        sections = _readme_sections(self.model, self.cache, parts)
+        self.sections = {**(self.sections or {}), **sections}
+        _update_file("README.md", _render_readme(self.sections), self.write)
+
+        # -- The texts of the files not modified are taken from the cache
+        trees = {"blocks", "examples"}
+        if parts & trees:
+            contents = _generate_translation_strings(
+                self.model, self.jobs, self.cache
+            )
+            _update_file(TRANSLATION_FILE, contents, self.write)
+
+        # -- The files not read now are kept in the cache
+        if "locale" not in parts:
+            self.cache.keep(pofile for _, pofile in self.model.locales)
+        if not parts & trees:
+            self.cache.keep(
+                os.path.join(root, file)
+                for folders in (self.model.blocks, self.model.examples)
+                for root, _, files in folders
+                for file in files
+            )
+        self.cache.save()
 
 
-def _update_file(dest, data):
+def _changed_parts(changed):
+    """Return the parts of the collection affected by the given paths:
+    "package", "blocks", "examples" and/or "locale" (the generated
+    locale/translation.js file is ignored)
+    """
+
+    parts = set()
+    for path in changed:
+        top = path.split("/", 1)[0]
+        if path == PACKAGE:
+            parts.add("package")
+        elif top in (BLOCKS_FOLDER, EXAMPLES_FOLDER):
+            parts.add(top)
+        elif top == LOCALE_FOLDER and path != TRANSLATION_FILE:
+            parts.add("locale")
+    return parts
+
+
+def _rescan(model, parts):
+    """Return the collection model with the given parts read again
+    A package.json file that is not valid JSON raises a ValueError
+    """
+
+    if "package" in parts:
+        model = model._replace(package=collection.read_package())
+    if "blocks" in parts:
+        model = model._replace(blocks=collection.walk(BLOCKS_FOLDER))
+    if "examples" in parts:
+        model = model._replace(examples=collection.walk(EXAMPLES_FOLDER))
+    if "locale" in parts:
+        model = model._replace(locales=collection.read_locales())
+    return model
+
+
+def _update_file(dest, data, write="ask"):
     """Update the destination file with the data.
-    If the file does not exists it is created"""
+    If the file does not exists it is created
+    * write: What to do if the file has changes: "ask", "always" or
+      "never" replace it"""
 
     # Check if the file exist
     if os.path.exists(dest):
 
         # Update it!
-        _update_existing_file(dest, data)
+        _update_existing_file(dest, data, write)
     else:
 
         # Create a new one
         _create_new_file(dest, data)
 
 
-def _update_existing_file(dest, data):
+def _update_existing_file(dest, data, write="ask"):
     """Update the dest file with the given data"""
 
     with open(dest, "r", encoding="utf-8") as file:
@@ -103,17 +278,20 @@ def _update_existing_file(dest, data):
         # if it is equal or not to the given data
         if file.read() == data:
             click.secho(f" - `{dest}` file already updated", fg="yellow")
-        # -- The file is outdated
-        else:
-            if click.confirm(
-                f"The `{dest}` file has changes.\n"
-                "Do you want to replace it?"
-            ):
-                with open(dest, "w", encoding="utf-8") as file:
-                    file.write(data)
-                click.secho(f" - `{dest}` file updated", fg="green")
-            else:
-                click.secho(f" - `{dest}` file not updated", fg="red")
+            return
+
+    # -- The file is outdated
+    if write == "always" or (
+        write == "ask"
+        and click.confirm(
+            f"The `{dest}` file has changes.\nDo you want to replace it?"
+        )
+    ):
+        with open(dest, "w", encoding="utf-8") as file:
+            file.write(data)
+        click.secho(f" - `{dest}` file updated", fg="green")
+    else:
+        click.secho(f" - `{dest}` file not updated", fg="red")
 
 
 def _create_new_file(dest, data):
@@ -125,53 +303,77 @@ def _create_new_file(dest, data):
     click.secho(f" - `{dest}` file created", fg="green")
 
 
-def _generate_readme_string():
+def _generate_readme_string(model, cache=None):
     """Generate the data for the README file from the TEMPLATE file
     The information is read from the package.json file
     It returns a string with the final readme file.
+    TEMPLATE file: resources/README.tpl.md
+    * model: Collection model (with the package.json contents)
+    * cache: TextCache with the translated percentages"""
+
+    return _render_readme(_readme_sections(model, cache))
+
+
+def _readme_sections(model, cache=None, parts=README_PARTS):
+    """Return the README template variables generated from the given
+    parts of the collection ("package", "blocks", "examples", "locale")
+    * model: Collection model
+    * cache: TextCache with the translated percentages"""
+
+    package = model.package
+    sections = {}
+
+    if "package" in parts:
+        sections.update(
+            name=package["name"],
+            version=package["version"].replace("-", "--"),
+            description=package["description"],
+            license=package.get("license"),
+            # -- Add the header image
+            header=_create_header(package),
+            # -- Add the logo image
+            logo=_create_logo(package),
+            # -- Add the wiki section
+            wiki=_create_wiki(package),
+            # -- Create the download link section
+            links=_create_links(package),
+            # -- others
+            authors=_create_authors_section(package),
+            contributors=_create_contributor_section(package),
+            # -- Add the footer image
+            footer=_create_footer(package),
+        )
+
+    # -- Show all the blocks in the collection
+    if "blocks" in parts:
+        sections["blocks"] = _create_blocks_section(model.blocks)
+
+    # -- Show all the examples in the collection
+    if "examples" in parts:
+        sections["examples"] = _create_examples_section(model.examples)
+
+    if "locale" in parts:
+        sections["languages"] = _create_languages_section(model.locales, cache)
+
+    return sections
+
+
+def _render_readme(sections):
+    """Return the README file with the given template variables
     TEMPLATE file: resources/README.tpl.md"""
 
-    data = ""
     readme_template = os.path.join(
         os.path.dirname(__file__), "..", "resources", "README.tpl.md"
     )
 
-    with open("package.json", "r", encoding="utf-8") as pack:
-        package = json.load(pack)
-
-        with open(readme_template, "r", encoding="utf-8") as file:
-
-            # Read the template content
-            template = Template(file.read())
-
-            # Substitute the template variables with the data generated
-            # from the package.json information
-            data = template.safe_substitute(
-                name=package["name"],
-                version=package["version"].replace("-", "--"),
-                description=package["description"],
-                license=package.get("license"),
-                # -- Add the header image
-                header=_create_header(package),
-                # -- Add the logo image
-                logo=_create_logo(package),
-                # -- Add the wiki section
-                wiki=_create_wiki(package),
-                # -- Create the download link section
-                links=_create_links(package),
-                # -- Show all the blocks in the collection
-                blocks=_create_blocks_section(),
-                # -- Show all the examples in the collection
-                examples=_create_examples_section(),
-                # -- others
-                languages=_create_languages_section(),
-                authors=_create_authors_section(package),
-                contributors=_create_contributor_section(package),
-                # -- Add the footer image
-                footer=_create_footer(package),
-            )
+    with open(readme_template, "r", encoding="utf-8") as file:
 
-    return data
+        # Read the template content
+        template = Template(file.read())
+
+    # Substitute the template variables with the data generated
+    # from the package.json information
+    return template.safe_substitute(**sections)
 
 
 def _create_wiki(package):
@@ -261,23 +463,24 @@ def _create_links(package):
     return links
 
 
-def _create_blocks_section():
+def _create_blocks_section(folders):
     blocks_section = ""
-    blocks = _list_recursive_files("blocks")
+    blocks = _list_recursive_files(folders)
     if blocks:
         blocks_section = "## Blocks\n"
         blocks_section += blocks
     return blocks_section
 
 
-def _create_examples_section():
+def _create_examples_section(folders):
     """Read the examples directoy of the collection and create
-    the markdown documentation"""
+    the markdown documentation
+    * folders: Folders of the examples tree"""
 
     examples_section = ""
 
     # Get all the files in the examples directory (recursivelly)
-    examples = _list_recursive_files("examples")
+    examples = _list_recursive_files(folders)
 
     # If there are no examples, this section is
     # not added to the README file
@@ -288,90 +491,78 @@ def _create_examples_section():
     return examples_section
 
 
-def _list_recursive_files(path, ext=".ice"):
+def _list_recursive_files(folders, ext=".ice"):
     """Get a string with all the icestudio example files in the
-    given folder (recursivelly)"""
+    given folders (Folders of a tree, in order)"""
 
-    data = ""
-    for root, _, files in sorted(os.walk(path)):
+    # -- Lines of the string
+    lines = []
+    for root, _, files in folders:
 
         # -- root contains the path to the current file
         # -- It is split into its components to determine its depth
         path = root.split(os.sep)
         depth = len(path)
 
+        # -- The files inside an ice-build folder are ignored
+        if "ice-build" in path:
+            continue
+
         # -- Insert only the elements with depth > 1
         # -- A depth = 1 means the block or example root folder
         if depth > 1:
 
-            # -- Indentation spaces (depending on the depth)
+            # -- Item name in bold (markdown), with the indentation
+            # -- spaces (depending on the depth)
             indent = "  " * (depth - 2)
+            lines.append(f"{indent}* **{os.path.basename(root)}**\n")
 
-            # -- Item name in bold (markdown)
-            folder_name = f"* **{os.path.basename(root)}**"
-
-            # -- Include the folder in the string
-            # -- Ignore the ice-build folder!
-            if "ice-build" not in path:
-                data += indent + folder_name + "\n"
-
-                # -- Debug!
-                # print(f"{indent}{folder_name}")
-
-        # -- Add the .ice files to the output string
-        for file in sorted(files):
-
-            # -- Only '.ice' files are included
+        # -- Add the .ice files (only them), with their indentation
+        indent = "  " * (depth - 1)
+        for file in files:
             if file.endswith(ext):
+                lines.append(f"{indent}* {os.path.splitext(file)[0]}\n")
 
-                # -- Indentation
-                indent = "  " * (depth - 1)
-
-                # -- Get the file name
-                example_name = f"* {os.path.splitext(file)[0]}"
-
-                # -- The files inside an ice-build folder are ignored
-                if "ice-build" not in path:
-                    data += indent + example_name + "\n"
+    return "".join(lines)
 
-                    # -- Debug!
-                    # print(f"{indent}{example_name}.ice")
 
-    return data
-
-
-def _create_languages_section():
+def _create_languages_section(locales, cache=None):
     languages_section = ""
-    languages = _list_languages("locale")
+    languages = _list_languages(locales, cache)
     if languages:
         languages_section = "## Translations\n"
         languages_section += languages
     return languages_section
 
 
-def _list_languages(path):
-    """Get the string with all the translated languajes and its percentage"""
+def _list_languages(locales, cache=None):
+    """Get the string with all the translated languajes and its percentage
+    * locales: (locale, .po file) of every language
+    * cache: TextCache. The .po files not modified are not read again"""
     data = ""
     languages = []
+    if cache is None:
+        cache = TextCache()
 
     # Get the languages from the folders inside the LOCALE folder
-    for lang in os.listdir(path):
-
-        # The the path to the .po file of the current language to process
-        langpath = os.path.join(path, lang, lang + ".po")
-
-        # Process it, if it is a file
-        if os.path.isfile(langpath):
+    # (the ones with a .po file)
+    for lang, langpath in locales:
 
-            # Read the .po file with the translated texts
+        # Read the .po file with the translated texts: its number of
+        # entries and translated percentage
+        stats = cache.get(langpath)
+        if stats is None:
             pofile = polib.pofile(langpath)
+            stats = [len(pofile), pofile.percent_translated()]
+            cache.put(langpath, stats)
 
-            # If the file is not null, there are some translated texts
-            # Processs it!
-            if len(pofile) != 0:
+        # If the file is not null, there are some translated texts
+        # Processs it!
+        entries, percent = stats
+        if entries != 0:
 
-                # Insert the languaje locale and its percentage in the list
-                languages.append((lang, pofile.percent_translated()))
+            # Insert the languaje locale and its percentage in the list
+            languages.append((lang, percent))
 
     # Short the languajes locales
     languages = sorted(languages)
@@ -444,8 +635,11 @@ def _create_contributor_section(package):
     return contributors_section
 
 
-def _generate_translation_strings():
-    """Generate the string with the text in Egnlish to be translated"""
+def _generate_translation_strings(model, jobs=1, cache=None):
+    """Generate the string with the text in Egnlish to be translated
+    * model: Collection model (with the blocks and examples trees)
+    * jobs: Number of processes reading the .ice files
+    * cache: TextCache. The .ice files not modified are not read again"""
 
     data = ""
 
@@ -459,16 +653,17 @@ def _generate_translation_strings():
 
     # -- Process the template file
     with open(readme_template, "r", encoding="utf-8") as file:
+
         translations = []
         template = Template(file.read())
 
         # Get the English texts for all the blocks in the collection
         # Block are located in the "blocks" folder
-        _find_texts(BLOCKS_FOLDER, translations)
+        _find_texts(model.blocks, translations, jobs=jobs, cache=cache)
 
         # Get the English texts for all the examples in the collection
         # The examples are located in the "examples" folder
-        _find_texts(EXAMPLES_FOLDER, translations)
+        _find_texts(model.examples, translations, jobs=jobs, cache=cache)
 
         # Add gettext function to all the English texts
         # gettext('text in english');
@@ -479,18 +674,54 @@ def _generate_translation_strings():
     return data
 
 
-def _find_texts(path, translations, ext=".ice"):
-    """Find all texts for translation"""
-    for root, dirs, files in sorted(os.walk(path)):
-        for directory in sorted(dirs):
+def _find_texts(folders, translations, ext=".ice", jobs=1, cache=None):
+    """Find all texts for translation
+    * folders: Folders of the tree (blocks or examples), in order
+    * translations: List where the texts are added. The folder and
+      file names are always added. The texts of the files are added
+      only if they are not in the list yet
+    * jobs: Number of processes reading the files
+    * cache: TextCache. The files not modified are not read again
+    """
+
+    entries = _list_entries(folders, ext)
+
+    # -- The files are read in parallel, but their texts are added in
+    # -- the same order as before: the result does not depend on jobs
+    filepaths = [filepath for _, filepath in entries if filepath]
+    texts = iter(_read_all_texts(filepaths, jobs, cache))
+
+    # -- Texts already in the list: a set, so that checking them does
+    # -- not scan the whole list
+    found = set(translations)
+
+    for name, filepath in entries:
+        translations.append(name)
+        found.add(name)
+
+        # Append the descriptions and the basic.info blocks
+        if filepath:
+            for text in next(texts):
+                if text not in found:
+                    translations.append(text)
+                    found.add(text)
+
+
+def _list_entries(folders, ext):
+    """Return the names of the folders and files of the tree, in order.
+    The texts of every file go after its name: (name, file path or None)
+    * folders: Folders of the tree (blocks or examples), in order
+    """
+
+    entries = []
+
+    for root, dirs, files in folders:
+        for directory in dirs:
             # Append directories if diferent thant ice-build
             if directory != "ice-build":
-                translations.append(directory)
+                entries.append((directory, None))
 
-                # -- Debug
-                # -- print(f"{directory}")
-
-        for file in sorted(files):
+        for file in files:
 
             # Discard the files inside the ice-build folders
             if root.find("ice-build") == -1:
@@ -499,30 +730,36 @@ def _find_texts(path, translations, ext=".ice"):
                 if file.endswith(ext):
 
                     # Append files
-                    translations.append(os.path.splitext(file)[0])
                     filepath = os.path.join(root, file)
-                    _find_texts_in_file(filepath, translations)
-
-                    # Debug
-                    # print(file)
-
-
-PATTERN_DESC = r'"description":\s*"(.*?)"'
-PATTERN_INFO = r'"info":\s*"(.*?)",[\n|\s]*"readonly": true'
-
-
-def _find_texts_in_file(filepath, translations):
-    with open(filepath, "r", encoding="utf-8") as path:
-        project = path.read()
-        # Append descriptions
-        path = re.compile(PATTERN_DESC)
-        descriptions = path.findall(project)
-        for description in descriptions:
-            if description and description not in translations:
-                translations.append(description)
-        # Append basic.info blocks
-        path = re.compile(PATTERN_INFO)
-        infos = path.findall(project)
-        for info in infos:
-            if info and info not in translations:
-                translations.append(info)
+                    entries.append((os.path.splitext(file)[0], filepath))
+
+    return entries
+
+
+def _read_all_texts(filepaths, jobs, cache=None):
+    """Return the texts of every file (in the same order). The files
+    not in the cache are read by a pool of processes, if there are
+    enough of them
+    """
+
+    if cache is None:
+        cache = TextCache()
+
+    texts = [cache.get(filepath) for filepath in filepaths]
+    changed = [path for path, text in zip(filepaths, texts) if text is None]
+
+    jobs = min(jobs, len(changed) // FILES_PER_JOB)
+    if jobs <= 1:
+        read = [read_texts(filepath) for filepath in changed]
+    else:
+        # -- Every process reads several files at a time
+        chunksize = -(-len(changed) // (jobs * 4))
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            read = list(pool.map(read_texts, changed, chunksize=chunksize))
+
+    for filepath, text in zip(changed, read):
+        cache.put(filepath, text)
+
+    # -- Texts of the changed files, in their place
+    read = iter(read)
+    return [next(read) if text is None else text for text in texts]
@@ -0,0 +1,249 @@
+"""Upgrade installed development collections"""
+
+import os
+import sys
+import json
+import shutil
+import zipfile
+from pathlib import Path
+from typing import NamedTuple
+
+import click
+from icm.commons import commons
+from icm.commons.cache import ArchiveCache
+from icm.commons.inventory import file_crc
+from icm.commons.unzip import exchange, member_path
+from icm.commands import cmd_install
+
+# -- Size of the blocks copied when extracting the changed files
+COPY_CHUNK = 1024 * 1024
+
+
+class Changes(NamedTuple):
+    """Differences between an archive and an installed collection
+    * added: Files in the archive but not installed
+    * changed: Files with different contents
+    * removed: Installed files not in the archive
+    * unchanged: Files with the same contents
+    """
+
+    added: list
+    changed: list
+    removed: list
+    unchanged: list
+
+    @property
+    def empty(self) -> bool:
+        """There are no differences"""
+        return not (self.added or self.changed or self.removed)
+
+
+def main(names: tuple) -> None:
+    """ENTRY POINT: Upgrade collections
+    * names: Collection names (Ex. (iceK, iceIO))
+    """
+
+    # -- Get context information
+    folders = commons.Folders()
+    collection = commons.Collection(
+        folders, cache=ArchiveCache(folders.archives)
+    )
+
+    print()
+
+    for name in names:
+        upgrade_collection(collection, name)
+
+
+def upgrade_collection(collection: commons.Collection, name: str) -> None:
+    """Upgrade the development version of the given collection
+    (Ex. iceK-main). Only the files that have changed are written
+    If it is not installed, it is installed
+    * collection: Collection class (Context)
+    * name: Collection name (Ex. iceK)
+    """
+
+    nametag = collection.nametag(name)
+    installed = collection.folders.collections / nametag
+
+    # -- Not installed yet: install it
+    if not installed.exists():
+        cmd_install.install(collection, name)
+        return
+
+    click.secho(f"Upgrading collection {nametag}", fg="yellow")
+
+    # -- Get the latest archive (it is downloaded only if it has changed)
+    try:
+        archive = cmd_install.cached_archive(collection, name)
+    except commons.DownloadError as exc:
+        click.secho(str(exc), fg="red")
+        sys.exit(1)
+
+    manifest_file = collection.folders.manifests / f"{nametag}.json"
+    changes = upgrade_tree(archive, installed, manifest_file)
+
+    if changes.empty:
+        click.secho("  Already up to date", fg="green")
+        return
+
+    # -- The new contents are the ones of the archive
+    with zipfile.ZipFile(archive, "r") as zip_ref:
+        cmd_install.register(collection, name, members=zip_ref.infolist())
+
+    click.secho(
+        f"  + {len(changes.added)} added, "
+        f"~ {len(changes.changed)} changed, "
+        f"- {len(changes.removed)} removed, "
+        f"= {len(changes.unchanged)} unchanged",
+        fg="yellow",
+    )
+    click.secho("Done!", fg="green")
+
+
+def upgrade_tree(archive: Path, installed: Path, manifest_file: Path):
+    """Make the installed folder equal to the contents of the archive
+    A new folder is built next to the installed one: the unchanged
+    files are hard linked (not copied) and only the new and changed
+    files are extracted. Then the folders are swapped (atomically)
+    Only the changed files are written, but a link is created for every
+    unchanged one: the cost of building the new folder depends on the
+    total number of files, not only on the changed ones
+    * archive: Collection zip file. All its members are inside a top
+      folder (Ex. iceK-main/)
+    * installed: Folder of the installed collection
+    * manifest_file: File with the sizes, times and CRCs of the installed
+      files, so that they do not need to be read again
+    Return the Changes
+    """
+
+    manifest = _load_manifest(manifest_file)
+
+    with zipfile.ZipFile(archive, "r") as zip_ref:
+
+        # -- Members in the archive by their path, without the top folder
+        members = {}
+        for info in zip_ref.infolist():
+            path = info.filename.partition("/")[2]
+            if path:
+                members[path] = info
+
+        # -- Compare the archive with the installed files
+        changes = diff(members, installed, manifest)
+
+        if changes.empty:
+            _save_manifest(manifest_file, installed, members)
+            return changes
+
+        # -- Build the new folder
+        staging = installed.with_name(f".{installed.name}.upgrade")
+        shutil.rmtree(staging, ignore_errors=True)
+        staging.mkdir()
+
+        unchanged = set(changes.unchanged)
+        for path, info in members.items():
+            target = member_path(staging, path)
+
+            if info.is_dir():
+                target.mkdir(parents=True, exist_ok=True)
+                continue
+
+            target.parent.mkdir(parents=True, exist_ok=True)
+
+            if path in unchanged:
+                _link(member_path(installed, path), target)
+            else:
+                with zip_ref.open(info) as src, open(target, "wb") as dst:
+                    shutil.copyfileobj(src, dst, COPY_CHUNK)
+
+    # -- Swap the folders
+    exchange(staging, installed)
+
+    _save_manifest(manifest_file, installed, members)
+    return changes
+
+
+def diff(members: dict, installed: Path, manifest: dict) -> Changes:
+    """Compare the members of an archive with the installed files
+    The files are compared by size and CRC-32. The CRC of an installed
+    file is only calculated if its size or time are not the ones
+    stored in the manifest
+    * members: ZipInfo of the archive members, by path
+    * installed: Folder of the installed collection
+    * manifest: Size, time (ns) and CRC of the installed files, by path
+    """
+
+    # -- Installed files, by path
+    files = {
+        file.relative_to(installed).as_posix(): file
+        for file in installed.rglob("*")
+        if file.is_file()
+    }
+
+    changes = Changes([], [], [], [])
+
+    for path, info in sorted(members.items()):
+        if info.is_dir():
+            continue
+
+        file = files.pop(path, None)
+        if file is None:
+            changes.added.append(path)
+        elif _same(file, info, manifest.get(path)):
+            changes.unchanged.append(path)
+        else:
+            changes.changed.append(path)
+
+    changes.removed.extend(sorted(files))
+    return changes
+
+
+def _same(file: Path, info: zipfile.ZipInfo, entry) -> bool:
+    """Check if the installed file has the same contents as the member
+    * entry: Manifest entry of the file [size, time, crc] (or None)
+    """
+
+    stat = file.stat()
+    if stat.st_size != info.file_size:
+        return False
+
+    # -- The file has not been modified since the manifest was written
+    if entry and entry[:2] == [stat.st_size, stat.st_mtime_ns]:
+        return entry[2] == info.CRC
+
+    return file_crc(file) == info.CRC
+
+
+def _link(src: Path, dest: Path) -> None:
+    """Hard link the file. It is copied if links are not supported"""
+
+    try:
+        os.link(src, dest)
+    except OSError:
+        shutil.copy2(src, dest)
+
+
+def _load_manifest(manifest_file: Path) -> dict:
+    """Read the manifest of an installed collection"""
+
+    try:
+        with open(manifest_file, "r", encoding="utf-8") as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        return {}
+
+
+def _save_manifest(manifest_file: Path, installed: Path, members: dict):
+    """Write the manifest of an installed collection: size, time and
+    CRC of every file
+    """
+
+    manifest = {}
+    for path, info in members.items():
+        if not info.is_dir():
+            stat = member_path(installed, path).stat()
+            manifest[path] = [stat.st_size, stat.st_mtime_ns, info.CRC]
+
+    manifest_file.parent.mkdir(parents=True, exist_ok=True)
+    with open(manifest_file, "w", encoding="utf-8") as file:
+        json.dump(manifest, file)
@@ -14,11 +14,11 @@
 #              - (semantic) version
 #              - description
 
-import os
-import json
 import click
 import semantic_version
 
+from icm.commons import collection
+
 
 def validate():
     """Validate a collection."""
@@ -31,50 +31,52 @@ def validate():
         click.secho("\nThe collection is not valid :(", fg="red")
 
 
-def validate_collection():
-    """Docstrig"""
+def validate_collection(model=None):
+    """Check that the collection in the current folder is valid
+    * model: Collection model (scanned if not given)
+    """
     valid = True
 
-    if not (os.path.isdir("blocks") or os.path.isdir("examples")):
+    if model is None:
+        model = scan_collection()
+
+    if not (model.blocks or model.examples):
         valid &= False
         click.secho(
             " - Error: no directory `blocks` or `examples` found", fg="yellow"
         )
 
-    if not os.path.isfile("package.json"):
+    if model.package is None:
         valid &= False
         click.secho(" - Error: no file `package.json` found", fg="yellow")
     else:
-        valid = _validate_package_file(valid)
+        valid = _validate_package_file(valid, model.package)
 
     return valid
 
 
-def _validate_package_file(valid):
-    try:
-        with open("package.json", "r", encoding="utf-8") as data:
-            package = json.load(data)
-            keys = package.keys()
-            valid = _check_key("name", keys, valid, lambda x: package[x])
-            valid = _check_key(
-                "description", keys, valid, lambda x: package[x]
-            )
-            valid = _check_key(
-                "version",
-                keys,
-                valid,
-                lambda x: semantic_version.validate(package[x]),
-            )
-            valid = _check_key("keywords", keys, valid)
-            valid = _check_key("license", keys, valid)
+def scan_collection():
+    """Return the model of the collection in the current folder"""
 
+    try:
+        return collection.scan()
     except ValueError:
         print("Error!: ValueError")
         raise
-    # except Exception as exc:
-    #     valid &= False
-    #     click.secho(str(exc), fg="red")
 
+
+def _validate_package_file(valid, package):
+    keys = package.keys()
+    valid = _check_key("name", keys, valid, lambda x: package[x])
+    valid = _check_key("description", keys, valid, lambda x: package[x])
+    valid = _check_key(
+        "version",
+        keys,
+        valid,
+        lambda x: semantic_version.validate(package[x]),
+    )
+    valid = _check_key("keywords", keys, valid)
+    valid = _check_key("license", keys, valid)
     return valid
 
 
@@ -0,0 +1,39 @@
+"""Default values of the command options
+
+They are here, and not in the commands, so that the command line can
+show them (icm --help) without importing the commands and their
+dependencies (requests, tqdm...)
+"""
+
+import os
+
+# -- Number of largest subfolders shown for every collection (icm du)
+DU_TOP = 3
+
+# -- Default maximum number of results (icm search)
+SEARCH_LIMIT = 20
+
+# -- Default lock file (icm lock, icm sync)
+LOCK_FILE = "icm.lock"
+
+# -- Number of collections resolved / installed at the same time
+# -- (icm lock, icm sync)
+LOCK_JOBS = 4
+
+# -- Number of package.json files downloaded at the same time (icm lsgit)
+LIST_JOBS = 8
+
+# -- Maximum time (seconds) for getting all the package.json files
+# -- The collections not received yet are shown as not available
+LIST_DEADLINE = 15
+
+# -- Number of collections refreshed at the same time (icm index)
+INDEX_JOBS = 8
+
+# -- Number of processes reading the .ice files (icm update)
+UPDATE_JOBS = os.cpu_count() or 1
+
+# -- Policies for the files with changes (icm update): ask before
+# -- replacing them, replace them always or never. The default is ask
+# -- (always when watching)
+UPDATE_WRITE = ("ask", "always", "never")
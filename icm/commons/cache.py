@@ -0,0 +1,385 @@
+"""Local cache of the downloaded collection archives"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from pathlib import Path
+from typing import NamedTuple
+
+# -- Default maximum size of the cache (bytes). When it is exceeded
+# -- the least recently used archives are removed
+MAX_SIZE = 1024 * 1024 * 1024
+
+# -- Name of the cache index file
+INDEX_FILE = "index.json"
+
+# -- Size of the blocks read when calculating the digests
+HASH_CHUNK = 1024 * 1024
+
+# -- Suffix of the download lock files
+LOCK_SUFFIX = ".lock"
+
+# -- Lock file of the index, shared by all the icm processes
+INDEX_LOCK = "index.lock"
+
+
+class CacheEntry(NamedTuple):
+    """Archive stored in the cache
+    * name: Collection name (Ex. iceK)
+    * ref: Git reference (Ex. tags/v0.1.4, heads/main)
+    * url: Url from where it was downloaded
+    * digest: sha256 of the archive. It is also its filename
+    * size: Archive size in bytes
+    * etag: ETag returned by the server ("" if none)
+    * created: Time when it was downloaded (seconds since the epoch)
+    * used: Time when it was used for the last time
+    """
+
+    name: str
+    ref: str
+    url: str
+    digest: str
+    size: int
+    etag: str = ""
+    created: float = 0
+    used: float = 0
+
+    @property
+    def key(self) -> str:
+        """Return the key of the entry in the cache (Ex. iceK@tags/v0.1.4)"""
+        return entry_key(self.name, self.ref)
+
+    @property
+    def mutable(self) -> bool:
+        """Branches can change. They should be revalidated"""
+        return not self.ref.startswith("tags/")
+
+
+def entry_key(name: str, ref: str) -> str:
+    """Return the cache key for the given collection name and ref"""
+    return f"{name}@{ref}"
+
+
+def file_digest(path: Path) -> str:
+    """Return the sha256 (hex string) of the given file"""
+
+    sha = hashlib.sha256()
+    with open(path, "rb") as file:
+        while chunk := file.read(HASH_CHUNK):
+            sha.update(chunk)
+    return sha.hexdigest()
+
+
+class ArchiveCache:
+    """Content addressed cache of collection archives
+    The archives are stored by their sha256 digest in the blobs folder.
+    An index file associates every collection name + ref with its archive
+
+    * folder: Cache folder (Ex. ~/.icestudio/icm-cache/archives)
+    * max_size: Maximum size in bytes
+    """
+
+    def __init__(self, folder: Path, max_size: int = MAX_SIZE) -> None:
+        self.folder = folder
+        self.max_size = max_size
+
+        # -- The index is modified by several threads when installing
+        # -- collections in parallel (and by other icm processes: see
+        # -- _index_lock)
+        self._lock = threading.Lock()
+
+    @property
+    def blobs(self) -> Path:
+        """Folder where the archives are stored"""
+        return self.folder / "blobs"
+
+    @property
+    def index_file(self) -> Path:
+        """Cache index file"""
+        return self.folder / INDEX_FILE
+
+    def path(self, entry: CacheEntry) -> Path:
+        """Return the path of the archive of the given entry"""
+        return self.blobs / f"{entry.digest}.zip"
+
+    @property
+    def downloads(self) -> Path:
+        """Folder where the archives are downloaded before being stored"""
+        return self.folder / "downloads"
+
+    def tmpfile(self, name: str, ref: str) -> Path:
+        """Return the file for downloading the given archive, before
+        storing it in the cache. It is always the same for the same
+        collection and ref, so that interrupted downloads can be resumed
+        (Ex. downloads/iceK@tags-v0.1.4.zip). It should only be used
+        while holding the download_lock() of the archive
+        """
+        self.downloads.mkdir(parents=True, exist_ok=True)
+        filename = entry_key(name, ref).replace("/", "-")
+        return self.downloads / f"{filename}.zip"
+
+    @contextmanager
+    def download_lock(self, name: str, ref: str):
+        """Exclusive lock of the download of the given archive (its
+        tmpfile and .part file), between processes and threads. The
+        other ones wait, and then find the archive already in the cache
+        (Ex. downloads/iceK@tags-v0.1.4.lock)
+        """
+
+        lock_file = self.tmpfile(name, ref).with_suffix(LOCK_SUFFIX)
+        with open(lock_file, "a+b") as file:
+            _lock(file)
+            try:
+                yield
+            finally:
+                _unlock(file)
+
+    @contextmanager
+    def _index_lock(self):
+        """Exclusive lock of the index, between threads and processes
+        (Ex. two CI jobs sharing the cache). The index should be read,
+        modified and saved while holding it, so that the changes of
+        the other processes are not lost. The same for removing blobs:
+        another process could have just stored them
+        """
+
+        self.folder.mkdir(parents=True, exist_ok=True)
+        with self._lock, open(self.folder / INDEX_LOCK, "a+b") as file:
+            _lock(file)
+            try:
+                yield
+            finally:
+                _unlock(file)
+
+    def lookup(self, name: str, ref: str) -> CacheEntry:  # or None
+        """Return the cache entry of the given collection name and ref
+        None is returned if it is not in the cache
+        """
+
+        with self._lock:
+            index = self._load()
+
+        data = index["entries"].get(entry_key(name, ref))
+        if not data:
+            return None
+
+        entry = CacheEntry(**data)
+
+        # -- The archive was removed from the cache
+        if not self.path(entry).exists():
+            return None
+
+        return entry
+
+    def hit(self, entry: CacheEntry) -> None:
+        """The archive has been used from the cache. Update its time
+        (for the LRU) and the statistics
+        """
+
+        with self._index_lock():
+            index = self._load()
+            index["hits"] += 1
+            data = index["entries"].get(entry.key)
+            if data:
+                data["used"] = time.time()
+            self._save(index)
+
+    def store(
+        self, name: str, ref: str, url: str, archive: Path, etag=""
+    ) -> CacheEntry:
+        """Store the given downloaded archive in the cache. The file
+        is moved into the cache
+        * name: Collection name
+        * ref: Git reference (Ex. tags/v0.1.4)
+        * url: Url from where it was downloaded
+        * archive: Downloaded file
+        * etag: ETag returned by the server
+        Return the new cache entry
+        """
+
+        digest = file_digest(archive)
+        now = time.time()
+        entry = CacheEntry(
+            name,
+            ref,
+            url,
+            digest,
+            archive.stat().st_size,
+            etag,
+            created=now,
+            used=now,
+        )
+
+        with self._index_lock():
+            # -- Same contents, same file
+            self.blobs.mkdir(parents=True, exist_ok=True)
+            os.replace(archive, self.path(entry))
+
+            index = self._load()
+            index["misses"] += 1
+            index["entries"][entry.key] = entry._asdict()
+            self._evict(index, keep=entry.key)
+            self._save(index)
+
+        return entry
+
+    def entries(self) -> list:
+        """Return all the entries in the cache, sorted by key"""
+
+        with self._lock:
+            index = self._load()
+
+        return [
+            CacheEntry(**data) for _, data in sorted(index["entries"].items())
+        ]
+
+    def stats(self) -> dict:
+        """Return the cache statistics
+        * entries: Number of entries
+        * size: Total size of the archives (bytes)
+        * max_size: Maximum size of the cache
+        * hits: Number of archives used from the cache
+        * misses: Number of archives downloaded
+        """
+
+        with self._lock:
+            index = self._load()
+
+        return {
+            "entries": len(index["entries"]),
+            "size": _total_size(index),
+            "max_size": self.max_size,
+            "hits": index["hits"],
+            "misses": index["misses"],
+        }
+
+    def clean(self, names=()) -> int:
+        """Remove the entries of the given collections. If no names are
+        given, all the cache is removed
+        Return the number of bytes freed
+        """
+
+        with self._index_lock():
+            index = self._load()
+            size = _total_size(index)
+
+            index["entries"] = {
+                key: data
+                for key, data in index["entries"].items()
+                if names and data["name"] not in names
+            }
+            self._remove_orphans(index)
+            self._save(index)
+
+            # -- Remove also the interrupted downloads (not the locks:
+            # -- they could be held by other processes)
+            if not names and self.downloads.exists():
+                for file in self.downloads.iterdir():
+                    if file.suffix != LOCK_SUFFIX:
+                        file.unlink(missing_ok=True)
+
+        return size - _total_size(index)
+
+    def _evict(self, index: dict, keep: str) -> None:
+        """Remove the least recently used entries until the cache size
+        is below the maximum. The entry with the key keep is never removed
+        """
+
+        by_age = sorted(
+            index["entries"].items(), key=lambda item: item[1]["used"]
+        )
+
+        for key, _ in by_age:
+            if _total_size(index) <= self.max_size:
+                break
+            if key != keep:
+                del index["entries"][key]
+
+        self._remove_orphans(index)
+
+    def _remove_orphans(self, index: dict) -> None:
+        """Remove the archives not used by any entry"""
+
+        used = {data["digest"] for data in index["entries"].values()}
+
+        if not self.blobs.exists():
+            return
+
+        for blob in self.blobs.glob("*.zip"):
+            if blob.stem not in used:
+                blob.unlink(missing_ok=True)
+
+    def _load(self) -> dict:
+        """Read the index file"""
+
+        index = {"entries": {}, "hits": 0, "misses": 0}
+
+        try:
+            with open(self.index_file, "r", encoding="utf-8") as file:
+                index.update(json.load(file))
+
+        # -- No index yet, or it is corrupted: start again
+        except (OSError, ValueError):
+            pass
+
+        return index
+
+    def _save(self, index: dict) -> None:
+        """Write the index file. A temporary file is written first,
+        so that the index is never left half written
+        """
+
+        self.folder.mkdir(parents=True, exist_ok=True)
+        tmp = self.index_file.with_suffix(f".{uuid.uuid4().hex}.tmp")
+        with open(tmp, "w", encoding="utf-8") as file:
+            json.dump(index, file, indent=1)
+        os.replace(tmp, self.index_file)
+
+
+def _total_size(index: dict) -> int:
+    """Return the size of all the (different) archives in the index"""
+
+    sizes = {
+        data["digest"]: data["size"] for data in index["entries"].values()
+    }
+    return sum(sizes.values())
+
+
+def _lock(file) -> None:
+    """Take an exclusive lock of the open file. Wait until it is free"""
+
+    # -- Windows: the first byte is locked. LK_LOCK gives up after 10
+    # -- seconds: try again
+    if os.name == "nt":  # pragma: no cover
+        import msvcrt  # pylint: disable=C0415,E0401
+
+        file.seek(0)
+        while True:
+            try:
+                msvcrt.locking(file.fileno(), msvcrt.LK_LOCK, 1)
+                return
+            except OSError:
+                continue
+
+    import fcntl  # pylint: disable=C0415
+
+    fcntl.flock(file.fileno(), fcntl.LOCK_EX)
+
+
+def _unlock(file) -> None:
+    """Release the lock of the open file"""
+
+    if os.name == "nt":  # pragma: no cover
+        import msvcrt  # pylint: disable=C0415,E0401
+
+        file.seek(0)
+        msvcrt.locking(file.fileno(), msvcrt.LK_UNLCK, 1)
+        return
+
+    import fcntl  # pylint: disable=C0415
+
+    fcntl.flock(file.fileno(), fcntl.LOCK_UN)
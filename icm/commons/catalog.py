@@ -0,0 +1,107 @@
+"""Local catalog of the collections in the store"""
+
+import json
+import os
+import time
+import uuid
+from pathlib import Path
+from typing import NamedTuple
+
+
+class CatalogEntry(NamedTuple):
+    """Collection in the catalog
+    * name: Collection name (Ex. iceK)
+    * kind: "stable" or "dev"
+    * version: Latest version (Ex. 0.1.4)
+    * description: Collection description (from its package.json)
+    * url: Url of the archive of the latest version (main branch for
+      the dev collections)
+    * size: Archive size in bytes (0 if not known)
+    * digest: sha256 of the archive ("" if not known)
+    * updated: Time when the entry was refreshed (seconds since the epoch)
+    """
+
+    name: str
+    kind: str
+    version: str
+    description: str
+    url: str
+    size: int = 0
+    digest: str = ""
+    updated: float = 0
+
+    @property
+    def package(self) -> dict:
+        """Return the entry as a (reduced) package.json object"""
+        return {
+            "name": self.name,
+            "version": self.version,
+            "description": self.description,
+        }
+
+
+class Catalog:
+    """Catalog of collections stored in a JSON lines file: one entry
+    per line, in the store order
+    * path: Catalog file (Ex. ~/.icestudio/icm-cache/catalog.jsonl)
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+
+        # -- Entries by name. They are read when used for the first time
+        self._entries = None
+
+    def exists(self) -> bool:
+        """Check if the catalog has been built"""
+        return self.path.exists()
+
+    @property
+    def entries(self) -> dict:
+        """Return the catalog entries, by collection name"""
+
+        if self._entries is None:
+            self._entries = self._load()
+        return self._entries
+
+    def get(self, name: str, max_age: float = None) -> CatalogEntry:
+        """Return the entry of the given collection (None if not found)
+        * max_age: If given, the entries refreshed longer ago (seconds)
+          are not returned either: they could be outdated
+        """
+
+        entry = self.entries.get(name)
+        if entry and max_age is not None:
+            if time.time() - entry.updated >= max_age:
+                return None
+        return entry
+
+    def save(self, entries: list) -> None:
+        """Write the catalog with the given entries. A temporary file is
+        written first, so that the catalog is never left half written
+        """
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(f".{uuid.uuid4().hex}.tmp")
+        with open(tmp, "w", encoding="utf-8") as file:
+            for entry in entries:
+                file.write(json.dumps(entry._asdict()) + "\n")
+        os.replace(tmp, self.path)
+
+        self._entries = {entry.name: entry for entry in entries}
+
+    def _load(self) -> dict:
+        """Read the catalog file"""
+
+        entries = {}
+        try:
+            with open(self.path, "r", encoding="utf-8") as file:
+                for line in file:
+                    entry = CatalogEntry(**json.loads(line))
+                    entries[entry.name] = entry
+
+        # -- No catalog yet, or it is corrupted
+        except (OSError, ValueError, TypeError):
+            return {}
+
+        return entries
@@ -0,0 +1,94 @@
+"""In-memory model of a collection folder (icm update, icm validate)
+
+The collection is scanned only once: its blocks and examples trees,
+its locales and its package.json. All the steps of icm update (the
+validation, the README and the translation texts) use the same model
+"""
+
+import os
+import json
+from typing import NamedTuple
+
+# -- Folders and files of a collection
+BLOCKS_FOLDER = "blocks"
+EXAMPLES_FOLDER = "examples"
+LOCALE_FOLDER = "locale"
+PACKAGE_FILE = "package.json"
+
+
+class Folder(NamedTuple):
+    """Folder of a tree, as given by os.walk
+    * root: Folder path (Ex. blocks/Logic)
+    * dirs: Names of its subfolders (sorted)
+    * files: Names of its files (sorted)
+    """
+
+    root: str
+    dirs: list
+    files: list
+
+
+class Collection(NamedTuple):
+    """Collection folder
+    * blocks: Folders of the blocks tree, sorted by their path. Empty if
+      there is no blocks folder
+    * examples: Folders of the examples tree (the same as blocks)
+    * locales: (locale, .po file) of every locale folder with its .po
+      file (Ex. ("es_ES", "locale/es_ES/es_ES.po"))
+    * package: Contents of the package.json file (None if not found)
+    """
+
+    blocks: list
+    examples: list
+    locales: list
+    package: dict
+
+
+def walk(path: str) -> list:
+    """Return the Folders of the tree in the given path, sorted by their
+    path (the same order as sorted(os.walk(path)))
+    """
+
+    return [
+        Folder(root, sorted(dirs), sorted(files))
+        for root, dirs, files in sorted(os.walk(path))
+    ]
+
+
+def read_locales() -> list:
+    """Return the (locale, .po file) of every locale folder with its
+    .po file (in the current folder)
+    """
+
+    locales = []
+    if os.path.isdir(LOCALE_FOLDER):
+        for lang in os.listdir(LOCALE_FOLDER):
+            pofile = os.path.join(LOCALE_FOLDER, lang, lang + ".po")
+            if os.path.isfile(pofile):
+                locales.append((lang, pofile))
+    return locales
+
+
+def read_package():
+    """Return the contents of the package.json file (in the current
+    folder). None if it does not exist. ValueError if it is not valid
+    JSON
+    """
+
+    if not os.path.isfile(PACKAGE_FILE):
+        return None
+    with open(PACKAGE_FILE, "r", encoding="utf-8") as file:
+        return json.load(file)
+
+
+def scan() -> Collection:
+    """Return the model of the collection in the current folder
+    A package.json file that is not valid JSON raises a ValueError
+    """
+
+    return Collection(
+        walk(BLOCKS_FOLDER),
+        walk(EXAMPLES_FOLDER),
+        read_locales(),
+        read_package(),
+    )
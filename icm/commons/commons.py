@@ -1,61 +1,92 @@
 """Data structures common to all the modules"""
 
+import os
 import re
-import sys
+import time
+import queue
 import zipfile
-import shutil
+import tempfile
+import threading
+from contextlib import ExitStack
 from typing import NamedTuple
 from pathlib import Path
 
 import requests
-import click
+import urllib3
 from tqdm import tqdm
 
+from icm.commons.cache import ArchiveCache
+from icm.commons import context
+from icm.commons.metadata import DEFAULT_TTL, MetadataCache
+from icm.commons.transport import Transport, get_transport
+from icm.commons.unzip import StreamExtractor, extract_parallel, staging
 
-# -- Context information
-class Context(NamedTuple):
-    """general Context information"""
+# -- Maximum size of the zip files kept in memory while they are
+# -- streamed. Bigger files are spooled to an anonymous temporary file
+SPOOL_MEMORY = 16 * 1024 * 1024
 
-    @property
-    def terminal_width(self) -> int:
-        """Get the terminal with in columns"""
-        return shutil.get_terminal_size().columns
+# -- Size of the blocks read from the network when streaming
+STREAM_CHUNK = 64 * 1024
 
-    @property
-    def line(self) -> str:
-        """Return a line as long as the terminal width"""
-        return "─" * self.terminal_width
+# -- Size of the buffer used for downloading the zip files
+BUFFER_SIZE = 1024 * 1024
 
+# -- Minimum time (in seconds) between progress bar updates
+PROGRESS_INTERVAL = 0.2
 
-# -- Folder information
-class Folders(NamedTuple):
-    """Icestudio related folders"""
+# -- Default number of threads for uncompressing a zip file
+UNZIP_JOBS = context.JOBS
 
-    @property
-    def home(self) -> Path:
-        """Return the home user folder"""
-        return Path.home()
+# -- Minimum number of files in a zip for uncompressing it in parallel
+PARALLEL_UNZIP = 64
 
-    @property
-    def icestudio(self) -> Path:
-        """Return the icestudio data folder"""
-        return self.home / ".icestudio"
+# -- Context information. They are in their own (light) module, but
+# -- the commands can still use them from here
+Context = context.Context
+Folders = context.Folders
 
-    @property
-    def collections(self) -> Path:
-        """Return the icestudio collections folder"""
-        return self.icestudio / "collections"
+# -- Number of attempts for downloading a collection
+RETRIES = 5
+
+# -- Seconds to wait before the first retry. It is doubled every time
+RETRY_DELAY = 1
+
+
+class DownloadError(Exception):
+    """The collection could not be downloaded"""
+
+
+class RetryableError(DownloadError):
+    """Temporary error when downloading. The download can be retried"""
 
-    @staticmethod
-    def check(folder: Path) -> str:
-        """Return a check character depending if the folder exists
-        ✅ : Folder exists
-        ❌ : Folder does NOT exist
-        """
-        return "✅ " if folder.exists() else "❌ "
 
+# -- Errors that can be solved by retrying the download
+# -- The urllib3 errors are raised when reading the raw response
+RETRY_ERRORS = (
+    requests.ConnectionError,
+    requests.Timeout,
+    requests.exceptions.ChunkedEncodingError,
+    urllib3.exceptions.ProtocolError,
+    urllib3.exceptions.ReadTimeoutError,
+    RetryableError,
+)
 
-class Collection:
+
+class DownloadResult(NamedTuple):
+    """Result of a collection download
+    * modified: False if the server answered that the file has not
+      changed (conditional download). Nothing was downloaded
+    * etag: ETag of the file given by the server ("" if none)
+    * members: ZipInfo of the members of the collection zip file, when
+      it was uncompressed (download_extract)
+    """
+
+    modified: bool
+    etag: str = ""
+    members: list = None
+
+
+class Collection:  # pylint: disable=too-many-instance-attributes
     """Manage collections"""
 
     #   Oficial icestudio Collection are zip files downloaded
@@ -75,9 +106,45 @@ class Collection:
     GITHUB_TYPE_VER = "tags/"
     PACKAGEJSON = "/raw/main/package.json"
 
-    def __init__(self, folders: Folders) -> None:
+    def __init__(  # pylint: disable=too-many-arguments
+        self,
+        folders: Folders,
+        progress: bool = True,
+        transport: Transport = None,
+        stream: bool = True,
+        cache: ArchiveCache = None,
+        *,
+        metadata: MetadataCache = None,
+    ) -> None:
         self.folders = folders
 
+        # -- Show the progress bars or not. When several collections
+        # -- are installed at the same time the bars are disabled
+        self.progress = progress
+
+        # -- Uncompress the collections while they are downloaded
+        # -- (True) or download the zip file first (False)
+        self.stream = stream
+
+        # -- Cache of the downloaded archives (None: no cache)
+        self.cache = cache
+
+        # -- Cache of the package.json files (None: no cache)
+        self.metadata = metadata
+
+        # -- Offline mode: only the caches are used. Nothing is downloaded
+        self.offline = False
+
+        # -- Number of threads used for uncompressing the zip files
+        self.unzip_jobs = UNZIP_JOBS
+
+        # -- Download buffers (one per thread)
+        self._buffers = threading.local()
+
+        # -- HTTP transport. By default the one shared by all the
+        # -- commands is used, so the connections are reused
+        self.transport = transport or get_transport()
+
     def filename(self, version="") -> str:
         """Return the coleccion filename, according to its version
          No Path. No url. Just the .zip filename
@@ -97,11 +164,19 @@ class Collection:
         # -- Return the name according to the version type
         return name_ver if version else name_dev
 
-    def abs_filename(self, version="") -> Path:
+    def abs_filename(self, version="", name="") -> Path:
         """Return the absolute path of the collection target filename
         ex: /home/obijuan/.icestudio/collections/v0.1.4.zip
+
+        If the collection name is given, it is used as a prefix, so that
+        different collections can be downloaded at the same time
+        ex: /home/obijuan/.icestudio/collections/iceK-v0.1.4.zip
         """
-        abs_file = self.folders.collections / self.filename(version)
+        filename = self.filename(version)
+        if name:
+            filename = f"{name}-{filename}"
+
+        abs_file = self.folders.collections / filename
         return abs_file
 
     def url(self, name: str, version="") -> str:
@@ -112,20 +187,26 @@ class Collection:
         It return the url as a string
         """
 
-        # -- Get the colection filename
-        filename = self.filename(version)
+        # -- Build the url
+        url = f"{self.GITHUB_FPGAWARS}{name}{self.GITHUB_PREFIX}"
+        url += f"{self.ref(version)}.zip"
+
+        # -- Return the url
+        return url
+
+    def ref(self, version="") -> str:
+        """Return the git reference of the given version
+        * No version given: dev collection (Ex. "heads/main")
+        * version given: Stable collection (Ex. "tags/v0.1.4")
+        """
 
         # -- Get the type string
         github_type = self.GITHUB_TYPE_VER if version else self.GITHUB_TYPE_DEV
 
-        # -- Build the url
-        url = (
-            f"{self.GITHUB_FPGAWARS}{name}{self.GITHUB_PREFIX}"
-            f"{github_type}{filename}"
-        )
+        # -- The reference is the filename without the .zip
+        filename = Path(self.filename(version)).stem
 
-        # -- Return the url
-        return url
+        return f"{github_type}{filename}"
 
     def package_url(self, name: str) -> str:
         """Return the url of the package.json file for the given
@@ -150,61 +231,267 @@ class Collection:
         """
         return f"{name}-{version}" if version else f"{name}-main"
 
-    def download(self, url: str, destfile: Path):
+    def request(
+        self, url: str, etag="", offset=0, if_range=""
+    ) -> requests.Response:  # or None
+        """Request the collection given by its url
+        * etag: If given, the request is conditional: None is returned
+          if the collection has not changed in the server
+        * offset: If given, only the bytes from that offset are requested
+          (HTTP Range). The status is 206 if the server sends only that
+          part, or 200 if it sends the whole file
+        * if_range: ETag of the part already downloaded. The range is only
+          sent if the file has not changed
+        It raises DownloadError if the collection could not be downloaded
+        """
+
+        headers = {}
+        if etag:
+            headers["If-None-Match"] = etag
+        if offset:
+            headers["Range"] = f"bytes={offset}-"
+            if if_range:
+                headers["If-Range"] = if_range
+
+        # -- Generate an http request
+        response = self.transport.get(url, stream=True, headers=headers)
+
+        # -- Not changed since the last download
+        if etag and response.status_code == 304:
+            response.close()
+            return None
+
+        # -- Invalid range: the part already downloaded is not valid.
+        # -- Request the whole file
+        if offset and response.status_code == 416:
+            response.close()
+            return self.request(url, etag)
+
+        # -- Server errors: the download can be retried later
+        if response.status_code >= 500:
+            response.close()
+            raise RetryableError(
+                f"ERROR when downloading. Code: {response.status_code}"
+            )
+
+        # -- Check the status. If not ok, raise an error!
+        if response.status_code not in (200, 206) or (
+            response.status_code == 206 and not offset
+        ):
+            response.close()
+            raise DownloadError(
+                f"ERROR when downloading. Code: {response.status_code}"
+            )
+
+        return response
+
+    def download(self, url: str, destfile: Path, etag="") -> DownloadResult:
         """Download the collection given by its url.
         Store it in the given file
         A download bar is shown
+        If the etag is given, the file is only downloaded if it has changed
+
+        The data is written first in a .part file (Ex. v0.1.4.zip.part).
+        If the connection drops, the download is retried from where
+        it stopped (HTTP Range), even in the next execution of icm.
+        The size of the file is verified
+        The progress bar is only shown if something is downloaded (not
+        if the server answers that the file has not changed)
+        It raises DownloadError if the collection could not be downloaded
         """
 
+        part = part_file(destfile)
+        error = None
+        pbar = None
+
+        with ExitStack() as stack:
+
+            for attempt in range(RETRIES):
+
+                # -- Wait before retrying. Longer every time
+                if attempt:
+                    time.sleep(RETRY_DELAY * 2 ** (attempt - 1))
+
+                try:
+                    response, offset = self._request_part(url, part, etag)
+                    if response is None:
+                        return DownloadResult(modified=False, etag=etag)
+
+                    # Use a progress bar...
+                    if pbar is None:
+                        pbar = stack.enter_context(
+                            tqdm(
+                                unit="B",
+                                unit_scale=True,
+                                desc="• Download",
+                                disable=not self.progress,
+                            )
+                        )
+
+                    result = self._download_part(response, offset, part, pbar)
+
+                # -- Network problem: retry
+                except RETRY_ERRORS as exc:
+                    error = exc
+                    continue
+
+                # -- Download completed: rename the .part file
+                if result.modified:
+                    os.replace(part, destfile)
+                    _etag_file(part).unlink(missing_ok=True)
+
+                return result
+
+        raise DownloadError(f"ERROR when downloading: {error}") from error
+
+    def _request_part(self, url: str, part: Path, etag: str) -> tuple:
+        """Generate the http request for downloading the collection in
+        the part file. If the file already has data, only the rest is
+        asked for
+        Return the response (None if the collection has not changed)
+        and the offset where its data starts
+        """
+
+        # -- Bytes already downloaded. The ETag of the part file is
+        # -- needed for resuming it. Without it, start from the beginning
+        offset = part.stat().st_size if part.exists() else 0
+        part_etag = _read_etag(part) if offset else ""
+        if not part_etag:
+            offset = 0
+
         # -- Generate an http request
-        response = requests.get(url, stream=True, timeout=10)
+        response = self.request(url, etag, offset, part_etag)
 
-        # -- Check the status. If not ok, exit!
-        if response.status_code != 200:
-            click.secho(
-                f"ERROR when downloading. Code: {response.status_code}",
-                fg="red",
-            )
-            sys.exit(1)
+        # -- The server sends the whole file
+        if response is not None and response.status_code == 200:
+            offset = 0
+
+        return response, offset
+
+    def _download_part(
+        self, response: requests.Response, offset: int, part: Path, pbar: tqdm
+    ) -> DownloadResult:
+        """Write the data of the response in the part file, from the
+        given offset
+        It raises RetryableError if the download is not complete
+        """
+
+        # -- Remember the ETag, for resuming the file later
+        new_etag = response.headers.get("ETag", "")
+        _etag_file(part).write_text(new_etag, encoding="utf-8")
 
         # Get the file size (from the headers)
-        total_size = int(response.headers.get("content-length", 0))
+        total_size = _total_size(response, offset)
+        pbar.reset(total=total_size or None)
+        pbar.update(offset)
 
         # -- Open the destination file
-        with open(destfile, "wb") as file:
+        with response, open(part, "ab" if offset else "wb") as file:
+            self._copy(response, file, pbar)
 
-            # Use a progress bar...
-            with tqdm(
-                total=total_size,
-                unit="B",
-                unit_scale=True,
-                desc="• Download",
-            ) as pbar:
+        # -- Check the file size
+        size = part.stat().st_size
+        if total_size and size != total_size:
 
-                # Iterate over the blocks
-                for chunk in response.iter_content(chunk_size=1024):
+            # -- Too big: The file is not valid
+            if size > total_size:
+                part.unlink()
 
-                    # -- Make sure the block is not empty
-                    if chunk:
+            raise RetryableError(
+                f"Incomplete download: {size} of {total_size} bytes"
+            )
+
+        return DownloadResult(True, new_etag)
+
+    def _copy(self, response: requests.Response, file, pbar: tqdm) -> None:
+        """Write the body of the response into the given file
+        The data is read into a big buffer, allocated only once (per
+        thread) and reused for all the downloads. The progress bar is
+        redrawn every PROGRESS_INTERVAL seconds, not for every block
+        """
+
+        progress = _Progress(pbar)
+
+        # -- Compressed response: the data has to be decoded by requests
+        if response.headers.get("Content-Encoding", "identity") != "identity":
+            for chunk in response.iter_content(chunk_size=BUFFER_SIZE):
+                file.write(chunk)
+                progress.update(len(chunk))
+
+        # -- Read directly into the buffer. Write only the bytes
+        # -- read (memoryview: no copies)
+        else:
+            view = self._buffer()
+            while size := response.raw.readinto(view):
+                file.write(view[:size])
+                progress.update(size)
+
+        progress.flush()
+
+    def _buffer(self) -> memoryview:
+        """Return the download buffer of the current thread"""
 
-                        # Write data!
-                        file.write(chunk)
+        if not hasattr(self._buffers, "view"):
+            self._buffers.view = memoryview(bytearray(BUFFER_SIZE))
+        return self._buffers.view
 
-                        # Update pogress bar
-                        pbar.update(len(chunk))
+    def catalog_age(self) -> float:  # Or None
+        """Return the maximum age (seconds) of the catalog entries that
+        can be used instead of the package.json files. It is the same
+        TTL as the one of the cached package.json files. None (no
+        limit) in offline mode
+        """
+
+        if self.offline:
+            return None
+        return self.metadata.ttl if self.metadata else DEFAULT_TTL
 
     def download_package(self, url: str) -> object:  # Or  None:
         """Download the package.json as an object
         url: package.json url
         Returns: The package.json as an object
           or None if there was an error
+
+        If there is a metadata cache, the cached package.json is used
+        while it is fresh (TTL). Then it is revalidated with the server.
+        If the server can not be reached, the cached one is used
+        In offline mode only the cache is used
         """
-        # -- Generate an http request
+
+        entry = self.metadata.lookup(url) if self.metadata else None
+
+        # -- Use the cached package.json
+        if entry and (self.offline or self.metadata.fresh(entry)):
+            return entry.package
+
+        if self.offline:
+            return None
+
         try:
-            response = requests.get(url, timeout=10)
-        except requests.exceptions.ReadTimeout:
+            return self._revalidate_package(url, entry)
+
+        # -- The server can not be reached: use the cached one (if any)
+        except requests.exceptions.Timeout:
             print("TIMEOUT!")
-            return None
+        except requests.exceptions.ConnectionError:
+            pass
+
+        return entry.package if entry else None
+
+    def _revalidate_package(self, url: str, entry) -> object:  # Or None
+        """Download the package.json if it has changed in the server
+        * entry: Cached package.json (PackageEntry) or None
+        """
+
+        # -- Ask only for the changes
+        headers = {"If-None-Match": entry.etag} if entry and entry.etag else {}
+
+        # -- Generate an http request
+        response = self.transport.get(url, headers=headers)
+
+        # -- Not modified: the cached one is still valid
+        if response.status_code == 304 and entry:
+            return self.metadata.touch(entry).package
 
         # -- Check the status. If not ok, exit!
         if response.status_code != 200:
@@ -212,34 +499,195 @@ class Collection:
 
         # -- Return the package object
         package = response.json()
+
+        if self.metadata:
+            etag = response.headers.get("ETag", "")
+            self.metadata.store(url, package, etag)
+
         return package
 
+    def download_extract(
+        self, url: str, etag="", archive: Path = None
+    ) -> DownloadResult:
+        """Download the collection given by its url and uncompress it
+        at the same time in the icestudio collection folder
+        No zip file is created in the collections folder. The zip is
+        kept in memory (or in an anonymous temporary file if it is big)
+        It is uncompressed in a hidden staging folder, and moved into
+        place only when it is complete
+        A download bar is shown
+        * etag: If given, the collection is only downloaded if it has changed
+        * archive: If given, the zip file is also saved there (for caching)
+          It is written first in its .part file. If the download fails,
+          the .part file is kept: download() can resume it later
+        It raises DownloadError if the collection could not be downloaded
+        """
+
+        # -- Generate an http request
+        response = self._request_retry(url, etag)
+        if response is None:
+            return DownloadResult(modified=False, etag=etag)
+
+        # Get the file size (from the headers)
+        total_size = _total_size(response)
+        new_etag = response.headers.get("ETag", "")
+
+        # -- The blocks are read from the network in another thread
+        # -- so that downloading and uncompressing are done at the
+        # -- same time
+        reader = _BlockReader(self, url, response)
+        reader.start()
+
+        # -- Remember the ETag, for resuming the .part file later
+        part = part_file(archive) if archive else None
+        if part:
+            _etag_file(part).write_text(new_etag, encoding="utf-8")
+
+        with _spool_file(part) as spool:
+            try:
+                with staging(self.folders.collections) as folder:
+                    extractor = StreamExtractor(folder, spool)
+                    self._stream(reader, extractor, total_size)
+
+            # -- Download problem: the data received is kept
+            except DownloadError:
+                raise
+
+            # -- Other problems (Ex. not a zip file): the .part file is
+            # -- not valid
+            except BaseException:
+                if part:
+                    part.unlink(missing_ok=True)
+                    _etag_file(part).unlink(missing_ok=True)
+                raise
+
+        # -- Keep the zip file
+        if part:
+            os.replace(part, archive)
+            _etag_file(part).unlink(missing_ok=True)
+
+        return DownloadResult(True, new_etag, extractor.members)
+
+    def _request_retry(self, url: str, etag="") -> requests.Response:
+        """Generate the http request of a collection. It is retried if
+        there are network problems (or server errors), waiting longer
+        every time. The same as request(), it returns None if the
+        collection has not changed
+        It raises DownloadError if the server could not be reached
+        """
+
+        error = None
+        for attempt in range(RETRIES):
+
+            # -- Wait before retrying. Longer every time
+            if attempt:
+                time.sleep(RETRY_DELAY * 2 ** (attempt - 1))
+
+            try:
+                return self.request(url, etag)
+
+            # -- Network problem: retry
+            except RETRY_ERRORS as exc:
+                error = exc
+
+            # -- Other errors (Ex. invalid url): do not retry
+            except requests.RequestException as exc:
+                raise DownloadError(f"ERROR when downloading: {exc}") from exc
+
+        raise DownloadError(f"ERROR when downloading: {error}") from error
+
+    def _stream(self, reader, extractor, total_size: int) -> None:
+        """Uncompress the blocks given by the reader thread as they
+        arrive
+        * reader: _BlockReader (already started)
+        * extractor: StreamExtractor
+        * total_size: Size of the collection (0 if not known)
+        """
+
+        # Use a progress bar...
+        with tqdm(
+            total=total_size,
+            unit="B",
+            unit_scale=True,
+            desc="• Download+Unzip",
+            disable=not self.progress,
+        ) as pbar:
+            progress = _Progress(pbar)
+
+            try:
+                # -- Process the blocks until the end (None)
+                while (block := reader.blocks.get()) is not None:
+
+                    # -- The reader failed: raise its exception
+                    if isinstance(block, Exception):
+                        raise block
+
+                    extractor.feed(block)
+                    progress.update(len(block))
+
+                progress.flush()
+
+            # -- Make sure the reader thread finishes and the file being
+            # -- extracted is closed, even if there were errors
+            finally:
+                reader.stop()
+                extractor.close()
+
+        # -- Extract the members that could not be streamed
+        extractor.finish()
+
     # -- Uncompress the collection zip file
-    def uncompress(self, zip_file: Path):
+    def uncompress(self, zip_file: Path) -> list:
         """Uncompress the given zip file. The destination folder is
         the icestudio collection folder
+        If the zip has many files, they are extracted in parallel
+        (unzip_jobs threads). The result is the same
+        It is uncompressed in a hidden staging folder, and moved into
+        place only when it is complete
+        Return the ZipInfo of its members
+        """
+
+        with staging(self.folders.collections) as folder:
+            return self._extract(zip_file, folder)
+
+    def _extract(self, zip_file: Path, dest: Path) -> list:
+        """Uncompress the given zip file in the dest folder
+        Return the ZipInfo of its members
         """
 
         # -- Open the zip file and extract it with progress bar
         with zipfile.ZipFile(zip_file, "r") as zip_ref:
 
             # Get the file list in the zip file
+            members = zip_ref.infolist()
             file_list = zip_ref.namelist()
 
             # Use a progress bar
             with tqdm(
-                total=len(file_list), desc="• Unzip", unit="file"
+                total=len(file_list),
+                desc="• Unzip",
+                unit="file",
+                disable=not self.progress,
             ) as pbar:
 
+                # -- Big collections are extracted by several threads
+                if self.unzip_jobs > 1 and len(file_list) >= PARALLEL_UNZIP:
+                    extract_parallel(
+                        zip_file, dest, self.unzip_jobs, pbar.update
+                    )
+                    return members
+
                 # -- Iterate over each file in the zip
                 for file in file_list:
 
                     # Extract the file!
-                    zip_ref.extract(file, self.folders.collections)
+                    zip_ref.extract(file, dest)
 
                     # -- Update progress bar!
                     pbar.update(1)
 
+        return members
+
     def parse_coltag(self, coltag: str) -> dict:  # or | None:
         """Parse a collection name with optional tag version
         Ex: "iceK@0.1.4"
@@ -283,3 +731,188 @@ class Collection:
 
         # -- No match. Incorrect collection tag
         return None
+
+
+def _total_size(response: requests.Response, offset=0) -> int:
+    """Return the total size of the file being downloaded, or 0 if it is
+    not known. For partial responses (206) it is read from the
+    Content-Range header (Ex. "bytes 100-199/200")
+    """
+
+    content_range = response.headers.get("Content-Range", "")
+    total = content_range.rpartition("/")[2]
+    if response.status_code == 206 and total.isdigit():
+        return int(total)
+
+    length = response.headers.get("content-length", "")
+    return offset + int(length) if length.isdigit() else 0
+
+
+class _Progress:
+    """Update a progress bar at most every PROGRESS_INTERVAL seconds
+    * pbar: Progress bar
+    """
+
+    def __init__(self, pbar: tqdm) -> None:
+        self.pbar = pbar
+        self.pending = 0
+        self.last = time.monotonic()
+
+    def update(self, size: int) -> None:
+        """Add the given number of bytes to the progress"""
+
+        self.pending += size
+        now = time.monotonic()
+        if now - self.last >= PROGRESS_INTERVAL:
+            self.flush()
+            self.last = now
+
+    def flush(self) -> None:
+        """Show the pending progress"""
+
+        if self.pending:
+            self.pbar.update(self.pending)
+            self.pending = 0
+
+
+def part_file(destfile: Path) -> Path:
+    """Return the file where the given file is downloaded, before it is
+    complete (Ex. v0.1.4.zip.part)
+    """
+    return destfile.with_name(destfile.name + ".part")
+
+
+def _spool_file(part: Path):
+    """Return the file where a streamed zip file is stored: the given
+    .part file, or a temporary one (in memory while it is small)
+    """
+
+    if part:
+        return open(part, "w+b")
+    return tempfile.SpooledTemporaryFile(max_size=SPOOL_MEMORY)
+
+
+def _etag_file(part: Path) -> Path:
+    """Return the file where the ETag of a .part file is stored"""
+    return part.with_name(part.name + ".etag")
+
+
+def _read_etag(part: Path) -> str:
+    """Return the ETag of the given .part file ("" if not known)"""
+
+    try:
+        return _etag_file(part).read_text(encoding="utf-8")
+    except OSError:
+        return ""
+
+
+class _BlockReader(threading.Thread):
+    """Thread that reads a collection from the network and puts the
+    blocks in a queue. If the connection drops, the download is resumed
+    from where it stopped (HTTP Range)
+    The end is signaled with None. If there is an error, the exception
+    is put in the queue
+    * collection: Collection class (for doing the requests)
+    * url: Url of the collection
+    * response: Response of the first request
+    """
+
+    def __init__(
+        self, collection: Collection, url: str, response: requests.Response
+    ) -> None:
+        super().__init__(daemon=True)
+        self.collection = collection
+        self.url = url
+        self.response = response
+
+        # -- The queue is limited to bound the memory used
+        self.blocks = queue.Queue(maxsize=64)
+
+        # -- Set for stopping the thread
+        self._stopped = threading.Event()
+
+    def run(self) -> None:
+        """Read all the blocks"""
+
+        try:
+            self._read()
+            self.blocks.put(None)
+
+        # -- Broad exception: it is re-raised in the consumer thread
+        except Exception as exc:  # pylint: disable=broad-exception-caught
+            self.blocks.put(exc)
+
+        finally:
+            self.response.close()
+
+    def stop(self) -> None:
+        """Stop reading and wait until the thread finishes"""
+
+        self._stopped.set()
+
+        # -- Make room in the queue, if the thread is waiting
+        while self.is_alive():
+            try:
+                self.blocks.get(timeout=0.1)
+            except queue.Empty:
+                pass
+
+    def _read(self) -> None:
+        """Read the blocks, resuming the download if there are errors"""
+
+        total_size = _total_size(self.response)
+        received = 0
+        error = None
+
+        for attempt in range(RETRIES):
+            try:
+                # -- Resume the download. Wait first. Longer every time
+                if attempt:
+                    time.sleep(RETRY_DELAY * 2 ** (attempt - 1))
+                    self._resume(received)
+
+                for chunk in self.response.iter_content(STREAM_CHUNK):
+                    if self._stopped.is_set():
+                        return
+                    if chunk:
+                        self.blocks.put(chunk)
+                        received += len(chunk)
+
+                # -- Check the size
+                if total_size and received != total_size:
+                    raise RetryableError(
+                        f"Incomplete download: {received} of "
+                        f"{total_size} bytes"
+                    )
+                return
+
+            # -- Network problem: retry
+            except RETRY_ERRORS as exc:
+                error = exc
+
+        raise DownloadError(f"ERROR when downloading: {error}") from error
+
+    def _resume(self, offset: int) -> None:
+        """Request the rest of the file, from the given offset"""
+
+        self.response.close()
+
+        # -- Nothing received yet: just start again
+        if not offset:
+            self.response = self.collection.request(self.url)
+            return
+
+        # -- The ETag is needed for checking that the file is the same
+        etag = self.response.headers.get("ETag", "")
+        if not etag:
+            raise DownloadError("ERROR when downloading: cannot resume")
+
+        self.response = self.collection.request(
+            self.url, offset=offset, if_range=etag
+        )
+
+        # -- The file has changed in the server: the whole file was sent
+        if self.response.status_code != 206:
+            raise DownloadError(
+                "ERROR when downloading: the collection has changed"
+            )
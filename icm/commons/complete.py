@@ -0,0 +1,90 @@
+"""Shell completion of the collection names and versions
+
+It runs on every <TAB>, so it should answer in a few milliseconds:
+nothing is downloaded and only light modules are imported. The names
+and versions are taken from the store, the catalog (icm index), the
+cached package.json files and the installed collections
+"""
+
+from icm.commons import store
+from icm.commons.catalog import Catalog
+from icm.commons.context import Folders, split_nametag
+from icm.commons.metadata import MetadataCache
+
+# -- Url of a package.json: the collection name is before this suffix
+PACKAGE_SUFFIX = "/raw/main/package.json"
+
+
+def installed() -> list:
+    """Return the names of the installed collection folders, sorted
+    (Ex. [iceIO-0.1.0, iceK-0.1.4, iceK-main])
+    """
+    return [folder.name for folder in Folders().installed()]
+
+
+def known_versions() -> dict:
+    """Return the versions known locally of every collection
+    {name: set of versions}. All the store collections are included,
+    even if no version is known
+    """
+
+    folders = Folders()
+    versions = {
+        name: set() for names in store.COLLECTIONS.values() for name in names
+    }
+
+    # -- Precomputed list: the catalog (icm index)
+    for name, entry in Catalog(folders.catalog).entries.items():
+        versions.setdefault(name, set()).add(entry.version)
+
+    # -- Cached package.json files (icm lsgit, icm install)
+    for entry in MetadataCache(folders.metadata).entries():
+        if entry.url.endswith(PACKAGE_SUFFIX) and "version" in entry.package:
+            name = entry.url.removesuffix(PACKAGE_SUFFIX).rsplit("/", 1)[-1]
+            versions.setdefault(name, set()).add(entry.package["version"])
+
+    for nametag in installed():
+        name, version = split_nametag(nametag)
+        versions.setdefault(name, set())
+        if version:
+            versions[name].add(version)
+
+    return versions
+
+
+def complete_coltag(_ctx, _param, incomplete: str) -> list:
+    """Complete a collection tag: name or name@version
+    (Ex. ice<TAB> --> iceK iceIO..., iceK@<TAB> --> iceK@0.1.4...)
+    """
+
+    versions = known_versions()
+
+    if "@" in incomplete:
+        name = incomplete.partition("@")[0]
+        return [
+            coltag
+            for coltag in (
+                f"{name}@{version}"
+                for version in sorted(versions.get(name, ()))
+            )
+            if coltag.startswith(incomplete)
+        ]
+
+    return sorted(name for name in versions if name.startswith(incomplete))
+
+
+def complete_installed(_ctx, _param, incomplete: str) -> list:
+    """Complete the folder name of an installed collection
+    (Ex. iceK-<TAB> --> iceK-0.1.4 iceK-main)
+    """
+
+    return [
+        nametag for nametag in installed() if nametag.startswith(incomplete)
+    ]
+
+
+def complete_name(_ctx, _param, incomplete: str) -> list:
+    """Complete the name of an installed collection (Ex. iceK)"""
+
+    names = {split_nametag(nametag)[0] for nametag in installed()}
+    return sorted(name for name in names if name.startswith(incomplete))
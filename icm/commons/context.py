@@ -0,0 +1,139 @@
+"""Context information: terminal and Icestudio folders
+
+This module is imported by all the commands, so it should be light:
+the download code (requests, tqdm...) is in commons.py
+"""
+
+import os
+import re
+import shutil
+from typing import NamedTuple
+from pathlib import Path
+
+# -- Default number of threads for the disk operations (uncompressing,
+# -- scanning the installed collections...)
+JOBS = min(8, os.cpu_count() or 1)
+
+# -- Installed collection folder: name-version (Ex. iceK-0.1.4). The
+# -- development versions are name-main (Ex. iceK-main)
+NAMETAG = re.compile(
+    r"^(?P<name>[a-zA-Z0-9-]+)-(?P<version>\d+\.\d+(\.\d+)?)$"
+)
+
+
+def split_nametag(nametag: str) -> tuple:
+    """Return the (name, version) of an installed collection folder
+    The version is "" for the development versions
+    (Ex. iceK-0.1.4 --> (iceK, 0.1.4), iceK-main --> (iceK, ""))
+    """
+
+    match = NAMETAG.match(nametag)
+    if match:
+        return match.group("name"), match.group("version")
+    return nametag.removesuffix("-main"), ""
+
+
+# -- Context information
+class Context(NamedTuple):
+    """general Context information"""
+
+    @property
+    def terminal_width(self) -> int:
+        """Get the terminal with in columns"""
+        return shutil.get_terminal_size().columns
+
+    @property
+    def line(self) -> str:
+        """Return a line as long as the terminal width"""
+        return "─" * self.terminal_width
+
+
+# -- Folder information
+class Folders(NamedTuple):
+    """Icestudio related folders"""
+
+    @property
+    def home(self) -> Path:
+        """Return the home user folder"""
+        return Path.home()
+
+    @property
+    def icestudio(self) -> Path:
+        """Return the icestudio data folder"""
+        return self.home / ".icestudio"
+
+    @property
+    def collections(self) -> Path:
+        """Return the icestudio collections folder"""
+        return self.icestudio / "collections"
+
+    @property
+    def inventory(self) -> Path:
+        """Return the database of the installed collections"""
+        return self.icestudio / "icm-inventory.db"
+
+    @property
+    def trash(self) -> Path:
+        """Return the folder where the removed collections are moved
+        before deleting them (in the same filesystem)"""
+        return self.icestudio / "icm-trash"
+
+    @property
+    def cache(self) -> Path:
+        """Return the icm cache folder"""
+        return self.icestudio / "icm-cache"
+
+    @property
+    def archives(self) -> Path:
+        """Return the folder with the cached collection archives"""
+        return self.cache / "archives"
+
+    @property
+    def manifests(self) -> Path:
+        """Return the folder with the manifests of the installed
+        collections (files, sizes and CRCs)"""
+        return self.cache / "manifests"
+
+    @property
+    def metadata(self) -> Path:
+        """Return the folder with the cached package.json files"""
+        return self.cache / "metadata"
+
+    @property
+    def usage(self) -> Path:
+        """Return the cache of the collections disk usage"""
+        return self.cache / "usage.json"
+
+    @property
+    def catalog(self) -> Path:
+        """Return the catalog of the store collections (icm index)"""
+        return self.cache / "catalog.jsonl"
+
+    @property
+    def search(self) -> Path:
+        """Return the search index of the installed blocks (icm search)"""
+        return self.cache / "search.json"
+
+    def installed(self) -> list:
+        """Return the folders of the installed collections, sorted by
+        name. The hidden folders (Ex. the ones being extracted or
+        upgraded) and the files are ignored
+        """
+
+        try:
+            with os.scandir(self.collections) as entries:
+                return sorted(
+                    Path(entry.path)
+                    for entry in entries
+                    if entry.is_dir() and not entry.name.startswith(".")
+                )
+        except OSError:
+            return []
+
+    @staticmethod
+    def check(folder: Path) -> str:
+        """Return a check character depending if the folder exists
+        ✅ : Folder exists
+        ❌ : Folder does NOT exist
+        """
+        return "✅ " if folder.exists() else "❌ "
@@ -0,0 +1,209 @@
+"""Deduplication of identical files in the installed collections"""
+
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import NamedTuple
+
+from icm.commons.cache import file_digest
+
+# -- Linux ioctl for cloning a file (reflink): FICLONE
+FICLONE = 0x40049409
+
+# -- Link methods
+#    * hardlink: The identical files are replaced by hard links
+#    * reflink: They are replaced by copy-on-write clones. Only in the
+#      filesystems that support it (btrfs, xfs...)
+#    * auto: reflink if supported. If not, hardlink
+METHODS = ("auto", "hardlink", "reflink")
+
+
+class DedupResult(NamedTuple):
+    """Result of a deduplication
+    * files: Number of files analyzed
+    * linked: Number of files replaced by links
+    * reclaimed: Bytes of disk freed
+    """
+
+    files: int
+    linked: int
+    reclaimed: int
+
+
+class _File(NamedTuple):
+    """File found in the collections"""
+
+    path: Path
+    size: int
+    dev: int
+    ino: int
+    nlink: int
+
+    @property
+    def inode(self) -> tuple:
+        """Return the inode key. The inode numbers are only unique in
+        the same device (filesystem)
+        """
+        return (self.dev, self.ino)
+
+
+def dedup(folders: list, method="auto", jobs=4, dry_run=False) -> DedupResult:
+    """Replace the identical files in the given folders by links
+    The files are first grouped by size. Only the files with the same
+    size are hashed (sha256), in parallel
+    * folders: Folders to analyze (Ex. installed collections)
+    * method: "auto", "hardlink" or "reflink"
+    * jobs: Number of threads used for hashing
+    * dry_run: Do not change anything. Just report
+    """
+
+    files = []
+    for folder in folders:
+        files.extend(_scan(folder))
+
+    groups = _candidates(files)
+
+    # -- Hash one file of every inode
+    to_hash = [paths[0] for inodes in groups for paths in inodes.values()]
+    with ThreadPoolExecutor(max_workers=jobs) as pool:
+        digests = dict(
+            zip(
+                (file.inode for file in to_hash),
+                pool.map(lambda file: file_digest(file.path), to_hash),
+            )
+        )
+
+    linker = _Linker(method, dry_run)
+
+    for inodes in groups:
+        # -- Inodes with the same contents
+        same = {}
+        for paths in inodes.values():
+            same.setdefault(digests[paths[0].inode], []).append(paths)
+
+        for copies in same.values():
+            linker.link_copies(copies)
+
+    return DedupResult(len(files), linker.linked, linker.reclaimed)
+
+
+def _candidates(files: list) -> list:
+    """Group the files that could be identical: same device and size
+    Every group is a dictionary with the files by inode, so that the
+    files that are already the same are only hashed once
+    """
+
+    candidates = {}
+    for file in files:
+        if file.size:
+            candidates.setdefault((file.dev, file.size), {}).setdefault(
+                file.inode, []
+            ).append(file)
+
+    return [inodes for inodes in candidates.values() if len(inodes) > 1]
+
+
+def _scan(folder: Path):
+    """Return all the regular files in the folder (recursively)"""
+
+    with os.scandir(folder) as entries:
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                yield from _scan(Path(entry.path))
+            elif entry.is_file(follow_symlinks=False):
+                stat = entry.stat(follow_symlinks=False)
+                yield _File(
+                    Path(entry.path),
+                    stat.st_size,
+                    stat.st_dev,
+                    stat.st_ino,
+                    stat.st_nlink,
+                )
+
+
+class _Linker:
+    """Replace files by links to other files
+    * method: "auto", "hardlink" or "reflink"
+    * dry_run: Do not change anything
+    """
+
+    def __init__(self, method: str, dry_run: bool) -> None:
+        self.method = method
+        self.dry_run = dry_run
+
+        # -- Reflinks are not tried again if they are not supported
+        self.reflink = method in ("auto", "reflink")
+
+        # -- Number of files linked and bytes freed
+        self.linked = 0
+        self.reclaimed = 0
+
+    def link_copies(self, copies: list) -> None:
+        """Link all the copies of the same file to one of them
+        * copies: List with the files of every inode with the same contents
+        """
+
+        # -- Keep the inode with more links
+        copies.sort(key=lambda paths: (-paths[0].nlink, paths[0].path))
+        original = copies[0][0].path
+
+        for paths in copies[1:]:
+            for file in paths:
+                self.link(original, file.path)
+                self.linked += 1
+
+            # -- The space is only freed if all the links were replaced
+            if paths[0].nlink == len(paths):
+                self.reclaimed += paths[0].size
+
+    def link(self, original: Path, path: Path) -> None:
+        """Replace path by a link to the original file
+        A temporary link is created first and then renamed, so that the
+        file is never missing
+        """
+
+        if self.dry_run:
+            return
+
+        tmp = path.with_name(f".{path.name}.icm-dedup")
+        tmp.unlink(missing_ok=True)
+
+        if not (self.reflink and self._clone(original, tmp)):
+            os.link(original, tmp)
+
+        os.replace(tmp, path)
+
+    def _clone(self, original: Path, tmp: Path) -> bool:
+        """Create a reflink (copy-on-write clone) of the original file
+        Return False if the filesystem does not support it
+        """
+
+        if not sys.platform.startswith("linux"):
+            self._not_supported()
+            return False
+
+        # -- Only in linux
+        import fcntl  # pylint: disable=import-outside-toplevel
+
+        with open(original, "rb") as src, open(tmp, "wb") as dst:
+            try:
+                fcntl.ioctl(dst.fileno(), FICLONE, src.fileno())
+            except OSError:
+                ok = False
+            else:
+                ok = True
+
+        if not ok:
+            tmp.unlink()
+            self._not_supported()
+            return False
+
+        return True
+
+    def _not_supported(self) -> None:
+        """Reflinks are not supported"""
+
+        if self.method == "reflink":
+            raise OSError("Reflinks are not supported in this filesystem")
+        self.reflink = False
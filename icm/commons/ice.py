@@ -0,0 +1,332 @@
+"""Icestudio .ice files"""
+
+import io
+import re
+
+# -- Texts to translate in the .ice files: the descriptions and the
+# -- texts of the information blocks (basic.info) that are readonly
+# -- {"info": "text", "readonly": true} (the keys can be in any order)
+
+# -- The files are scanned as bytes: only the texts found are decoded.
+# -- In utf-8 the quotes, backslashes and brackets are never part of
+# -- other characters, so the JSON structure can be followed in bytes
+
+# -- Keys with texts (or the readonly flag), without their last quote.
+# -- They are searched as plain strings, which is much faster than a
+# -- regular expression (and faster without the last quote: there are
+# -- quotes everywhere in a JSON file). In a valid JSON file a quote not
+# -- escaped can only be the start or the end of a string, so a key found
+# -- with its first quote not escaped and followed by a colon is never
+# -- inside a string
+KEYS = (b'"description', b'"info', b'"readonly')
+
+# -- Colon after a key (with the spaces around it)
+COLON = re.compile(rb"\s*(:\s*)?")
+
+# -- JSON string. The text is not decoded: the escape sequences are
+# -- kept as in the file, so they are valid in translation.js too
+STRING = re.compile(rb'"((?:[^"\\]|\\.)*)"')
+
+# -- End of an info object as Icestudio writes it: the readonly flag
+# -- and the closing bracket
+READONLY = re.compile(rb'\s*,\s*"readonly"\s*:\s*(true|false)\s*}')
+
+# -- Tokens of an object: its strings (keys when followed by a colon)
+# -- and the brackets. A string without the closing quote is cut
+TOKENS = re.compile(rb'"((?:[^"\\]|\\.)*)(")?(\s*:\s*)?|[{}\[\]]')
+
+# -- Size of the blocks read from the .ice files (bytes)
+CHUNK = 1024 * 1024
+
+# -- Bytes kept at the end of a block, where a key could be cut
+TAIL = 64
+
+BACKSLASH = ord("\\")
+QUOTE = ord('"')
+
+
+class _Incomplete(Exception):
+    """The text ends before the current token: more is needed"""
+
+
+class _Restart(Exception):
+    """The readonly keys before the info keys are needed: the file
+    should be scanned again, looking for them too
+    """
+
+
+class IceScanner:  # pylint: disable=R0902,R0903
+    """Incremental scanner of the texts of an .ice file
+    The file is read in blocks. Only the keys with texts are looked for
+    and only the objects with info texts are walked, for finding their
+    readonly flag. The memory used does not depend on the file size
+
+    Icestudio writes the readonly flag after the info text. The readonly
+    keys before them are only looked for (in all the file: it is scanned
+    again) when an info object without the flag after its text is found.
+    If the file can not be read again, they are always looked for
+    * file: Binary file (or any object with a read() method)
+    """
+
+    def __init__(self, file, chunk: int = CHUNK) -> None:
+        self.file = file
+        self.chunk = chunk
+
+        # -- Look also for the readonly keys (before the info keys)
+        seekable = getattr(file, "seekable", lambda: False)()
+        self._exact = not seekable
+        self._start = file.tell() if seekable else 0
+
+        # -- Current block: bytes not processed yet
+        self._buffer = b""
+
+        # -- Position of the block in the file
+        self._offset = 0
+
+        # -- End of the file reached
+        self._eof = False
+
+        # -- Positions (in the file) of the info keys of the readonly
+        # -- objects found before them: {"readonly": true, "info": ...}
+        self._readonly = set()
+
+        # -- Positions of the readonly keys already found after an info
+        # -- key: {"info": ..., "readonly": true}. They are not walked
+        self._checked = set()
+
+    def __iter__(self):
+        """Yield the (key, text) of all the texts, in the file order
+        * key: "description" or "info"
+        """
+
+        yielded = 0
+        while True:
+            try:
+                # -- Scanned again: the texts already given are skipped
+                skip = yielded
+                for event in self._blocks():
+                    if skip:
+                        skip -= 1
+                        continue
+                    yielded += 1
+                    yield event
+                return
+
+            except _Restart:
+                self._restart()
+
+    def _blocks(self):
+        """Yield the texts of all the blocks of the file"""
+
+        while not self._eof:
+            data = self.file.read(self.chunk)
+            self._eof = not data
+            self._buffer += data
+            yield from self._scan()
+
+    def _restart(self) -> None:
+        """Go back to the start of the file, for scanning it again
+        looking for all the keys
+        """
+
+        self.file.seek(self._start)
+        self._buffer, self._offset, self._eof = b"", 0, False
+        self._readonly, self._checked = set(), set()
+        self._exact = True
+
+    def _scan(self):
+        """Yield the texts of the current block. The bytes not processed
+        are left in the buffer, for the next block
+        """
+
+        # -- Next position of every key (the end if there are no more)
+        keys = KEYS if self._exact else KEYS[:2]
+        found = {key: self._find(key, 0) for key in keys}
+
+        pos = 0
+        while True:
+            key = min(found, key=found.get)
+            quote = found[key]
+
+            # -- No more keys: only the end of the block is kept. It should
+            # -- not start with a backslash (it could escape a quote)
+            if quote == len(self._buffer):
+                cut = max(pos, len(self._buffer) - TAIL)
+                while cut > pos and self._buffer[cut - 1] == BACKSLASH:
+                    cut -= 1
+                pos = cut
+                break
+
+            try:
+                event, end = self._key(key, quote)
+            except _Incomplete:
+                pos = quote
+                break
+
+            if event:
+                yield event
+
+            # -- The keys before the end have already been processed
+            pos = end
+            for name, position in found.items():
+                if position < end:
+                    found[name] = self._find(name, end)
+
+        self._buffer = self._buffer[pos:]
+        self._offset += pos
+
+    def _find(self, key: bytes, pos: int) -> int:
+        """Return the position of the next key in the block (from the
+        given position). The block size if there are no more
+        """
+
+        position = self._buffer.find(key, pos)
+        return position if position >= 0 else len(self._buffer)
+
+    def _key(self, key: bytes, quote: int) -> tuple:
+        """Process the key found in the given position (its first quote)
+        Return its (key, text) or None if it has no text to translate,
+        and the position where the next keys should be looked for
+        """
+
+        end = quote + len(key)
+        self._need(end + 1)
+
+        # -- Escaped quote (it is inside a string) or another key that
+        # -- starts the same (Ex. "information")
+        escaped = quote and self._buffer[quote - 1] == BACKSLASH
+        if escaped or self._buffer[end] != QUOTE:
+            return None, quote + 1
+
+        # -- Not followed by a colon: it is a value, not a key
+        colon = COLON.match(self._buffer, end + 1)
+        if not colon.group(1):
+            if colon.end() == len(self._buffer):
+                self._need(len(self._buffer) + 1)
+            return None, quote + 1
+
+        start = colon.end()
+        self._need(start + 1)
+
+        if key == b'"readonly':
+            self._readonly_key(quote, start)
+            return None, quote + 1
+
+        value = STRING.match(self._buffer, start)
+        if not value:
+            if self._buffer[start] == QUOTE and not self._eof:
+                raise _Incomplete()
+            return None, quote + 1
+
+        if key == b'"info':
+            return self._info_key(quote, value)
+
+        text = value.group(1).decode("utf-8")
+        return ("description", text) if text else None, value.end()
+
+    def _info_key(self, quote: int, value) -> tuple:
+        """Process an info key, with the given value (string match)
+        Return its ("info", text) if the object is readonly (None if
+        not) and the position where the next keys should be looked for
+        """
+
+        # -- The usual info object only has the readonly flag after the
+        # -- text: nothing else should be walked
+        flag = READONLY.match(self._buffer, value.end())
+        if flag:
+            readonly = flag.group(1) == b"true"
+            end = flag.end()
+        else:
+            readonly = flagged = False
+            for name, key_pos, value_pos in self._siblings(value.end()):
+                if name == b"readonly":
+                    self._checked.add(self._offset + key_pos)
+                    flagged = True
+                    readonly = readonly or self._buffer.startswith(
+                        b"true", value_pos
+                    )
+            end = value.end()
+
+            # -- No flag after the text: it could be before it
+            if not flagged and not self._exact:
+                raise _Restart()
+
+        # -- Or readonly flag before the text
+        position = self._offset + quote
+        readonly = readonly or position in self._readonly
+        self._readonly.discard(position)
+
+        text = value.group(1).decode("utf-8")
+        return ("info", text) if text and readonly else None, end
+
+    def _readonly_key(self, quote: int, start: int) -> None:
+        """Process a readonly key (found before the info key of its
+        object, or in another object)
+        """
+
+        if self._offset + quote in self._checked:
+            self._checked.discard(self._offset + quote)
+            return
+
+        self._need(start + 4)
+        if self._buffer.startswith(b"true", start):
+            for name, position, _ in self._siblings(start + 4):
+                if name == b"info":
+                    self._readonly.add(self._offset + position)
+
+    def _siblings(self, pos: int) -> list:
+        """Return the keys of the object from the given position to its
+        end: (name, key position, value position)
+        """
+
+        keys = []
+        depth = 0
+        for token in TOKENS.finditer(self._buffer, pos):
+            if token.group(0) in (b"{", b"["):
+                depth += 1
+            elif token.group(0) in (b"}", b"]"):
+                depth -= 1
+                if depth < 0:
+                    return keys
+            elif token.group(2) is None or token.end() == len(self._buffer):
+                self._need(len(self._buffer) + 1)
+                continue
+            elif token.group(3) and depth == 0:
+                keys.append((token.group(1), token.start(), token.end()))
+
+        # -- The object does not end in this block
+        self._need(len(self._buffer) + 1)
+        return keys
+
+    def _need(self, size: int) -> None:
+        """Check that the block has at least the given size. If not,
+        more bytes are needed (except at the end of the file)
+        """
+
+        if len(self._buffer) < size and not self._eof:
+            raise _Incomplete()
+
+
+def find_texts(project: str) -> list:
+    """Return the texts of the given .ice file contents: first all the
+    descriptions and then all the readonly info texts. The empty texts
+    are discarded
+    """
+
+    return read_file(io.BytesIO(project.encode("utf-8")))
+
+
+def read_file(file) -> list:
+    """Return the texts of an open .ice file (see find_texts)"""
+
+    texts = {"description": [], "info": []}
+    for key, text in IceScanner(file):
+        texts[key].append(text)
+    return texts["description"] + texts["info"]
+
+
+def read_texts(filepath) -> list:
+    """Return the texts of the given .ice file (see find_texts)"""
+
+    with open(filepath, "rb") as file:
+        return read_file(file)
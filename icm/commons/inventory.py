@@ -0,0 +1,254 @@
+"""Inventory of the installed collections"""
+
+import os
+import time
+import zlib
+import sqlite3
+import hashlib
+from contextlib import closing, contextmanager
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import NamedTuple
+
+# -- Size of the blocks read when calculating the CRCs
+CRC_CHUNK = 1024 * 1024
+
+# -- Seconds to wait for the database if other process is writing it
+DB_TIMEOUT = 30
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS collections (
+    nametag TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    version TEXT NOT NULL,
+    url TEXT NOT NULL,
+    installed REAL NOT NULL,
+    files INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    digest TEXT NOT NULL
+)
+"""
+
+
+class Installed(NamedTuple):
+    """Installed collection
+    * nametag: Folder name (Ex. iceK-0.1.4, iceK-main)
+    * name: Collection name (Ex. iceK)
+    * version: Collection version (Ex. 0.1.4). "" for the dev version
+    * url: Url from where it was downloaded
+    * installed: Installation time (seconds since the epoch)
+    * files: Number of files
+    * size: Total size of the files in bytes
+    * digest: Content digest. sha256 of the paths, sizes and CRC-32 of
+      all the files. It can be calculated from the zip file too
+    """
+
+    nametag: str
+    name: str
+    version: str
+    url: str
+    installed: float
+    files: int
+    size: int
+    digest: str
+
+
+class Inventory:
+    """Database (sqlite) with the installed collections
+    Every change is done in a transaction, so it is never left half
+    written, even if several icm processes are running at the same time
+    * path: Database file (Ex. ~/.icestudio/icm-inventory.db)
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+
+    def exists(self) -> bool:
+        """Check if the inventory has been created"""
+        return self.path.exists()
+
+    def entries(self) -> list:
+        """Return all the installed collections, sorted by nametag"""
+
+        with closing(self._connect()) as db:
+            rows = db.execute(
+                "SELECT * FROM collections ORDER BY nametag"
+            ).fetchall()
+
+        return [Installed(*row) for row in rows]
+
+    def get(self, nametag: str) -> Installed:  # or None
+        """Return the installed collection (None if not found)"""
+
+        with closing(self._connect()) as db:
+            row = db.execute(
+                "SELECT * FROM collections WHERE nametag = ?", (nametag,)
+            ).fetchone()
+
+        return Installed(*row) if row else None
+
+    def add(self, installed: Installed) -> None:
+        """Add (or replace) an installed collection"""
+
+        with self._transaction() as db:
+            db.execute(
+                "INSERT OR REPLACE INTO collections VALUES (?,?,?,?,?,?,?,?)",
+                installed,
+            )
+
+    def remove(self, nametag: str) -> None:
+        """Remove an installed collection"""
+
+        with self._transaction() as db:
+            db.execute("DELETE FROM collections WHERE nametag = ?", (nametag,))
+
+    def update(self, added: list, removed: list) -> None:
+        """Add the given collections and remove the others (by nametag)
+        at the same time
+        """
+
+        with self._transaction() as db:
+            db.executemany(
+                "DELETE FROM collections WHERE nametag = ?",
+                [(nametag,) for nametag in removed],
+            )
+            db.executemany(
+                "INSERT OR REPLACE INTO collections VALUES (?,?,?,?,?,?,?,?)",
+                added,
+            )
+
+    def replace(self, entries: list) -> None:
+        """Replace all the inventory with the given collections"""
+
+        with self._transaction() as db:
+            db.execute("DELETE FROM collections")
+            db.executemany(
+                "INSERT INTO collections VALUES (?,?,?,?,?,?,?,?)", entries
+            )
+
+    @contextmanager
+    def _transaction(self):
+        """Open the database for changing it. All the changes are
+        committed at the end, or none of them if there is an error
+        """
+
+        with closing(self._connect()) as db:
+            with db:
+                yield db
+
+    def _connect(self) -> sqlite3.Connection:
+        """Open the database. It is created if it does not exist"""
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        db = sqlite3.connect(self.path, timeout=DB_TIMEOUT)
+        db.execute(SCHEMA)
+        return db
+
+
+def scan(
+    folder: Path, name: str, version: str, url: str, installed=None
+) -> Installed:
+    """Read the information of an installed collection from disk
+    * folder: Collection folder
+    * name, version, url: Collection information
+    * installed: Installation time. Now, if not given
+    """
+
+    files = {}
+    _walk(folder, "", files)
+
+    return _installed(folder.name, name, version, url, files, installed)
+
+
+def from_archive(
+    members: list, nametag: str, name: str, version: str, url: str
+) -> Installed:
+    """Return the information of a collection installed from an archive,
+    without reading its files from disk: their sizes and CRCs are the
+    ones in the central directory of the archive
+    * members: ZipInfo of the archive members. All of them are inside a
+      top folder (Ex. iceK-0.1.4/)
+    * nametag: Collection folder name (Ex. iceK-0.1.4)
+    * name, version, url: Collection information
+    """
+
+    files = {}
+    for info in members:
+        path = info.filename.partition("/")[2]
+        if path and not info.is_dir():
+            files[path] = (info.file_size, info.CRC)
+
+    return _installed(nametag, name, version, url, files)
+
+
+def _installed(  # pylint: disable=R0913,R0917
+    nametag, name, version, url, files, installed=None
+):
+    """Return the Installed collection with the given files
+    * files: (size, crc) of the files, by their path
+    """
+
+    return Installed(
+        nametag,
+        name,
+        version,
+        url,
+        time.time() if installed is None else installed,
+        len(files),
+        sum(size for size, _ in files.values()),
+        content_digest(files.items()),
+    )
+
+
+def scan_all(folders: list, describe, jobs: int = 8) -> list:
+    """Read the information of several collections in parallel
+    * folders: Collection folders
+    * describe: Function that returns the (name, version, url) of a
+      collection folder
+    * jobs: Number of collections read at the same time
+    """
+
+    def scan_folder(folder: Path) -> Installed:
+        return scan(
+            folder, *describe(folder), installed=folder.stat().st_mtime
+        )
+
+    with ThreadPoolExecutor(max_workers=jobs) as pool:
+        return list(pool.map(scan_folder, folders))
+
+
+def content_digest(files) -> str:
+    """Return the content digest of a collection
+    * files: Iterable of (path, (size, crc)). The path is relative to
+      the collection folder, with "/" as separator
+    """
+
+    sha = hashlib.sha256()
+    for path, (size, crc) in sorted(files):
+        sha.update(f"{path}\0{size}\0{crc:08x}\n".encode())
+    return sha.hexdigest()
+
+
+def file_crc(path: Path) -> int:
+    """Return the CRC-32 of the given file"""
+
+    crc = 0
+    with open(path, "rb") as file:
+        while chunk := file.read(CRC_CHUNK):
+            crc = zlib.crc32(chunk, crc)
+    return crc
+
+
+def _walk(folder: Path, prefix: str, files: dict) -> None:
+    """Add the (size, crc) of all the files in the folder (recursively)
+    * prefix: Path of the folder relative to the collection
+    """
+
+    with os.scandir(folder) as entries:
+        for entry in entries:
+            path = f"{prefix}{entry.name}"
+            if entry.is_dir(follow_symlinks=False):
+                _walk(Path(entry.path), f"{path}/", files)
+            elif entry.is_file(follow_symlinks=False):
+                size = entry.stat(follow_symlinks=False).st_size
+                files[path] = (size, file_crc(Path(entry.path)))
@@ -0,0 +1,122 @@
+"""Local cache of the collections metadata (package.json files)"""
+
+import json
+import os
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import NamedTuple
+
+# -- Default time (seconds) during which a cached package.json is used
+# -- without asking the server again
+DEFAULT_TTL = 600
+
+# -- Name of the metadata file
+METADATA_FILE = "packages.json"
+
+
+class PackageEntry(NamedTuple):
+    """package.json stored in the cache
+    * url: Url of the package.json file
+    * package: package.json contents (as an object)
+    * etag: ETag returned by the server ("" if none)
+    * fetched: Time when it was validated for the last time
+    """
+
+    url: str
+    package: dict
+    etag: str = ""
+    fetched: float = 0
+
+
+class MetadataCache:
+    """Cache of the package.json files of the collections, by url
+    The entries younger than the TTL are used directly. The older ones
+    are revalidated with the server (If-None-Match with the ETag)
+
+    * folder: Cache folder (Ex. ~/.icestudio/icm-cache/metadata)
+    * ttl: Time to live of the entries (seconds)
+    """
+
+    def __init__(self, folder: Path, ttl: float = DEFAULT_TTL) -> None:
+        self.folder = folder
+        self.ttl = ttl
+
+        # -- The file is modified by several threads when installing
+        # -- collections in parallel
+        self._lock = threading.Lock()
+
+    @property
+    def metadata_file(self) -> Path:
+        """File with all the cached package.json"""
+        return self.folder / METADATA_FILE
+
+    def lookup(self, url: str) -> PackageEntry:  # or None
+        """Return the cached package.json of the given url
+        None is returned if it is not in the cache
+        """
+
+        with self._lock:
+            data = self._load().get(url)
+
+        return PackageEntry(**data) if data else None
+
+    def entries(self) -> list:
+        """Return all the cached package.json (PackageEntries)"""
+
+        with self._lock:
+            metadata = self._load()
+
+        return [PackageEntry(**data) for data in metadata.values()]
+
+    def fresh(self, entry: PackageEntry) -> bool:
+        """Check if the entry can be used without revalidating it"""
+        return time.time() - entry.fetched < self.ttl
+
+    def store(self, url: str, package: dict, etag="") -> PackageEntry:
+        """Store the given package.json in the cache"""
+
+        entry = PackageEntry(url, package, etag, time.time())
+
+        with self._lock:
+            metadata = self._load()
+            metadata[url] = entry._asdict()
+            self._save(metadata)
+
+        return entry
+
+    def touch(self, entry: PackageEntry) -> PackageEntry:
+        """The server confirmed that the entry has not changed"""
+        return self.store(entry.url, entry.package, entry.etag)
+
+    def clean(self) -> int:
+        """Remove all the cached package.json. Return how many"""
+
+        with self._lock:
+            metadata = self._load()
+            self.metadata_file.unlink(missing_ok=True)
+
+        return len(metadata)
+
+    def _load(self) -> dict:
+        """Read the metadata file"""
+
+        try:
+            with open(self.metadata_file, "r", encoding="utf-8") as file:
+                return json.load(file)
+
+        # -- No file yet, or it is corrupted: start again
+        except (OSError, ValueError):
+            return {}
+
+    def _save(self, metadata: dict) -> None:
+        """Write the metadata file. A temporary file is written first,
+        so that it is never left half written
+        """
+
+        self.folder.mkdir(parents=True, exist_ok=True)
+        tmp = self.metadata_file.with_suffix(f".{uuid.uuid4().hex}.tmp")
+        with open(tmp, "w", encoding="utf-8") as file:
+            json.dump(metadata, file, indent=1)
+        os.replace(tmp, self.metadata_file)
@@ -0,0 +1,246 @@
+"""Inverted index of the blocks and examples of the installed collections"""
+
+import os
+import re
+import json
+import uuid
+import bisect
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import NamedTuple
+
+from icm.commons.ice import read_texts
+from icm.commons.usage import ICE_BUILD
+
+# -- Version of the index format. If it changes the index is rebuilt
+INDEX_FORMAT = 1
+
+# -- Weights of the terms, depending on where they are found
+WEIGHT_NAME = 3
+WEIGHT_FOLDER = 2
+WEIGHT_TEXT = 1
+
+# -- Words of the texts (unicode letters and digits)
+WORDS = re.compile(r"[^\W_]+")
+
+
+class Doc(NamedTuple):
+    """Indexed .ice file
+    * collection: Collection folder (Ex. iceK-0.1.4)
+    * path: Path of the file in the collection (Ex. blocks/Logic/and.ice)
+    * mtime: Modification time of the file (ns)
+    * text: First text of the file (its description)
+    * terms: Weight of every term of the file {term: weight}
+    """
+
+    collection: str
+    path: str
+    mtime: int
+    text: str
+    terms: dict
+
+
+class Match(NamedTuple):
+    """Search result
+    * score: Sum of the weights of the matched terms
+    * doc: Matching file
+    """
+
+    score: int
+    doc: Doc
+
+
+def words(text: str) -> list:
+    """Return the search terms (lowercase words) of the given text"""
+    return WORDS.findall(text.lower())
+
+
+def index_file(collection: str, root: Path, path: str, mtime: int) -> Doc:
+    """Read the terms of an .ice file
+    * collection: Collection folder name
+    * root: Collection folder
+    * path: Path of the file in the collection ("/" separated)
+    * mtime: Modification time of the file (ns)
+    """
+
+    *folders, filename = path.split("/")
+
+    try:
+        texts = read_texts(root / path)
+    except (OSError, UnicodeDecodeError):
+        texts = []
+
+    # -- Every term with its maximum weight
+    terms = {}
+    for weight, text in (
+        [(WEIGHT_TEXT, text) for text in texts]
+        + [(WEIGHT_FOLDER, folder) for folder in folders]
+        + [(WEIGHT_NAME, os.path.splitext(filename)[0])]
+    ):
+        for term in words(text):
+            terms[term] = max(weight, terms.get(term, 0))
+
+    return Doc(collection, path, mtime, texts[0] if texts else "", terms)
+
+
+class SearchIndex:
+    """Persistent inverted index: every term points to the .ice files
+    that contain it. It is updated incrementally: only the files whose
+    modification time has changed are read again
+    * path: Index file (Ex. ~/.icestudio/icm-cache/search.json)
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+
+        # -- Indexed files, by "collection/path"
+        self.docs = {}
+
+        # -- Inverted index: {term: {doc key: weight}}
+        self.postings = {}
+
+        # -- Sorted terms, for prefix searches
+        self.terms = []
+
+    def load(self) -> "SearchIndex":
+        """Read the index file. It is empty if it does not exist"""
+
+        try:
+            with open(self.path, "r", encoding="utf-8") as file:
+                data = json.load(file)
+            if data.get("format") != INDEX_FORMAT:
+                return self
+
+            self.docs = {
+                key: Doc(*values) for key, values in data["docs"].items()
+            }
+            self.postings = data["postings"]
+
+        # -- No index yet, or it is corrupted: start again
+        except (OSError, ValueError, KeyError, TypeError):
+            self.docs, self.postings = {}, {}
+
+        self.terms = sorted(self.postings)
+        return self
+
+    def update(self, collections: list, jobs: int = 8) -> tuple:
+        """Update the index with the .ice files of the given collections.
+        The files of other collections are removed from the index
+        * collections: Collection folders
+        * jobs: Number of collections read at the same time
+        Return the number of files (read, removed)
+        """
+
+        def scan(folder: Path) -> list:
+            return self._scan_collection(folder)
+
+        with ThreadPoolExecutor(max_workers=jobs) as pool:
+            scanned = [
+                doc for docs in pool.map(scan, collections) for doc in docs
+            ]
+
+        new = {f"{doc.collection}/{doc.path}": doc for doc in scanned}
+        read = sum(
+            1 for key, doc in new.items() if self.docs.get(key) is not doc
+        )
+        removed = len(set(self.docs) - set(new))
+
+        self.docs = new
+        self._build_postings()
+        return read, removed
+
+    def save(self) -> None:
+        """Write the index file. A temporary file is written first, so
+        that it is never left half written
+        """
+
+        data = {
+            "format": INDEX_FORMAT,
+            "docs": {key: list(doc) for key, doc in self.docs.items()},
+            "postings": self.postings,
+        }
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(f".{uuid.uuid4().hex}.tmp")
+        with open(tmp, "w", encoding="utf-8") as file:
+            json.dump(data, file)
+        os.replace(tmp, self.path)
+
+    def search(self, query: str, limit: int = 0) -> list:
+        """Return the files that match all the words of the query
+        The words match the beginning of the terms (Ex. "deb" matches
+        "debouncer"). The results are sorted by score
+        * limit: Maximum number of results (0: all)
+        """
+
+        scores = None
+        for word in words(query):
+            matched = self._prefix_matches(word)
+            if scores is None:
+                scores = matched
+            else:
+                scores = {
+                    key: score + matched[key]
+                    for key, score in scores.items()
+                    if key in matched
+                }
+
+        matches = sorted(
+            (
+                Match(score, self.docs[key])
+                for key, score in (scores or {}).items()
+            ),
+            key=lambda match: (
+                -match.score,
+                match.doc.collection,
+                match.doc.path,
+            ),
+        )
+        return matches[:limit] if limit else matches
+
+    def _prefix_matches(self, word: str) -> dict:
+        """Return the docs with terms starting with the given word
+        {doc key: maximum weight}
+        """
+
+        matched = {}
+        pos = bisect.bisect_left(self.terms, word)
+        while pos < len(self.terms) and self.terms[pos].startswith(word):
+            for key, weight in self.postings[self.terms[pos]].items():
+                matched[key] = max(weight, matched.get(key, 0))
+            pos += 1
+        return matched
+
+    def _build_postings(self) -> None:
+        """Build the inverted index from the docs"""
+
+        postings = {}
+        for key, doc in self.docs.items():
+            for term, weight in doc.terms.items():
+                postings.setdefault(term, {})[key] = weight
+
+        self.postings = postings
+        self.terms = sorted(postings)
+
+    def _scan_collection(self, root: Path) -> list:
+        """Return the Docs of all the .ice files of a collection
+        The ones not modified are taken from the current index
+        """
+
+        docs = []
+        stack = [""]
+        while stack:
+            prefix = stack.pop()
+            with os.scandir(root / prefix) as entries:
+                for entry in entries:
+                    path = f"{prefix}{entry.name}"
+                    if entry.is_dir(follow_symlinks=False):
+                        if entry.name != ICE_BUILD:
+                            stack.append(f"{path}/")
+                    elif entry.name.endswith(".ice"):
+                        mtime = entry.stat().st_mtime_ns
+                        doc = self.docs.get(f"{root.name}/{path}")
+                        if not doc or doc.mtime != mtime:
+                            doc = index_file(root.name, root, path, mtime)
+                        docs.append(doc)
+        return docs
@@ -0,0 +1,163 @@
+"""Cache of the data extracted from the files of a collection
+
+icm update reads the texts of every .ice file and the translated
+percentage of every .po file. They are stored in a cache file in the
+collection, so that the next update only reads the changed files
+"""
+
+import os
+import json
+import time
+import uuid
+from pathlib import Path
+from typing import NamedTuple
+
+from icm.commons.cache import file_digest
+
+# -- Cache file, in the collection folder. It should not be in the
+# -- repository (.gitignore)
+CACHE_FILE = ".icm-update.json"
+
+# -- Version of the cache format. If it changes (or the way the texts
+# -- are extracted) the cache is discarded
+CACHE_FORMAT = 1
+
+# -- Files modified less than this time (ns) before the cache was
+# -- written are checked by their digest, even if their mtime and size
+# -- have not changed: they could have been modified again in the same
+# -- mtime tick (the mtime resolution of some filesystems is 1-2 s)
+RACY_TIME = 2_000_000_000
+
+
+class FileEntry(NamedTuple):
+    """Cached file
+    * mtime: Modification time (ns)
+    * size: Size (bytes)
+    * digest: sha256 of the contents
+    * value: Data extracted from the file (Ex. its texts)
+    """
+
+    mtime: int
+    size: int
+    digest: str
+    value: list
+
+
+class TextCache:
+    """Cache of the data extracted from the files, keyed by their path
+    A file is not read again if its mtime and size have not changed.
+    If they have, its digest is compared: the data is extracted again
+    only if the contents are different
+    * path: Cache file (None: nothing is cached)
+    """
+
+    def __init__(self, path: Path = None) -> None:
+        self.path = path
+
+        # -- Cached files (from the cache file)
+        self.entries = {}
+
+        # -- Files used now, by their path. Only these are saved
+        self.used = {}
+
+        # -- Time when the cache file was written
+        self.written = 0
+
+        # -- Digests of the files already calculated (by their path)
+        self._digests = {}
+
+    def load(self) -> "TextCache":
+        """Read the cache file. It is empty if it does not exist"""
+
+        try:
+            with open(self.path, "r", encoding="utf-8") as file:
+                data = json.load(file)
+            if data.get("format") != CACHE_FORMAT:
+                return self
+
+            self.written = data["written"]
+            self.entries = {
+                path: FileEntry(*values)
+                for path, values in data["files"].items()
+            }
+
+        # -- No cache, no cache yet, or it is corrupted: start again
+        except (OSError, TypeError, ValueError, KeyError):
+            self.written, self.entries = 0, {}
+
+        return self
+
+    def get(self, filepath: str):
+        """Return the cached data of the file. None if the file has
+        changed (or it is not in the cache)
+        """
+
+        entry = self.entries.get(filepath)
+        if not entry or not self.path:
+            return None
+
+        stat = os.stat(filepath)
+        if entry.size != stat.st_size:
+            return None
+
+        # -- The digest is only calculated if the mtime has changed, or
+        # -- the file was modified just before the cache was written
+        racy = entry.mtime > self.written - RACY_TIME
+        if entry.mtime != stat.st_mtime_ns or racy:
+            digest = self._digest(filepath)
+            if digest != entry.digest:
+                return None
+            entry = entry._replace(mtime=stat.st_mtime_ns)
+
+        self.used[filepath] = entry
+        return entry.value
+
+    def put(self, filepath: str, value: list) -> None:
+        """Store the data extracted from the file"""
+
+        if self.path:
+            stat = os.stat(filepath)
+            self.used[filepath] = FileEntry(
+                stat.st_mtime_ns, stat.st_size, self._digest(filepath), value
+            )
+
+    def keep(self, filepaths) -> None:
+        """Save the cached data of the given files too, even if they
+        are not used now (Ex. their data was not needed this time)
+        """
+
+        for filepath in filepaths:
+            if filepath in self.entries and filepath not in self.used:
+                self.used[filepath] = self.entries[filepath]
+
+    def save(self) -> None:
+        """Write the cache file, only with the files used now. A
+        temporary file is written first, so that it is never left half
+        written
+        """
+
+        if not self.path:
+            return
+
+        data = {
+            "format": CACHE_FORMAT,
+            "written": time.time_ns(),
+            "files": {path: list(entry) for path, entry in self.used.items()},
+        }
+
+        tmp = self.path.with_suffix(f".{uuid.uuid4().hex}.tmp")
+        with open(tmp, "w", encoding="utf-8") as file:
+            json.dump(data, file)
+        os.replace(tmp, self.path)
+
+        # -- The cache can be used again (icm update --watch): it is
+        # -- the same as if it were loaded from the file just written
+        self.written, self.entries = data["written"], self.used
+        self.used, self._digests = {}, {}
+
+    def _digest(self, filepath: str) -> str:
+        """Return the digest of the file (calculated only once)"""
+
+        if filepath not in self._digests:
+            self._digests[filepath] = file_digest(filepath)
+        return self._digests[filepath]
@@ -0,0 +1,106 @@
+"""HTTP transport shared by all the network operations"""
+
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# -- Default timeouts in seconds: (connect, read)
+TIMEOUT = (5, 10)
+
+# -- Default number of hosts whose connections are kept in the pool
+# -- Github uses several hosts: github.com, codeload.github.com,
+# -- raw.githubusercontent.com...
+POOL_SIZE = 4
+
+# -- Default maximum number of connections opened to the same host
+PER_HOST = 8
+
+
+class Transport:
+    """Pooled HTTP session with keep-alive connections
+    All the requests to the same host reuse the connections already
+    opened, instead of doing a new TCP+TLS handshake every time
+
+    * pool_size: Number of hosts with pooled connections
+    * per_host: Maximum number of connections opened to the same host.
+      If more requests are done at the same time, they wait for a free
+      connection
+    * timeout: Timeouts for the requests (connect, read)
+    """
+
+    def __init__(
+        self, pool_size=POOL_SIZE, per_host=PER_HOST, timeout=TIMEOUT
+    ) -> None:
+        self.pool_size = pool_size
+        self.per_host = per_host
+        self.timeout = timeout
+
+        # -- The session is created when it is used for the first time
+        self._session = None
+        self._lock = threading.Lock()
+
+    @property
+    def session(self) -> requests.Session:
+        """Return the pooled session. Create it if it does not exist"""
+
+        with self._lock:
+            if self._session is None:
+                self._session = self._create_session()
+            return self._session
+
+    def _create_session(self) -> requests.Session:
+        """Create a new session with the pool limits"""
+
+        adapter = HTTPAdapter(
+            pool_connections=self.pool_size,
+            pool_maxsize=self.per_host,
+            pool_block=True,
+        )
+
+        session = requests.Session()
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        return session
+
+    def configure(self, pool_size=None, per_host=None, timeout=None) -> None:
+        """Change the transport parameters. The pool is recreated with
+        the new limits the next time it is used
+        """
+
+        if pool_size is not None:
+            self.pool_size = pool_size
+
+        if per_host is not None:
+            self.per_host = per_host
+
+        if timeout is not None:
+            self.timeout = timeout
+
+        # -- Discard the current pool
+        self.close()
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        """Perform a GET request using the pooled session
+        The default timeout is used if no other is given
+        """
+
+        kwargs.setdefault("timeout", self.timeout)
+        return self.session.get(url, **kwargs)
+
+    def close(self) -> None:
+        """Close all the connections in the pool"""
+
+        with self._lock:
+            if self._session is not None:
+                self._session.close()
+                self._session = None
+
+
+# -- Transport shared by all the commands
+_TRANSPORT = Transport()
+
+
+def get_transport() -> Transport:
+    """Return the transport shared by all the commands"""
+    return _TRANSPORT
@@ -0,0 +1,82 @@
+"""Trash folder: collections are removed in the background"""
+
+import os
+import sys
+import uuid
+import shutil
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+# -- Number of folders deleted at the same time
+JOBS = 8
+
+
+class Trash:
+    """Folder where the removed collections are moved before deleting
+    them. Moving a folder is instantaneous (it is just renamed), so
+    Icestudio never sees a half deleted collection. The real deletion
+    is done later, in the background
+    * folder: Trash folder. It should be in the same filesystem as the
+      collections (Ex. ~/.icestudio/icm-trash)
+    """
+
+    def __init__(self, folder: Path) -> None:
+        self.folder = folder
+
+    def move(self, path: Path) -> Path:
+        """Move the given folder to the trash. Return its new path"""
+
+        self.folder.mkdir(parents=True, exist_ok=True)
+
+        # -- The same collection can be removed several times
+        target = self.folder / f"{path.name}.{uuid.uuid4().hex[:8]}"
+        os.replace(path, target)
+        return target
+
+    def items(self) -> list:
+        """Return the folders in the trash"""
+
+        if not self.folder.exists():
+            return []
+        return list(self.folder.iterdir())
+
+    def empty(self, jobs: int = JOBS) -> int:
+        """Delete all the folders in the trash, in parallel
+        Return the number of folders deleted
+        """
+
+        items = self.items()
+
+        def delete(path: Path) -> None:
+            if path.is_dir() and not path.is_symlink():
+                shutil.rmtree(path, ignore_errors=True)
+            else:
+                path.unlink(missing_ok=True)
+
+        with ThreadPoolExecutor(max_workers=jobs) as pool:
+            list(pool.map(delete, items))
+
+        return len(items)
+
+    def empty_background(self) -> None:
+        """Delete the trash in a separate process. This one does not
+        wait for it. If it is interrupted, the trash is emptied the
+        next time
+        """
+
+        if not self.items():
+            return
+
+        subprocess.Popen(  # pylint: disable=R1732
+            [sys.executable, "-m", "icm.commons.trash", str(self.folder)],
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+            start_new_session=True,
+        )
+
+
+# -- Background deletion: python -m icm.commons.trash <folder>
+if __name__ == "__main__":
+    Trash(Path(sys.argv[1])).empty()
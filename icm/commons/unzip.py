@@ -0,0 +1,535 @@
+"""Uncompress collections while they are being downloaded"""
+
+import errno
+import os
+import shutil
+import struct
+import sys
+import tempfile
+import threading
+import zipfile
+import zlib
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import contextmanager
+from pathlib import Path
+
+# -- Zip signatures
+SIG_LOCAL = 0x04034B50
+SIG_DESCRIPTOR = 0x08074B50
+
+# -- Local file header: signature, version, flags, method, time, date,
+# -- crc, compressed size, uncompressed size, name length, extra length
+LOCAL_HEADER = struct.Struct("<IHHHHHIIIHH")
+
+# -- Flags in the local header
+FLAG_ENCRYPTED = 0x01
+FLAG_DESCRIPTOR = 0x08
+FLAG_UTF8 = 0x800
+
+# -- Size value used by the zip64 entries
+ZIP64_SIZE = 0xFFFFFFFF
+
+# -- Number of members extracted by every task, when extracting in parallel
+BATCH_SIZE = 32
+
+# -- Suffix of the hidden folders where the collections are extracted
+# -- before moving them into place (Ex. .x8f2k_3a.partial)
+STAGING_SUFFIX = ".partial"
+
+# -- renameat2() arguments (Linux): swap the two paths atomically, both
+# -- relative to the current folder
+RENAME_EXCHANGE = 0x2
+AT_FDCWD = -100
+
+
+def member_path(dest: Path, name: str) -> Path:
+    """Return the path where the given zip member is extracted
+    The absolute paths and the '..' components are removed, the same
+    as zipfile.ZipFile.extract() does
+    * dest: Destination folder
+    * name: Name of the member inside the zip file
+    """
+
+    parts = [
+        part
+        for part in name.replace("\\", "/").split("/")
+        if part not in ("", ".", "..")
+    ]
+
+    # -- Remove the Windows drive letters (Ex. "C:")
+    if parts:
+        parts[0] = os.path.splitdrive(parts[0])[1] or parts[0]
+
+    return dest.joinpath(*parts)
+
+
+@contextmanager
+def staging(dest: Path):
+    """Hidden folder, inside dest, where a collection is extracted
+    before it is put in place. When the block finishes, its folders are
+    moved into dest (they are just renamed). The folders that already
+    exist are replaced (see exchange), so no old files are left in
+    them. If there is an error it is removed: no half extracted
+    collection is ever left in dest
+    * dest: Destination folder (Ex. ~/.icestudio/collections)
+    """
+
+    dest.mkdir(parents=True, exist_ok=True)
+    folder = Path(
+        tempfile.mkdtemp(prefix=".", suffix=STAGING_SUFFIX, dir=dest)
+    )
+
+    try:
+        yield folder
+
+        for entry in sorted(folder.iterdir()):
+            if (dest / entry.name).is_dir() and entry.is_dir():
+                exchange(entry, dest / entry.name)
+            else:
+                os.replace(entry, dest / entry.name)
+
+    finally:
+        shutil.rmtree(folder, ignore_errors=True)
+
+
+def exchange(new: Path, dest: Path) -> None:
+    """Put the folder new in place of the folder dest, removing the old
+    contents. On Linux both folders are swapped atomically: dest always
+    exists, either with the old or with the new contents
+    * new: Folder with the new contents (in the same filesystem)
+    * dest: Folder to replace (Ex. ~/.icestudio/collections/iceK-0.1.4)
+    """
+
+    if not dest.exists():
+        os.replace(new, dest)
+        return
+
+    if _rename_exchange(new, dest):
+        shutil.rmtree(new)
+        return
+
+    # -- No atomic swap: dest is moved away and new is renamed into its
+    # -- place. Between the two renames dest does not exist. If the
+    # -- second one fails, the old folder is restored
+    old = dest.with_name(f".{dest.name}.old")
+    shutil.rmtree(old, ignore_errors=True)
+    os.replace(dest, old)
+    try:
+        os.replace(new, dest)
+    except OSError:
+        os.replace(old, dest)
+        raise
+
+    shutil.rmtree(old)
+
+
+def _rename_exchange(src: Path, dst: Path) -> bool:
+    """Swap the two paths with renameat2(RENAME_EXCHANGE)
+    Return False if it is not available (not Linux, old libc, or not
+    supported by the filesystem)
+    """
+
+    if not sys.platform.startswith("linux"):
+        return False
+
+    import ctypes  # pylint: disable=C0415
+
+    try:
+        renameat2 = ctypes.CDLL(None, use_errno=True).renameat2
+    except (OSError, AttributeError):
+        return False
+
+    result = renameat2(
+        AT_FDCWD,
+        os.fsencode(src),
+        AT_FDCWD,
+        os.fsencode(dst),
+        RENAME_EXCHANGE,
+    )
+    if result == 0:
+        return True
+
+    err = ctypes.get_errno()
+    if err in (errno.EINVAL, errno.ENOSYS, errno.ENOTSUP):
+        return False
+    raise OSError(err, os.strerror(err), str(src), None, str(dst))
+
+
+def extract_parallel(zip_file: Path, dest: Path, jobs: int, update=None):
+    """Extract all the members of the zip file using several threads
+    All the folders are created first. Then the files are extracted in
+    batches by the threads. Every thread has its own ZipFile handle.
+    The members are decompressed and written in blocks, so the memory
+    used does not depend on the file sizes
+    * zip_file: Zip file to extract
+    * dest: Destination folder
+    * jobs: Number of threads
+    * update: Function called with the number of members extracted
+      (for showing the progress)
+    """
+
+    update = update or (lambda n: None)
+
+    with zipfile.ZipFile(zip_file, "r") as zip_ref:
+        members = zip_ref.infolist()
+
+    # -- Create all the folders in one pass
+    _create_folders(dest, members)
+    update(sum(1 for info in members if info.is_dir()))
+
+    # -- Extract the files in batches
+    files = [info for info in members if not info.is_dir()]
+
+    handles = _ZipHandles(zip_file)
+    try:
+        with ThreadPoolExecutor(max_workers=jobs) as pool:
+            futures = [
+                pool.submit(_extract_batch, handles, batch, dest)
+                for batch in _batches(files)
+            ]
+
+            for future in as_completed(futures):
+                update(future.result())
+
+    finally:
+        handles.close()
+
+
+def _create_folders(dest: Path, members: list) -> None:
+    """Create all the folders needed for extracting the given members"""
+
+    folders = {dest}
+    for info in members:
+        path = member_path(dest, info.filename)
+        folders.add(path if info.is_dir() else path.parent)
+
+    for folder in sorted(folders):
+        folder.mkdir(parents=True, exist_ok=True)
+
+
+def _batches(files: list):
+    """Split the list of files in batches of BATCH_SIZE files"""
+
+    for pos in range(0, len(files), BATCH_SIZE):
+        end = pos + BATCH_SIZE
+        yield files[pos:end]
+
+
+def _extract_batch(handles, batch: list, dest: Path) -> int:
+    """Extract the given members, using the ZipFile of the current thread
+    Return the number of members extracted
+    """
+
+    zip_ref = handles.get()
+    for info in batch:
+        zip_ref.extract(info, dest)
+
+    return len(batch)
+
+
+class _ZipHandles:
+    """Open ZipFile objects: one per thread
+    * zip_file: Zip file
+    """
+
+    def __init__(self, zip_file: Path) -> None:
+        self.zip_file = zip_file
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._opened = []
+
+    def get(self) -> zipfile.ZipFile:
+        """Return the ZipFile of the current thread"""
+
+        if not hasattr(self._local, "zip_ref"):
+            # -- It is closed by close()
+            self._local.zip_ref = zipfile.ZipFile(  # pylint: disable=R1732
+                self.zip_file, "r"
+            )
+            with self._lock:
+                self._opened.append(self._local.zip_ref)
+
+        return self._local.zip_ref
+
+    def close(self) -> None:
+        """Close all the ZipFiles"""
+
+        with self._lock:
+            for zip_ref in self._opened:
+                zip_ref.close()
+            self._opened = []
+
+
+class StreamExtractor:
+    """Extract the members of a zip file as its bytes arrive
+    The zip is read from the local headers, without waiting for the
+    central directory (at the end of the file). Not all the members can
+    be streamed (Ex. stored members with a data descriptor). When one of
+    them is found, the extraction is stopped and the rest of the members
+    are extracted by finish(), using the central directory
+
+    All the bytes received are also written in the spool file, so that
+    the central directory can be read at the end
+
+    * dest: Destination folder (Ex. ~/.icestudio/collections)
+    * spool: Binary file where a copy of the zip file is stored.
+      Anonymous temporary files should be used
+    """
+
+    def __init__(self, dest: Path, spool) -> None:
+        self.dest = dest
+        self.spool = spool
+
+        # -- Names of the members already extracted
+        self.extracted = set()
+
+        # -- ZipInfo of all the members (read by finish())
+        self.members = []
+
+        # -- Bytes received but not processed yet
+        self._buffer = bytearray()
+
+        # -- Streaming active. It is disabled when a member
+        # -- cannot be streamed or when the central directory is reached
+        self._streaming = True
+
+        # -- Member being extracted (None: waiting for a local header)
+        self._member = None
+
+    def feed(self, data: bytes) -> None:
+        """Process the next bytes of the zip file"""
+
+        self.spool.write(data)
+
+        if self._streaming:
+            self._buffer += data
+            self._process()
+
+    def finish(self) -> int:
+        """All the zip file has been received. Extract the members not
+        extracted yet, reading the central directory from the spool
+        Return the total number of members in the zip file
+        """
+
+        # -- The last member was not complete: the zip is truncated
+        if self._member is not None:
+            self._member.close()
+            raise zipfile.BadZipFile("Truncated zip file")
+
+        self.spool.seek(0)
+        with zipfile.ZipFile(self.spool, "r") as zip_ref:
+            self.members = zip_ref.infolist()
+
+            for info in self.members:
+                if info.filename not in self.extracted:
+                    zip_ref.extract(info, self.dest)
+                    self.extracted.add(info.filename)
+
+        return len(self.members)
+
+    def close(self) -> None:
+        """Close the file being extracted, if any (Ex. after an error)"""
+
+        if self._member is not None:
+            self._member.close()
+
+    def _process(self) -> None:
+        """Extract all the data available in the buffer"""
+
+        while self._streaming:
+
+            # -- Waiting for a new member
+            if self._member is None:
+                if not self._read_header():
+                    return
+
+            # -- Extract the data of the current member
+            elif not self._member.write(self._buffer):
+                return
+
+            # -- Member completed
+            else:
+                self.extracted.add(self._member.name)
+                self._member = None
+
+    def _read_header(self) -> bool:
+        """Read the next local header from the buffer
+        Return True if the header has been read, or False if there
+        is not enough data yet
+        """
+
+        if len(self._buffer) < 4:
+            return False
+
+        # -- Not a local header: central directory reached. There
+        # -- are no more members. The rest is read by finish()
+        (signature,) = struct.unpack_from("<I", self._buffer)
+        if signature != SIG_LOCAL:
+            self._stop()
+            return False
+
+        if len(self._buffer) < LOCAL_HEADER.size:
+            return False
+
+        _, _, flags, method, _, _, crc, csize, usize, nlen, elen = (
+            LOCAL_HEADER.unpack_from(self._buffer)
+        )
+
+        # -- The full header (with name and extra fields) is needed
+        size = LOCAL_HEADER.size + nlen + elen
+        if len(self._buffer) < size:
+            return False
+
+        # -- Get the member name
+        start, end = (LOCAL_HEADER.size, LOCAL_HEADER.size + nlen)
+        name = bytes(self._buffer[start:end]).decode(
+            "utf-8" if flags & FLAG_UTF8 else "cp437"
+        )
+
+        # -- Members that cannot be streamed
+        descriptor = bool(flags & FLAG_DESCRIPTOR)
+        if (
+            flags & FLAG_ENCRYPTED
+            or method not in (zipfile.ZIP_STORED, zipfile.ZIP_DEFLATED)
+            or ZIP64_SIZE in (csize, usize)
+            or (descriptor and method == zipfile.ZIP_STORED)
+        ):
+            self._stop()
+            return False
+
+        del self._buffer[:size]
+
+        # -- Size not known when there is a data descriptor
+        if descriptor:
+            csize = None
+
+        self._member = _Member(
+            member_path(self.dest, name), name, method, crc, csize
+        )
+        return True
+
+    def _stop(self) -> None:
+        """Stop the streaming. The pending members are extracted
+        from the spool by finish()"""
+
+        self._streaming = False
+        self._buffer = bytearray()
+
+
+class _Member:
+    """Zip member being extracted from the stream
+    * path: Destination file
+    * name: Name of the member in the zip file
+    * method: Compression method (stored or deflated)
+    * crc: Expected CRC-32 (not used if there is a data descriptor)
+    * csize: Compressed size (None if there is a data descriptor)
+    """
+
+    def __init__(self, path: Path, name: str, method, crc, csize) -> None:
+        self.name = name
+        self.crc = crc
+        self.remaining = csize
+        self._crc = 0
+        self._done = False
+
+        if method == zipfile.ZIP_DEFLATED:
+            self._inflate = zlib.decompressobj(-zlib.MAX_WBITS)
+        else:
+            self._inflate = None
+
+        # -- Directories are just created
+        if name.endswith("/"):
+            path.mkdir(parents=True, exist_ok=True)
+            self._file = None
+        else:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            self._file = open(path, "wb")  # pylint: disable=R1732
+
+    @property
+    def _descriptor(self) -> bool:
+        """The member has a data descriptor (its size is not known)"""
+        return self.remaining is None
+
+    def write(self, buffer: bytearray) -> bool:
+        """Extract the data available in the buffer. The bytes used are
+        removed from the buffer
+        Return True when the member is complete
+        """
+
+        if not self._done:
+            self._write_data(buffer)
+
+        # -- Read the data descriptor, after the compressed data
+        if self._done and self._descriptor:
+            if not self._read_descriptor(buffer):
+                return False
+
+        if not self._done:
+            return False
+
+        self.close()
+
+        if self._crc != self.crc:
+            raise zipfile.BadZipFile(f"Bad CRC-32 for file {self.name}")
+
+        return True
+
+    def _write_data(self, buffer: bytearray) -> None:
+        """Write the compressed data in the buffer to the file"""
+
+        # -- Data descriptor: the deflate stream tells where the data ends
+        if self._descriptor:
+            data = self._inflate.decompress(bytes(buffer))
+            unused = self._inflate.unused_data
+            self._done = self._inflate.eof
+            del buffer[: len(buffer) - len(unused)]
+            self._output(data)
+            return
+
+        # -- Known size: take only the bytes of this member
+        chunk = bytes(buffer[: self.remaining])
+        del buffer[: len(chunk)]
+        self.remaining -= len(chunk)
+
+        if self._inflate:
+            data = self._inflate.decompress(chunk)
+            if not self.remaining:
+                data += self._inflate.flush()
+        else:
+            data = chunk
+
+        self._output(data)
+        self._done = not self.remaining
+
+    def _read_descriptor(self, buffer: bytearray) -> bool:
+        """Read the data descriptor: [signature] crc csize usize
+        Return False if there is not enough data yet
+        """
+
+        # -- The signature is optional
+        offset = 0
+        if len(buffer) >= 4:
+            (signature,) = struct.unpack_from("<I", buffer)
+            offset = 4 if signature == SIG_DESCRIPTOR else 0
+
+        if len(buffer) < offset + 12:
+            return False
+
+        (self.crc,) = struct.unpack_from("<I", buffer, offset)
+        del buffer[: offset + 12]
+        return True
+
+    def _output(self, data: bytes) -> None:
+        """Write the uncompressed data to the destination file"""
+
+        if data:
+            self._crc = zlib.crc32(data, self._crc)
+            if self._file:
+                self._file.write(data)
+
+    def close(self) -> None:
+        """Close the destination file"""
+
+        if self._file:
+            self._file.close()
+            self._file = None
@@ -0,0 +1,194 @@
+"""Disk usage of the installed collections"""
+
+import os
+import json
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import NamedTuple
+
+# -- Folder with the files generated by icestudio when building. They
+# -- are not part of the collection
+ICE_BUILD = "ice-build"
+
+
+class Totals(NamedTuple):
+    """Disk usage of a folder (including its subfolders)
+    * size: Bytes of all the files
+    * files: Number of files
+    * ice: Number of .ice files
+    * build_size: Bytes of the files inside ice-build folders
+    * build_files: Number of files inside ice-build folders
+    """
+
+    size: int = 0
+    files: int = 0
+    ice: int = 0
+    build_size: int = 0
+    build_files: int = 0
+
+    def __add__(self, other):
+        return Totals(*(a + b for a, b in zip(self, other)))
+
+
+class Usage(NamedTuple):
+    """Disk usage of an installed collection
+    * nametag: Collection folder (Ex. iceK-0.1.4)
+    * totals: Totals of all the collection
+    * subfolders: List of (name, size) of the top level subfolders,
+      from the largest to the smallest
+    """
+
+    nametag: str
+    totals: Totals
+    subfolders: list
+
+
+class UsageCache:
+    """Cache of the contents of the folders, keyed by their mtimes
+    Only the names of the direct files and subfolders of every folder
+    are stored: when a file is added, removed or renamed the folder
+    mtime changes and it is read again. The unchanged folders are not
+    read. Their files are only stat'ed: a file rewritten in place (Ex.
+    by ice-build) does not change the folder mtime, but its size can
+    change
+    * path: Cache file (Ex. ~/.icestudio/icm-cache/usage.json)
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+
+    def load(self) -> dict:
+        """Read the cache: {folder: [mtime, files, subdirs]}"""
+
+        try:
+            with open(self.path, "r", encoding="utf-8") as file:
+                return json.load(file)
+
+        # -- No cache yet, or it is corrupted: start again
+        except (OSError, ValueError):
+            return {}
+
+    def save(self, folders: dict) -> None:
+        """Write the cache. A temporary file is written first, so that
+        it is never left half written
+        """
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(f".{uuid.uuid4().hex}.tmp")
+        with open(tmp, "w", encoding="utf-8") as file:
+            json.dump(folders, file)
+        os.replace(tmp, self.path)
+
+
+def disk_usage(collections: list, cache: UsageCache = None, jobs=8) -> list:
+    """Return the Usage of the given collections, from the largest
+    to the smallest. The collections are walked in parallel
+    * collections: Collection folders
+    * cache: Cache of the folder contents (None: no cache)
+    * jobs: Number of collections walked at the same time
+    """
+
+    old = cache.load() if cache else {}
+    new = {}
+
+    def walk(folder: Path) -> Usage:
+        # -- Every thread writes different keys
+        return collection_usage(folder, old, new)
+
+    with ThreadPoolExecutor(max_workers=jobs) as pool:
+        usages = list(pool.map(walk, collections))
+
+    # -- Keep the cached folders of the collections not walked now
+    if cache:
+        walked = tuple(str(folder) for folder in collections)
+        for key, value in old.items():
+            if not _inside(key, walked):
+                new.setdefault(key, value)
+        cache.save(new)
+
+    return sorted(usages, key=lambda usage: -usage.totals.size)
+
+
+def collection_usage(folder: Path, old: dict, new: dict) -> Usage:
+    """Return the Usage of one collection
+    * old: Cached folder contents
+    * new: The current folder contents are added here
+    """
+
+    own, subdirs = _contents(folder, old, new)
+    totals = Totals(*own)
+
+    subfolders = []
+    for name in subdirs:
+        sub = _totals(folder / name, name == ICE_BUILD, old, new)
+        subfolders.append((name, sub.size))
+        totals += sub
+
+    subfolders.sort(key=lambda item: -item[1])
+    return Usage(folder.name, totals, subfolders)
+
+
+def _totals(folder: Path, build: bool, old: dict, new: dict) -> Totals:
+    """Return the Totals of a folder (recursively)
+    * build: The folder is an ice-build folder (or inside one)
+    """
+
+    own, subdirs = _contents(folder, old, new)
+    totals = Totals(*own)
+
+    for name in subdirs:
+        totals += _totals(folder / name, build or name == ICE_BUILD, old, new)
+
+    if build:
+        totals = totals._replace(
+            build_size=totals.size, build_files=totals.files
+        )
+
+    return totals
+
+
+def _inside(key: str, folders: tuple) -> bool:
+    """Check if the folder (key) is one of the folders, or inside them"""
+    return any(
+        key == folder or key.startswith(folder + os.sep) for folder in folders
+    )
+
+
+def _contents(folder: Path, old: dict, new: dict) -> tuple:
+    """Return the (size, files, ice) of the direct files of the folder
+    and the names of its subfolders. The names are taken from the cache
+    if the folder has not changed. The sizes are always read (stat)
+    """
+
+    key = str(folder)
+    mtime = os.stat(folder).st_mtime_ns
+
+    cached = old.get(key)
+    if cached and len(cached) == 3 and cached[0] == mtime:
+        try:
+            size = sum(os.lstat(folder / name).st_size for name in cached[1])
+        # -- The folder has changed while reading it: read it again
+        except FileNotFoundError:
+            pass
+        else:
+            new[key] = cached
+            return (size, len(cached[1]), _ice(cached[1])), cached[2]
+
+    size = 0
+    names, subdirs = [], []
+    with os.scandir(folder) as entries:
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                subdirs.append(entry.name)
+            elif entry.is_file(follow_symlinks=False):
+                size += entry.stat(follow_symlinks=False).st_size
+                names.append(entry.name)
+
+    new[key] = [mtime, names, subdirs]
+    return (size, len(names), _ice(names)), subdirs
+
+
+def _ice(names: list) -> int:
+    """Return the number of .ice files"""
+    return sum(name.endswith(".ice") for name in names)
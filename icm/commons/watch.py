@@ -0,0 +1,257 @@
+"""Watch the changes of the files of a collection (icm update --watch)
+
+The changes are detected with inotify (Linux). If it is not available
+the files are polled. The changes are debounced: a burst of changes
+(Ex. an editor saving a file, git checkout...) is returned at once
+"""
+
+import os
+import time
+import ctypes
+import select
+import struct
+
+# -- Time (seconds) without changes before returning them
+DEBOUNCE = 0.3
+
+# -- Time (seconds) between two scans, when polling
+POLL_INTERVAL = 1.0
+
+# -- inotify events (see man inotify)
+IN_MODIFY = 0x2
+IN_ATTRIB = 0x4
+IN_CLOSE_WRITE = 0x8
+IN_MOVED_FROM = 0x40
+IN_MOVED_TO = 0x80
+IN_CREATE = 0x100
+IN_DELETE = 0x200
+IN_DELETE_SELF = 0x400
+IN_MOVE_SELF = 0x800
+IN_Q_OVERFLOW = 0x4000
+IN_IGNORED = 0x8000
+IN_ISDIR = 0x40000000
+
+# -- Events watched
+IN_MASK = (
+    IN_MODIFY
+    | IN_ATTRIB
+    | IN_CLOSE_WRITE
+    | IN_MOVED_FROM
+    | IN_MOVED_TO
+    | IN_CREATE
+    | IN_DELETE
+    | IN_DELETE_SELF
+    | IN_MOVE_SELF
+)
+
+# -- inotify event header: wd, mask, cookie, len (followed by the name)
+EVENT = struct.Struct("iIII")
+
+# -- Maximum size of the events read at once
+READ_SIZE = 64 * 1024
+
+
+class _Watcher:
+    """Base of the watchers
+    * root: Collection folder
+    * trees: Folders watched recursively (relative to root)
+    * files: Files of the root folder watched (Ex. package.json)
+    """
+
+    def __init__(self, root: str, trees: tuple, files: tuple) -> None:
+        self.root = root
+        self.trees = trees
+        self.files = files
+
+    def wait(self, timeout: float = None) -> set:
+        """Wait for changes. They are returned when there are no more
+        changes for DEBOUNCE seconds: the paths changed (relative to
+        the root, "/" separated). Ex. {"blocks/Logic/and.ice"}
+        * timeout: Maximum time waiting for the first change (None:
+          forever). An empty set is returned if there are no changes
+        """
+
+        changed = self._changes(timeout)
+        while changed:
+            more = self._changes(DEBOUNCE)
+            if not more:
+                break
+            changed |= more
+        return changed
+
+    def close(self) -> None:
+        """Stop watching"""
+
+    def _changes(self, timeout: float) -> set:
+        """Return the paths changed before the timeout (None: wait
+        for the first change)
+        """
+        raise NotImplementedError
+
+    def _watched(self, path: str) -> bool:
+        """Check if the given path (relative) is watched"""
+
+        top = path.split("/", 1)[0]
+        return top in self.trees or path in self.files
+
+
+class InotifyWatcher(_Watcher):
+    """Watcher based on inotify. A watch is added for the root folder
+    and for every folder of the trees (the new folders are added when
+    they are created). OSError is raised if inotify is not available
+    """
+
+    def __init__(self, root: str, trees: tuple, files: tuple) -> None:
+        super().__init__(root, trees, files)
+
+        try:
+            self._libc = ctypes.CDLL(None, use_errno=True)
+            self._fd = self._libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        # -- Not Linux
+        except (AttributeError, TypeError) as exc:
+            raise OSError("inotify not available") from exc
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+
+        # -- Watched folders (relative path) by their watch descriptor
+        self._folders = {}
+
+        self._add_watch("")
+        for tree in trees:
+            self._add_tree(tree)
+
+    def close(self) -> None:
+        os.close(self._fd)
+
+    def _changes(self, timeout: float) -> set:
+        readable, _, _ = select.select([self._fd], [], [], timeout)
+        if not readable:
+            return set()
+
+        try:
+            data = os.read(self._fd, READ_SIZE)
+        except BlockingIOError:
+            return set()
+
+        changed = set()
+        pos = 0
+        while pos < len(data):
+            wd, mask, _, size = EVENT.unpack_from(data, pos)
+            start, pos = pos + EVENT.size, pos + EVENT.size + size
+            name = os.fsdecode(data[start:pos].rstrip(b"\0"))
+
+            # -- Events lost: everything could have changed
+            if mask & IN_Q_OVERFLOW:
+                changed.update(self.trees + self.files)
+                continue
+
+            folder = self._folders.get(wd)
+            if folder is None:
+                continue
+            if mask & IN_IGNORED:
+                del self._folders[wd]
+                continue
+
+            path = f"{folder}/{name}" if folder and name else folder or name
+            if not self._watched(path):
+                continue
+            changed.add(path)
+
+            # -- New folder: watch it (and its subfolders)
+            if mask & IN_ISDIR and mask & (IN_CREATE | IN_MOVED_TO):
+                changed.update(self._add_tree(path))
+
+        return changed
+
+    def _add_tree(self, tree: str) -> list:
+        """Watch all the folders of a tree. Return their paths"""
+
+        added = []
+        for root, _, _ in os.walk(os.path.join(self.root, tree)):
+            path = os.path.relpath(root, self.root).replace(os.sep, "/")
+            if self._add_watch(path):
+                added.append(path)
+        return added
+
+    def _add_watch(self, path: str) -> bool:
+        """Watch the given folder (relative path)"""
+
+        folder = os.path.join(self.root, path).encode()
+        wd = self._libc.inotify_add_watch(self._fd, folder, IN_MASK)
+        if wd < 0:
+            return False
+        self._folders[wd] = path
+        return True
+
+
+class PollingWatcher(_Watcher):
+    """Watcher that scans the files every POLL_INTERVAL seconds and
+    compares their modification times and sizes
+    """
+
+    def __init__(self, root: str, trees: tuple, files: tuple) -> None:
+        super().__init__(root, trees, files)
+        self._snapshot = self._scan()
+
+    def _changes(self, timeout: float) -> set:
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            if deadline is None:
+                time.sleep(POLL_INTERVAL)
+            else:
+                time.sleep(
+                    max(0, min(POLL_INTERVAL, deadline - time.monotonic()))
+                )
+
+            snapshot = self._scan()
+            changed = {
+                path
+                for path in snapshot.keys() | self._snapshot.keys()
+                if snapshot.get(path) != self._snapshot.get(path)
+            }
+            self._snapshot = snapshot
+
+            if changed or (deadline and time.monotonic() >= deadline):
+                return changed
+
+    def _scan(self) -> dict:
+        """Return the (mtime, size) of all the watched files and
+        folders, by their path
+        """
+
+        snapshot = {}
+        for name in self.files + self.trees:
+            path = os.path.join(self.root, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            snapshot[name] = (stat.st_mtime_ns, stat.st_size)
+
+        for tree in self.trees:
+            for root, dirs, files in os.walk(os.path.join(self.root, tree)):
+                prefix = os.path.relpath(root, self.root).replace(os.sep, "/")
+                for name in dirs + files:
+                    try:
+                        stat = os.stat(os.path.join(root, name))
+                    except OSError:
+                        continue
+                    snapshot[f"{prefix}/{name}"] = (
+                        stat.st_mtime_ns,
+                        stat.st_size,
+                    )
+        return snapshot
+
+
+def watcher(root: str, trees: tuple, files: tuple) -> _Watcher:
+    """Return a watcher of the collection files: inotify if available,
+    polling if not
+    * root: Collection folder
+    * trees: Folders watched recursively (Ex. ("blocks", "examples"))
+    * files: Files of the root folder watched (Ex. ("package.json",))
+    """
+
+    try:
+        return InotifyWatcher(root, trees, files)
+    except OSError:
+        return PollingWatcher(root, trees, files)
@@ -1,5 +1,8 @@
 # -*- coding: utf-8 -*-
 
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
 import pytest
 from click.testing import CliRunner
 
@@ -17,3 +20,26 @@ def validate_cliresult():
         assert not result.exception
         assert 'error' not in result.output.lower()
     return decorator
+
+
+@pytest.fixture
+def http_server():
+    """Local HTTP server. The test sets server.handle to the function
+    that answers the GET requests (called with the request handler)"""
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            self.server.requests.append(dict(self.headers))
+            self.server.handle(self)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    server.requests = []
+    server.url = f'http://127.0.0.1:{server.server_port}/col.zip'
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
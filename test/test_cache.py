@@ -0,0 +1,93 @@
+import threading
+import time
+
+from icm.commons.cache import ArchiveCache
+
+
+def make_archive(cache, size, byte=b'x'):
+    path = cache.tmpfile('col', 'heads/main')
+    path.write_bytes(byte * size)
+    return path
+
+
+def test_cache_store_lookup(tmp_path):
+    cache = ArchiveCache(tmp_path)
+    assert cache.lookup('iceK', 'tags/v0.1.4') is None
+
+    archive = make_archive(cache, 100)
+    entry = cache.store('iceK', 'tags/v0.1.4', 'url', archive, '"etag"')
+    assert not archive.exists()
+    assert not entry.mutable
+
+    found = cache.lookup('iceK', 'tags/v0.1.4')
+    assert found.digest == entry.digest
+    assert found.etag == '"etag"'
+    assert cache.path(found).read_bytes() == b'x' * 100
+
+    cache.hit(found)
+    assert cache.stats()['hits'] == 1
+    assert cache.stats()['misses'] == 1
+
+
+def test_cache_lru_eviction(tmp_path):
+    cache = ArchiveCache(tmp_path, max_size=250)
+
+    cache.store('iceK', 'heads/main', 'url', make_archive(cache, 100, b'a'))
+    cache.store('iceIO', 'heads/main', 'url', make_archive(cache, 100, b'b'))
+    cache.hit(cache.lookup('iceK', 'heads/main'))
+    cache.store('iceFF', 'heads/main', 'url', make_archive(cache, 100, b'c'))
+
+    names = [entry.name for entry in cache.entries()]
+    assert names == ['iceFF', 'iceK']
+    assert len(list(cache.blobs.glob('*.zip'))) == 2
+
+
+def test_cache_clean(tmp_path):
+    cache = ArchiveCache(tmp_path)
+    cache.store('iceK', 'heads/main', 'url', make_archive(cache, 10, b'a'))
+    cache.store('iceIO', 'heads/main', 'url', make_archive(cache, 20, b'b'))
+
+    assert cache.clean(('iceIO',)) == 20
+    assert [entry.name for entry in cache.entries()] == ['iceK']
+    assert cache.clean() == 10
+    assert cache.entries() == []
+
+
+def test_download_lock(tmp_path):
+    cache = ArchiveCache(tmp_path)
+    inside = []
+
+    def download():
+        with cache.download_lock('iceK', 'tags/v0.1.4'):
+            inside.append('in')
+            time.sleep(0.1)
+            inside.append('out')
+
+    # -- Only one download at a time: nobody enters while other is inside
+    threads = [threading.Thread(target=download) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert inside == ['in', 'out'] * 3
+
+
+def test_cache_shared(tmp_path):
+    # -- Two caches in the same folder (Ex. two icm processes)
+    caches = [ArchiveCache(tmp_path), ArchiveCache(tmp_path)]
+
+    def store(n):
+        cache = caches[n % 2]
+        archive = cache.downloads / f'{n}.zip'
+        archive.write_bytes(str(n).encode())
+        cache.store(f'col{n}', 'heads/main', 'url', archive)
+
+    caches[0].downloads.mkdir(parents=True)
+    threads = [threading.Thread(target=store, args=(n,)) for n in range(40)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(caches[0].entries()) == 40
+    assert len(list(caches[1].blobs.glob('*.zip'))) == 40
@@ -0,0 +1,41 @@
+import time
+
+from icm.commons.catalog import Catalog, CatalogEntry
+
+
+def test_catalog_save_load(tmp_path):
+    path = tmp_path / 'catalog.jsonl'
+    catalog = Catalog(path)
+    assert not catalog.exists()
+    assert catalog.get('iceK') is None
+
+    entries = [
+        CatalogEntry('iceK', 'stable', '0.1.4', 'Constants', 'url1', 10, 'a'),
+        CatalogEntry('iceBoards', 'dev', '0.1.0', 'Boards', 'url2'),
+    ]
+    catalog.save(entries)
+    assert len(path.read_text().splitlines()) == 2
+
+    loaded = Catalog(path)
+    assert list(loaded.entries.values()) == entries
+    assert loaded.get('iceK').package == {
+        'name': 'iceK', 'version': '0.1.4', 'description': 'Constants'
+    }
+
+
+def test_catalog_corrupted(tmp_path):
+    path = tmp_path / 'catalog.jsonl'
+    path.write_text('{"name": "iceK"}\n')
+    assert Catalog(path).entries == {}
+
+
+def test_catalog_max_age(tmp_path):
+    catalog = Catalog(tmp_path / 'catalog.jsonl')
+    catalog.save([
+        CatalogEntry('iceK', 'stable', '0.1.4', '', 'url', updated=time.time()),
+        CatalogEntry('iceIO', 'stable', '0.1.0', '', 'url', updated=1000),
+    ])
+
+    assert catalog.get('iceK', 600).version == '0.1.4'
+    assert catalog.get('iceIO', 600) is None
+    assert catalog.get('iceIO').version == '0.1.0'
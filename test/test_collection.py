@@ -0,0 +1,22 @@
+from icm.commons import collection
+
+
+def test_scan(tmp_path, monkeypatch):
+    (tmp_path / 'blocks' / 'Logic' / 'ice-build').mkdir(parents=True)
+    (tmp_path / 'blocks' / 'Logic' / 'or.ice').write_text('{}')
+    (tmp_path / 'blocks' / 'Logic' / 'and.ice').write_text('{}')
+    (tmp_path / 'locale' / 'es_ES').mkdir(parents=True)
+    (tmp_path / 'locale' / 'es_ES' / 'es_ES.po').write_text('')
+    (tmp_path / 'locale' / 'en').mkdir()
+    (tmp_path / 'package.json').write_text('{"name": "iceK"}')
+    monkeypatch.chdir(tmp_path)
+
+    model = collection.scan()
+    assert model.blocks == [
+        ('blocks', ['Logic'], []),
+        ('blocks/Logic', ['ice-build'], ['and.ice', 'or.ice']),
+        ('blocks/Logic/ice-build', [], []),
+    ]
+    assert model.examples == []
+    assert model.locales == [('es_ES', 'locale/es_ES/es_ES.po')]
+    assert model.package == {'name': 'iceK'}
@@ -0,0 +1,54 @@
+import json
+
+from icm.commons.complete import (
+    complete_coltag,
+    complete_installed,
+    complete_name,
+)
+from icm.commons.context import Folders
+from icm.commons.metadata import MetadataCache
+
+
+def test_complete(tmp_path, monkeypatch):
+    monkeypatch.setenv('HOME', str(tmp_path))
+    folders = Folders()
+    for nametag in ('iceK-0.1.4', 'iceK-main', 'iceIO-0.1.0', '.hidden'):
+        (folders.collections / nametag).mkdir(parents=True)
+    folders.cache.mkdir(parents=True)
+    folders.catalog.write_text(
+        json.dumps(
+            {
+                'name': 'iceK',
+                'kind': 'stable',
+                'version': '0.1.5',
+                'description': '',
+                'url': '',
+                'size': 0,
+                'digest': '',
+                'updated': 0,
+            }
+        )
+        + '\n'
+    )
+    MetadataCache(folders.metadata).store(
+        'https://github.com/FPGAwars/iceK/raw/main/package.json',
+        {'name': 'iceK', 'version': '0.1.6'},
+    )
+
+    # -- Store collections
+    assert 'iceGates' in complete_coltag(None, None, 'ice')
+    assert complete_coltag(None, None, 'iceI') == ['iceIO', 'iceInputs']
+
+    # -- Versions: catalog, metadata and installed
+    assert complete_coltag(None, None, 'iceK@') == [
+        'iceK@0.1.4',
+        'iceK@0.1.5',
+        'iceK@0.1.6',
+    ]
+    assert complete_coltag(None, None, 'iceIO@0.1') == ['iceIO@0.1.0']
+
+    assert complete_installed(None, None, 'iceK-') == [
+        'iceK-0.1.4',
+        'iceK-main',
+    ]
+    assert complete_name(None, None, '') == ['iceIO', 'iceK']
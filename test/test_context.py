@@ -0,0 +1,21 @@
+from icm.commons.context import Folders, split_nametag
+
+
+def test_installed(tmp_path, monkeypatch):
+    monkeypatch.setenv('HOME', str(tmp_path))
+    folders = Folders()
+    assert folders.installed() == []
+
+    for nametag in ('iceK-main', 'iceIO-0.1.0', '.iceK-0.1.4.upgrade'):
+        (folders.collections / nametag).mkdir(parents=True)
+    (folders.collections / 'notes.txt').write_text('')
+
+    assert [folder.name for folder in folders.installed()] == [
+        'iceIO-0.1.0', 'iceK-main'
+    ]
+
+
+def test_split_nametag():
+    assert split_nametag('iceK-0.1.4') == ('iceK', '0.1.4')
+    assert split_nametag('ice-FF-0.2') == ('ice-FF', '0.2')
+    assert split_nametag('iceK-main') == ('iceK', '')
@@ -0,0 +1,49 @@
+import os
+
+from icm.commons import dedup as dedup_module
+from icm.commons.dedup import dedup
+
+
+def test_dedup_hardlink(tmp_path):
+    for version in ('iceK-0.1.3', 'iceK-0.1.4', 'iceK-main'):
+        folder = tmp_path / version / 'blocks'
+        folder.mkdir(parents=True)
+        (folder / 'same.ice').write_text('x' * 1000)
+        (folder / 'other.ice').write_text(version)
+    (tmp_path / 'iceK-main' / 'empty.ice').write_text('')
+
+    folders = sorted(tmp_path.iterdir())
+    result = dedup(folders, 'hardlink', dry_run=True)
+    assert result == (7, 2, 2000)
+    assert os.stat(tmp_path / 'iceK-main' / 'blocks' / 'same.ice').st_nlink == 1
+
+    result = dedup(folders, 'hardlink')
+    assert result == (7, 2, 2000)
+
+    inodes = {
+        (folder / 'blocks' / 'same.ice').stat().st_ino for folder in folders
+    }
+    assert len(inodes) == 1
+    assert (tmp_path / 'iceK-main' / 'blocks' / 'other.ice').read_text() == \
+        'iceK-main'
+    assert [p.name for p in tmp_path.rglob('.*')] == []
+
+    assert dedup(folders, 'hardlink') == (7, 0, 0)
+
+
+def test_dedup_devices(tmp_path, monkeypatch):
+    # -- The same inode numbers in two devices, with other contents
+    paths = []
+    for name, data in (('a', 'A'), ('b', 'B'), ('c', 'B'), ('d', 'C')):
+        paths.append(tmp_path / name)
+        paths[-1].write_text(data * 100)
+    files = [
+        dedup_module._File(paths[0], 100, 1, 10, 1),
+        dedup_module._File(paths[1], 100, 1, 20, 1),
+        dedup_module._File(paths[2], 100, 2, 10, 1),
+        dedup_module._File(paths[3], 100, 2, 30, 1),
+    ]
+    monkeypatch.setattr(dedup_module, '_scan', lambda folder: files)
+
+    result = dedup([tmp_path], dry_run=True)
+    assert result.linked == 0
@@ -0,0 +1,156 @@
+import io
+import os
+import zipfile
+
+import pytest
+
+from icm.commands import cmd_install
+from icm.commons import commons
+from icm.commons.cache import ArchiveCache
+from icm.commons.context import Folders
+
+DATA = io.BytesIO()
+with zipfile.ZipFile(DATA, 'w', zipfile.ZIP_DEFLATED) as ZIP:
+    for i in range(50):
+        ZIP.writestr(f'col-1.0/blocks/b{i}.ice', bytes(range(256)) * 40 * i)
+DATA = DATA.getvalue()
+
+
+def send(handler, data, status=200, headers=(), cut=None):
+    handler.send_response(status)
+    handler.send_header('Content-Length', str(len(data)))
+    for key, value in headers:
+        handler.send_header(key, value)
+    handler.end_headers()
+    handler.wfile.write(data[:cut])
+    if cut is not None:
+        handler.close_connection = True
+
+
+@pytest.fixture
+def collection(tmp_path, monkeypatch):
+    monkeypatch.setenv('HOME', str(tmp_path))
+    monkeypatch.setattr(commons, 'RETRY_DELAY', 0)
+    return commons.Collection(Folders(), progress=False)
+
+
+def test_download_extract_cut(collection, http_server):
+    # -- The connection is closed in the middle (it can not be resumed)
+    http_server.handle = lambda h: send(h, DATA, cut=len(DATA) // 2)
+    with pytest.raises(commons.DownloadError):
+        collection.download_extract(http_server.url)
+
+    # -- Nothing is left: the next attempt installs it
+    collections = collection.folders.collections
+    assert list(collections.iterdir()) == []
+
+    http_server.handle = lambda h: send(h, DATA)
+    result = collection.download_extract(http_server.url)
+    assert result.modified and len(result.members) == 50
+    assert [f.name for f in collections.iterdir()] == ['col-1.0']
+    assert len(list(collections.glob('col-1.0/blocks/*.ice'))) == 50
+
+
+def test_download_extract_retry(collection, http_server):
+    # -- Server errors in the first request: it is retried
+    errors = iter([503, 502])
+
+    def handle(handler):
+        status = next(errors, 200)
+        send(handler, DATA if status == 200 else b'', status)
+
+    http_server.handle = handle
+    result = collection.download_extract(http_server.url)
+    assert len(result.members) == 50 and len(http_server.requests) == 3
+
+    # -- The server can not be reached
+    with pytest.raises(commons.DownloadError):
+        collection.download_extract('http://127.0.0.1:1/col.zip')
+
+
+def ranged(handler, data, etag='"v1"', cut=None):
+    start = 0
+    if handler.headers.get('If-Range', etag) == etag:
+        start = int(handler.headers.get('Range', 'bytes=0-')[6:-1])
+
+    if start >= len(data):
+        send(handler, b'', 416)
+    elif start:
+        content_range = f'bytes {start}-{len(data) - 1}/{len(data)}'
+        send(handler, data[start:], 206, [
+            ('ETag', etag), ('Content-Range', content_range)
+        ], cut)
+    else:
+        send(handler, data, 200, [('ETag', etag)], cut)
+
+
+def test_download_resume(collection, http_server, tmp_path):
+    half = len(DATA) // 2
+    http_server.handle = lambda h: ranged(
+        h, DATA, cut=half if not h.headers.get('Range') else None
+    )
+    dest = tmp_path / 'col.zip'
+    assert collection.download(http_server.url, dest).etag == '"v1"'
+    assert dest.read_bytes() == DATA
+    assert list(tmp_path.glob('*.part*')) == []
+
+    # -- Only the rest of the file was asked for (if it has not changed)
+    resumed = http_server.requests[1]
+    assert resumed['Range'] == f'bytes={half}-'
+    assert resumed['If-Range'] == '"v1"'
+
+
+@pytest.mark.parametrize('size, etag', [
+    (len(DATA) + 10, '"v1"'),  # -- 416: the part is not valid
+    (100, '"v0"'),  # -- The file has changed: all of it is sent (200)
+])
+def test_download_restart(collection, http_server, tmp_path, size, etag):
+    http_server.handle = lambda h: ranged(h, DATA)
+    dest = tmp_path / 'col.zip'
+    part = tmp_path / 'col.zip.part'
+    part.write_bytes(b'x' * size)
+    (tmp_path / 'col.zip.part.etag').write_text(etag)
+
+    collection.download(http_server.url, dest)
+    assert dest.read_bytes() == DATA
+    assert http_server.requests[0]['Range'] == f'bytes={size}-'
+
+
+def test_download_extract_resume(collection, http_server, monkeypatch):
+    collection.cache = ArchiveCache(collection.folders.archives)
+    monkeypatch.setattr(collection, 'url', lambda *args: http_server.url)
+
+    # -- Big zip file (not compressed): several blocks are received
+    data = io.BytesIO()
+    with zipfile.ZipFile(data, 'w') as zip_file:
+        for i in range(50):
+            zip_file.writestr(f'col-1.0/blocks/b{i}.ice', os.urandom(20000))
+    data = data.getvalue()
+
+    # -- Every connection is closed before the end: it fails, but the
+    # -- data received is kept in the .part file
+    http_server.handle = lambda h: ranged(h, data, cut=100000)
+    with pytest.raises(commons.DownloadError):
+        cmd_install.fetch_cached(collection, 'col', '1.0')
+
+    part = commons.part_file(collection.cache.tmpfile('col', 'tags/v1.0'))
+    received = part.stat().st_size
+    assert 0 < received < len(data)
+    assert list(collection.folders.collections.iterdir()) == []
+
+    # -- The next execution only asks for the rest
+    http_server.requests.clear()
+    http_server.handle = lambda h: ranged(h, data)
+    members = cmd_install.fetch_cached(collection, 'col', '1.0')
+    assert len(members) == 50 and not part.exists()
+    assert http_server.requests[0]['Range'] == f'bytes={received}-'
+    assert len(list(collection.folders.collections.glob('col-1.0/*/*'))) == 50
+
+
+def test_download_not_modified(collection, http_server, tmp_path, capfd):
+    # -- Not changed: no progress bar is shown
+    collection.progress = True
+    http_server.handle = lambda h: send(h, b'', 304)
+    result = collection.download(http_server.url, tmp_path / 'col.zip', '"v1"')
+    assert not result.modified
+    assert 'Download' not in capfd.readouterr().err
@@ -0,0 +1,62 @@
+import io
+import json
+
+from icm.commons.ice import IceScanner, find_texts
+
+PROJECT = {
+    'package': {'name': 'Top', 'description': 'Top "quoted" block'},
+    'design': {
+        'graph': {
+            'blocks': [
+                {'data': {'info': 'Readonly after', 'readonly': True}},
+                {'data': {'readonly': True, 'info': 'Readonly before'}},
+                {'data': {'info': 'Editable', 'readonly': False}},
+                {'data': {'info': 'No flag'}},
+                {'data': {'info': 'Nested', 'size': {'readonly': True}}},
+                {'data': {'code': '"description": "not a key"'}},
+                {'data': {'name': 'info', 'list': ['readonly', 'info']}},
+            ]
+        }
+    },
+    'dependencies': {'dep': {'package': {'description': 'Señal'}}},
+}
+
+TEXTS = [
+    'Top \\"quoted\\" block',
+    'Señal',
+    'Readonly after',
+    'Readonly before',
+]
+
+
+def scan(project, chunk):
+    file = io.BytesIO(project.encode('utf-8'))
+    return list(IceScanner(file, chunk))
+
+
+def test_find_texts():
+    for indent, separators in ((2, None), (None, (',', ':'))):
+        project = json.dumps(
+            PROJECT, indent=indent, separators=separators, ensure_ascii=False
+        )
+        assert find_texts(project) == TEXTS
+
+
+def test_chunks():
+    project = json.dumps(PROJECT, indent=2, ensure_ascii=False)
+    texts = scan(project, 1024 * 1024)
+    keys = [key for key, _ in texts]
+    assert keys == ['description', 'info', 'info', 'description']
+
+    # -- The keys and texts cut between blocks are found too
+    for chunk in (1, 2, 3, 5, 8, 13, 64):
+        assert scan(project, chunk) == texts
+
+
+def test_not_seekable():
+    # -- It can not be scanned again: the readonly keys are always
+    # -- looked for
+    project = json.dumps(PROJECT, ensure_ascii=False).encode('utf-8')
+    reader = type('Reader', (), {'read': io.BytesIO(project).read})()
+    texts = [text for _, text in IceScanner(reader, 7)]
+    assert texts == [TEXTS[0], TEXTS[2], TEXTS[3], TEXTS[1]]
@@ -1,4 +1,8 @@
+import pytest
+
 from icm.__main__ import install
+from icm.commands import cmd_install
+from icm.commons import commons
 
 
 def test_install(clirunner, validate_cliresult):
@@ -6,6 +10,37 @@ def test_install(clirunner, validate_cliresult):
         clirunner.invoke(install)
 
 
+def test_install_parallel(tmp_path, monkeypatch, capsys):
+    monkeypatch.setenv('HOME', str(tmp_path))
+    collection = commons.Collection(commons.Folders())
+    collection.folders.collections.mkdir(parents=True, exist_ok=True)
+
+    packages = {'iceK': {'version': '0.1.4'}, 'iceIO': {'name': 'iceIO'}}
+    monkeypatch.setattr(
+        cmd_install, 'latest_package', lambda col, name: packages[name]
+    )
+
+    fetched = []
+
+    def fetch(col, name, version=''):
+        fetched.append(f'{name}@{version}')
+        if name == 'iceGates':
+            raise KeyError('version')
+        return []
+
+    monkeypatch.setattr(cmd_install, 'fetch', fetch)
+    monkeypatch.setattr(cmd_install, 'register', lambda *args: None)
+
+    coltags = ('iceK', 'iceK@0.1.4', 'iceIO', 'iceGates@0.2', 'iceK')
+    with pytest.raises(SystemExit):
+        cmd_install.install_parallel(collection, coltags, False, 4)
+
+    assert sorted(fetched) == ['iceGates@0.2', 'iceK@0.1.4']
+    out = capsys.readouterr().out
+    assert out.count('iceK-0.1.4') == 2
+    assert "KeyError: 'version'" in out
+
+
 
 # -- Test
     # install_main(collection, "iceK@0.1.4", True)
@@ -19,4 +54,4 @@ def test_install(clirunner, validate_cliresult):
     # install_main(collection, "iceCoders")
     # install_main(collection, "iceFF")
     # install_main(collection, "iceRegs")
-    # install_main(collection, "iceSRegs")
\ No newline at end of file
+    # install_main(collection, "iceSRegs")
@@ -0,0 +1,82 @@
+import zipfile
+
+from icm.commands import cmd_ls
+from icm.commons.context import Folders
+from icm.commons.inventory import (
+    Inventory, content_digest, from_archive, scan
+)
+
+
+def test_inventory(tmp_path):
+    folder = tmp_path / 'iceK-0.1.4'
+    (folder / 'blocks').mkdir(parents=True)
+    (folder / 'package.json').write_text('{}')
+    (folder / 'blocks' / 'a.ice').write_text('a' * 100)
+
+    installed = scan(folder, 'iceK', '0.1.4', 'url')
+    assert installed.nametag == 'iceK-0.1.4'
+    assert (installed.files, installed.size) == (2, 102)
+
+    inventory = Inventory(tmp_path / 'inventory.db')
+    inventory.add(installed)
+    inventory.add(installed)
+    assert inventory.entries() == [installed]
+    assert inventory.get('iceK-0.1.4') == installed
+
+    inventory.remove('iceK-0.1.4')
+    assert inventory.entries() == []
+
+    inventory.replace([installed, installed._replace(nametag='iceK-main')])
+    assert [col.nametag for col in inventory.entries()] == [
+        'iceK-0.1.4', 'iceK-main'
+    ]
+
+
+def test_content_digest_zip(tmp_path):
+    archive = tmp_path / 'col.zip'
+    with zipfile.ZipFile(archive, 'w') as zip_ref:
+        zip_ref.writestr('package.json', '{}')
+        zip_ref.writestr('blocks/a.ice', 'a' * 100)
+        zip_ref.extractall(tmp_path / 'col')
+
+    with zipfile.ZipFile(archive) as zip_ref:
+        digest = content_digest(
+            (info.filename, (info.file_size, info.CRC))
+            for info in zip_ref.infolist()
+        )
+
+    assert scan(tmp_path / 'col', 'col', '', 'url').digest == digest
+
+
+def test_refresh_inventory(tmp_path, monkeypatch):
+    monkeypatch.setenv('HOME', str(tmp_path))
+    folders = Folders()
+    inventory = Inventory(folders.inventory)
+    for nametag in ('iceK-0.1.4', 'iceIO-main', '.iceFF.partial'):
+        (folders.collections / nametag).mkdir(parents=True)
+    cmd_ls.rescan_inventory(folders, inventory)
+    before = inventory.get('iceK-0.1.4')
+
+    # -- Removed by hand, and installed by Icestudio
+    (folders.collections / 'iceIO-main').rmdir()
+    (folders.collections / 'iceFF-0.1.0').mkdir()
+    cmd_ls.refresh_inventory(folders, inventory)
+
+    assert [(col.nametag, col.name) for col in inventory.entries()] == [
+        ('iceFF-0.1.0', 'iceFF'), ('iceK-0.1.4', 'iceK')
+    ]
+    assert inventory.get('iceK-0.1.4') == before
+
+
+def test_from_archive(tmp_path):
+    archive = tmp_path / 'col.zip'
+    with zipfile.ZipFile(archive, 'w') as zip_ref:
+        zip_ref.writestr('iceK-0.1.4/', '')
+        zip_ref.writestr('iceK-0.1.4/package.json', '{}')
+        zip_ref.writestr('iceK-0.1.4/blocks/a.ice', 'a' * 100)
+        zip_ref.extractall(tmp_path)
+        members = zip_ref.infolist()
+
+    installed = from_archive(members, 'iceK-0.1.4', 'iceK', '0.1.4', 'url')
+    scanned = scan(tmp_path / 'iceK-0.1.4', 'iceK', '0.1.4', 'url')
+    assert installed._replace(installed=0) == scanned._replace(installed=0)
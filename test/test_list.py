@@ -0,0 +1,41 @@
+import threading
+import time
+
+from icm.commands import cmd_list
+from icm.commons import store
+
+
+class Collection:
+    def __init__(self, slow):
+        self.slow = slow
+        self.release = threading.Event()
+
+    def package_url(self, name):
+        return name
+
+    def download_package(self, url):
+        if url == self.slow:
+            self.release.wait(5)
+        return {'version': '0.1.0', 'description': f'{url} desc'}
+
+
+def test_list_deadline(monkeypatch, capsys):
+    names = [f'col{i}' for i in range(10)]
+    monkeypatch.setitem(store.COLLECTIONS, 'stable', names)
+    collection = Collection(slow='col3')
+
+    packages = cmd_list.fetch_packages(collection, names, 4)
+    start = time.monotonic()
+    cmd_list.list_collections(
+        collection, 'stable', packages=packages, deadline=start + 0.5
+    )
+    assert time.monotonic() - start < 2
+    collection.release.set()
+
+    rows = [
+        line.split()[1:3] for line in capsys.readouterr().out.splitlines()
+        if line.startswith('•')
+    ]
+    assert [row[0] for row in rows] == names
+    assert rows[3] == ['col3', 'xxx']
+    assert all(row[1] == '0.1.0' for i, row in enumerate(rows) if i != 3)
@@ -0,0 +1,58 @@
+import json
+import zipfile
+
+import pytest
+
+from icm.commands.cmd_lock import (
+    LockEntry,
+    read_lock,
+    read_requirements,
+    sync_job,
+    write_lock,
+)
+from icm.commons import commons
+from icm.commons.cache import ArchiveCache
+
+
+def test_read_requirements(tmp_path):
+    requirements = tmp_path / 'collections.txt'
+    requirements.write_text('# Basic\niceK@0.1.4\n\niceIO  # latest\n')
+    assert read_requirements(requirements) == ['iceK@0.1.4', 'iceIO']
+
+
+def test_lock_file(tmp_path):
+    lock_file = tmp_path / 'icm.lock'
+    entries = [
+        LockEntry('iceK', '0.1.4', 'url1', 'a' * 64, 100),
+        LockEntry('iceBoards', '', 'url2', 'b' * 64, 200),
+    ]
+    write_lock(lock_file, entries)
+    assert read_lock(lock_file) == entries
+    assert entries[0].archive == 'a' * 64 + '.zip'
+
+
+def test_lock_format(tmp_path):
+    lock_file = tmp_path / 'icm.lock'
+    lock_file.write_text(json.dumps({'format': 99, 'collections': []}))
+    with pytest.raises(SystemExit):
+        read_lock(lock_file)
+
+
+def test_sync_installed(tmp_path, monkeypatch):
+    monkeypatch.setenv('HOME', str(tmp_path))
+    folders = commons.Folders()
+    cache = ArchiveCache(folders.archives)
+    collection = commons.Collection(folders, progress=False, cache=cache)
+
+    archive = cache.tmpfile('col', 'tags/v1.0')
+    with zipfile.ZipFile(archive, 'w') as zip_file:
+        zip_file.writestr('col-1.0/blocks/a.ice', 'a')
+    cached = cache.store('col', 'tags/v1.0', 'url', archive)
+    entry = LockEntry('col', '1.0', 'url', cached.digest, cached.size)
+
+    assert sync_job(collection, entry).status == 'installed'
+    assert sync_job(collection, entry).status == 'exists'
+
+    # -- The installed files are not the locked ones
+    (folders.collections / 'col-1.0' / 'blocks' / 'a.ice').write_text('b')
+    assert sync_job(collection, entry).status == 'error'
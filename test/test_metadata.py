@@ -0,0 +1,69 @@
+import requests
+
+from icm.commons.commons import Collection, Folders
+from icm.commons.metadata import MetadataCache
+
+
+class Response:
+    def __init__(self, status_code, package=None):
+        self.status_code = status_code
+        self.package = package
+        self.headers = {'ETag': '"v1"'}
+
+    def json(self):
+        return self.package
+
+
+class Transport:
+    def __init__(self):
+        self.requests = []
+        self.response = Response(200, {'version': '0.1.4'})
+
+    def get(self, url, **kwargs):
+        self.requests.append(kwargs.get('headers', {}))
+        if isinstance(self.response, Exception):
+            raise self.response
+        return self.response
+
+
+def make_collection(tmp_path, ttl):
+    transport = Transport()
+    collection = Collection(
+        Folders(),
+        transport=transport,
+        metadata=MetadataCache(tmp_path, ttl),
+    )
+    return collection, transport
+
+
+def test_package_ttl(tmp_path):
+    collection, transport = make_collection(tmp_path, 600)
+
+    assert collection.download_package('url') == {'version': '0.1.4'}
+    assert collection.download_package('url') == {'version': '0.1.4'}
+    assert transport.requests == [{}]
+
+
+def test_package_revalidate(tmp_path):
+    collection, transport = make_collection(tmp_path, 0)
+
+    collection.download_package('url')
+    transport.response = Response(304)
+    assert collection.download_package('url') == {'version': '0.1.4'}
+    assert transport.requests[1] == {'If-None-Match': '"v1"'}
+
+    transport.response = requests.exceptions.ConnectionError()
+    assert collection.download_package('url') == {'version': '0.1.4'}
+
+
+def test_package_offline(tmp_path):
+    collection, transport = make_collection(tmp_path, 0)
+    collection.offline = True
+
+    assert collection.download_package('url') is None
+
+    collection.offline = False
+    collection.download_package('url')
+    collection.offline = True
+    assert collection.download_package('url') == {'version': '0.1.4'}
+    assert len(transport.requests) == 1
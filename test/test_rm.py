@@ -0,0 +1,26 @@
+from icm.commands import cmd_rm
+from icm.commons import commons
+from icm.commons.inventory import Installed, Inventory
+
+
+def test_rm_disk(tmp_path, monkeypatch, capsys):
+    monkeypatch.setenv('HOME', str(tmp_path))
+    folders = commons.Folders()
+    collection = commons.Collection(folders)
+    inventory = Inventory(folders.inventory)
+
+    # -- iceK removed by hand, iceIO installed by Icestudio (not in the
+    # -- inventory)
+    inventory.add(Installed('iceK-0.1.4', 'iceK', '0.1.4', '', 0, 0, 0, ''))
+    (folders.collections / 'iceIO-0.1.2').mkdir(parents=True)
+
+    cmd_rm.rm_collection(collection, folders, 'iceK', yes=True)
+    assert 'iceK-0.1.4 not found' in capsys.readouterr().out
+    assert inventory.entries() == []
+
+    cmd_rm.rm_collection(collection, folders, 'ice*', yes=True)
+    assert 'iceIO-0.1.2 removed' in capsys.readouterr().out
+    assert not (folders.collections / 'iceIO-0.1.2').exists()
+
+    cmd_rm.rm_collection(collection, folders, 'iceIO', yes=True)
+    assert 'No such collection' in capsys.readouterr().out
@@ -0,0 +1,48 @@
+import os
+
+from icm.commons.search import SearchIndex
+
+
+def make_block(path, description):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(
+        '{"package": {"name": "Block", "description": "%s"}}' % description
+    )
+
+
+def test_search(tmp_path):
+    root = tmp_path / 'iceK-0.1.4'
+    make_block(root / 'blocks' / 'Logic' / 'and.ice', 'AND logic gate')
+    make_block(root / 'blocks' / 'Logic' / 'or.ice', 'OR logic gate')
+    make_block(root / 'blocks' / 'ice-build' / 'and.ice', 'Build file')
+    make_block(root / 'examples' / 'debouncer.ice', 'Debounce a button')
+
+    index = SearchIndex(tmp_path / 'search.json')
+    assert index.update([root]) == (3, 0)
+    index.save()
+
+    # -- Prefix search. The file name weighs more than the texts
+    matches = index.search('deb')
+    assert [match.doc.path for match in matches] == ['examples/debouncer.ice']
+    assert matches[0].doc.text == 'Debounce a button'
+
+    # -- All the words must match
+    paths = [match.doc.path for match in index.search('logic AND')]
+    assert paths == ['blocks/Logic/and.ice']
+    assert len(index.search('gate')) == 2
+    assert len(index.search('gate', limit=1)) == 1
+    assert not index.search('build')
+
+    # -- Loaded from disk: only the modified files are read again
+    index = SearchIndex(tmp_path / 'search.json').load()
+    assert index.update([root]) == (0, 0)
+    make_block(root / 'blocks' / 'Logic' / 'or.ice', 'OR gate, no logic')
+    stat = os.stat(root / 'blocks' / 'Logic' / 'or.ice')
+    os.utime(
+        root / 'blocks' / 'Logic' / 'or.ice',
+        ns=(stat.st_atime_ns, stat.st_mtime_ns + 1),
+    )
+    (root / 'examples' / 'debouncer.ice').unlink()
+    assert index.update([root]) == (1, 1)
+    assert not index.search('debouncer')
+    assert index.search('no')[0].doc.path == 'blocks/Logic/or.ice'
@@ -0,0 +1,39 @@
+import os
+
+from icm.commons.textcache import TextCache
+
+
+def test_text_cache(tmp_path):
+    path = tmp_path / 'cache.json'
+    first, second = tmp_path / 'a.ice', tmp_path / 'b.ice'
+    first.write_text('first')
+    second.write_text('second')
+
+    cache = TextCache(path).load()
+    assert cache.get(str(first)) is None
+    cache.put(str(first), ['A'])
+    cache.put(str(second), ['B'])
+    cache.save()
+
+    # -- Modified keeping its size and mtime: found by its digest, as it
+    # -- was modified just before the cache was written
+    mtime = first.stat().st_mtime_ns
+    first.write_text('FIRST')
+    os.utime(first, ns=(mtime, mtime))
+    cache = TextCache(path).load()
+    assert cache.get(str(first)) is None
+
+    # -- Same contents, different mtime: still cached (by its digest)
+    first.write_text('first')
+    os.utime(first, ns=(0, 10**9))
+    cache = TextCache(path).load()
+    assert cache.get(str(first)) == ['A']
+
+    # -- Only the files used are saved
+    cache.save()
+    assert list(TextCache(path).load().entries) == [str(first)]
+
+    # -- No cache file: nothing is cached
+    cache = TextCache()
+    cache.put(str(first), ['A'])
+    assert cache.get(str(first)) is None
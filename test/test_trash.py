@@ -0,0 +1,18 @@
+from icm.commons.trash import Trash
+
+
+def test_trash(tmp_path):
+    trash = Trash(tmp_path / 'trash')
+    assert trash.empty() == 0
+
+    for _ in range(2):
+        folder = tmp_path / 'iceK-0.1.4' / 'blocks'
+        folder.mkdir(parents=True)
+        (folder / 'a.ice').write_text('a')
+        moved = trash.move(tmp_path / 'iceK-0.1.4')
+        assert moved.parent == trash.folder
+        assert not (tmp_path / 'iceK-0.1.4').exists()
+
+    assert len(trash.items()) == 2
+    assert trash.empty() == 2
+    assert trash.items() == []
@@ -0,0 +1,116 @@
+import io
+import zipfile
+from pathlib import Path
+
+import pytest
+
+from icm.commons import unzip
+from icm.commons.unzip import StreamExtractor, extract_parallel
+
+
+class NonSeekable(io.RawIOBase):
+    """Write-only stream: zipfile adds data descriptors"""
+
+    def __init__(self):
+        self.data = bytearray()
+
+    def writable(self):
+        return True
+
+    def write(self, b):
+        self.data += b
+        return len(b)
+
+
+def make_zip(seekable, method):
+    out = io.BytesIO() if seekable else NonSeekable()
+    with zipfile.ZipFile(out, 'w', method) as zip_ref:
+        zip_ref.writestr('col-1.0/', '')
+        zip_ref.writestr('col-1.0/package.json', '{"name": "col"}')
+        for i in range(20):
+            zip_ref.writestr(f'col-1.0/blocks/b{i}.ice', 'x' * 1000 * i)
+        with zip_ref.open('col-1.0/big.bin', 'w') as member:
+            member.write(bytes(range(256)) * 2000)
+    return bytes(out.getvalue() if seekable else out.data)
+
+
+def tree(folder):
+    return {
+        str(path.relative_to(folder)): path.read_bytes()
+        for path in folder.rglob('*') if path.is_file()
+    }
+
+
+@pytest.mark.parametrize('seekable', [True, False])
+@pytest.mark.parametrize('method', [zipfile.ZIP_DEFLATED, zipfile.ZIP_STORED])
+def test_stream_extract(tmp_path, seekable, method):
+    data = make_zip(seekable, method)
+
+    expected = tmp_path / 'expected'
+    with zipfile.ZipFile(io.BytesIO(data)) as zip_ref:
+        zip_ref.extractall(expected)
+
+    dest = tmp_path / 'dest'
+    extractor = StreamExtractor(dest, io.BytesIO())
+    for pos in range(0, len(data), 777):
+        extractor.feed(data[pos:pos + 777])
+    assert extractor.finish() == 23
+
+    assert tree(dest) == tree(expected)
+    assert Path(dest, 'col-1.0', 'blocks').is_dir()
+
+
+def test_stream_extract_truncated(tmp_path):
+    data = make_zip(True, zipfile.ZIP_DEFLATED)
+
+    extractor = StreamExtractor(tmp_path, io.BytesIO())
+    extractor.feed(data[:len(data) // 2])
+    with pytest.raises(zipfile.BadZipFile):
+        extractor.finish()
+
+
+@pytest.mark.parametrize('method', [zipfile.ZIP_DEFLATED, zipfile.ZIP_STORED])
+def test_extract_parallel(tmp_path, method):
+    zip_file = tmp_path / 'col.zip'
+    zip_file.write_bytes(make_zip(True, method))
+
+    expected = tmp_path / 'expected'
+    with zipfile.ZipFile(zip_file) as zip_ref:
+        zip_ref.extractall(expected)
+
+    done = []
+    dest = tmp_path / 'dest'
+    extract_parallel(zip_file, dest, 4, done.append)
+
+    assert sum(done) == 23
+    assert tree(dest) == tree(expected)
+
+
+@pytest.mark.parametrize('atomic', [True, False])
+def test_exchange(tmp_path, monkeypatch, atomic):
+    if not atomic:
+        monkeypatch.setattr(unzip, '_rename_exchange', lambda src, dst: False)
+
+    dest = tmp_path / 'iceK-main'
+    (dest / 'blocks').mkdir(parents=True)
+    (dest / 'blocks' / 'old.ice').write_text('old')
+    new = tmp_path / '.new'
+    new.mkdir()
+    (new / 'new.ice').write_text('new')
+
+    unzip.exchange(new, dest)
+    assert [p.name for p in tmp_path.iterdir()] == ['iceK-main']
+    assert tree(dest) == {'new.ice': b'new'}
+
+
+def test_staging_replace(tmp_path):
+    dest = tmp_path / 'collections'
+    (dest / 'iceK-main').mkdir(parents=True)
+    (dest / 'iceK-main' / 'deleted.ice').write_text('old')
+
+    with unzip.staging(dest) as folder:
+        (folder / 'iceK-main').mkdir()
+        (folder / 'iceK-main' / 'new.ice').write_text('new')
+
+    assert [p.name for p in dest.iterdir()] == ['iceK-main']
+    assert tree(dest) == {'iceK-main/new.ice': b'new'}
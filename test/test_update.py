@@ -1,8 +1,131 @@
+import json
+import os
+
 from icm.__main__ import create, update
+from icm.commands import cmd_update
+from icm.commons.collection import walk
+from icm.commons.textcache import CACHE_FILE, TextCache
 
 
 def test_create(clirunner, validate_cliresult):
     with clirunner.isolated_filesystem():
         clirunner.invoke(create)
-        result = clirunner.invoke(update)
+        result = clirunner.invoke(update, input='y\ny\n')
         validate_cliresult(result)
+        assert 'not updated' not in result.output
+
+
+def test_find_texts(tmp_path):
+    block = '{"description": "%s", "info": "%s",\n"readonly": true}'
+    (tmp_path / 'Logic' / 'ice-build').mkdir(parents=True)
+    (tmp_path / 'Logic' / 'and.ice').write_text(block % ('AND gate', 'Logic'))
+    (tmp_path / 'Logic' / 'or.ice').write_text(block % ('OR gate', 'AND gate'))
+    (tmp_path / 'Logic' / 'ice-build' / 'x.ice').write_text(block % ('X', 'Y'))
+    (tmp_path / 'Logic' / 'Logic').mkdir()
+    (tmp_path / 'Logic' / 'Logic' / 'and.ice').write_text(
+        block % ('AND gate', 'and')
+    )
+    (tmp_path / 'or.ice').write_text(block % ('Top', 'Top'))
+
+    # -- The folder and file names are always added (even if they are
+    # -- repeated). The texts, only once
+    translations = []
+    cmd_update._find_texts(walk(str(tmp_path)), translations)
+    assert translations == [
+        'Logic', 'or', 'Top', 'Logic', 'and', 'AND gate', 'or', 'OR gate',
+        'and'
+    ]
+
+
+def test_find_texts_jobs(tmp_path, monkeypatch):
+    for i in range(20):
+        folder = tmp_path / f'Group{i % 3}'
+        folder.mkdir(exist_ok=True)
+        (folder / f'b{i}.ice').write_text('{"description": "B%d"}' % (i % 7))
+
+    serial = []
+    cmd_update._find_texts(walk(str(tmp_path)), serial)
+
+    # -- Read by a pool of processes: the same texts in the same order
+    monkeypatch.setattr(cmd_update, 'FILES_PER_JOB', 1)
+    parallel = []
+    cmd_update._find_texts(walk(str(tmp_path)), parallel, jobs=3)
+    assert parallel == serial
+
+
+def test_find_texts_cache(tmp_path, monkeypatch):
+    blocks = tmp_path / 'blocks'
+    blocks.mkdir()
+    for i in range(3):
+        (blocks / f'b{i}.ice').write_text('{"description": "B%d"}' % i)
+
+    read = []
+    monkeypatch.setattr(
+        cmd_update, 'read_texts', lambda path: read.append(path) or ['T']
+    )
+    cache = TextCache(tmp_path / 'cache.json').load()
+    cold = []
+    cmd_update._find_texts(walk(str(blocks)), cold, cache=cache)
+    cache.save()
+    assert len(read) == 3
+
+    # -- Only the modified file is read again
+    (blocks / 'b1.ice').write_text('{"description": "XX"}')
+    read.clear()
+    warm = []
+    cache = TextCache(tmp_path / 'cache.json').load()
+    cmd_update._find_texts(walk(str(blocks)), warm, cache=cache)
+    assert read == [str(blocks / 'b1.ice')]
+    assert warm == cold
+
+
+def test_watch_session(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / 'blocks' / 'Logic').mkdir(parents=True)
+    (tmp_path / 'blocks' / 'Logic' / 'and.ice').write_text(
+        '{"description": "AND gate"}'
+    )
+    package = {
+        'name': 'Test', 'version': '0.1.0', 'description': 'Collection',
+        'keywords': '', 'license': 'GPL-2.0',
+    }
+    (tmp_path / 'package.json').write_text(json.dumps(package))
+    cmd_update.update(write='always')
+
+    model = cmd_update.scan_collection()
+    cache = TextCache(tmp_path / CACHE_FILE).load()
+    sections = cmd_update._readme_sections(model, cache)
+    session = cmd_update._WatchSession(model, cache, sections, 1, 'always')
+
+    # -- Only the changed .ice file is read again
+    read = []
+    texts = cmd_update.read_texts
+    monkeypatch.setattr(
+        cmd_update, 'read_texts', lambda path: read.append(path) or texts(path)
+    )
+    (tmp_path / 'blocks' / 'Logic' / 'or.ice').write_text(
+        '{"description": "OR gate"}'
+    )
+    session.refresh({'blocks/Logic/or.ice'})
+    assert read == [os.path.join('blocks', 'Logic', 'or.ice')]
+    assert '* or' in (tmp_path / 'README.md').read_text()
+    assert "gettext('OR gate');" in (
+        tmp_path / 'locale' / 'translation.js'
+    ).read_text()
+
+    # -- The generated files are ignored. Not valid JSON: nothing changes
+    session.refresh({'README.md', 'locale/translation.js'})
+    (tmp_path / 'package.json').write_text('{')
+    session.refresh({'package.json'})
+    assert session.model.package['name'] == 'Test'
+
+    package['name'] = 'Renamed'
+    (tmp_path / 'package.json').write_text(json.dumps(package))
+    session.refresh({'package.json'})
+    readme = (tmp_path / 'README.md').read_text()
+    assert '# Renamed Collection' in readme and '* or' in readme
+    assert read == [os.path.join('blocks', 'Logic', 'or.ice')]
+
+    # -- The texts not read again are kept in the cache
+    cached = TextCache(tmp_path / CACHE_FILE).load().entries
+    assert os.path.join('blocks', 'Logic', 'and.ice') in cached
@@ -0,0 +1,41 @@
+import zipfile
+
+from icm.commands.cmd_upgrade import upgrade_tree
+
+
+def make_zip(path, files):
+    with zipfile.ZipFile(path, 'w', zipfile.ZIP_DEFLATED) as zip_ref:
+        zip_ref.writestr('iceK-main/', '')
+        for name, data in files.items():
+            zip_ref.writestr(f'iceK-main/{name}', data)
+
+
+def test_upgrade_tree(tmp_path):
+    installed = tmp_path / 'iceK-main'
+    (installed / 'blocks').mkdir(parents=True)
+    (installed / 'blocks' / 'same.ice').write_text('same')
+    (installed / 'blocks' / 'changed.ice').write_text('old')
+    (installed / 'removed.ice').write_text('removed')
+    same_inode = (installed / 'blocks' / 'same.ice').stat().st_ino
+
+    archive = tmp_path / 'main.zip'
+    make_zip(archive, {
+        'blocks/same.ice': 'same',
+        'blocks/changed.ice': 'new',
+        'added/new.ice': 'added',
+    })
+    manifest = tmp_path / 'manifest.json'
+
+    changes = upgrade_tree(archive, installed, manifest)
+    assert changes.added == ['added/new.ice']
+    assert changes.changed == ['blocks/changed.ice']
+    assert changes.removed == ['removed.ice']
+    assert changes.unchanged == ['blocks/same.ice']
+
+    assert (installed / 'blocks' / 'changed.ice').read_text() == 'new'
+    assert (installed / 'added' / 'new.ice').read_text() == 'added'
+    assert not (installed / 'removed.ice').exists()
+    assert (installed / 'blocks' / 'same.ice').stat().st_ino == same_inode
+    assert [p.name for p in tmp_path.iterdir() if p.name.startswith('.')] == []
+
+    assert upgrade_tree(archive, installed, manifest).empty
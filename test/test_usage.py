@@ -0,0 +1,48 @@
+import os
+
+from icm.commons.usage import UsageCache, disk_usage
+
+
+def make_collection(folder):
+    (folder / 'blocks' / 'ice-build' / 'top').mkdir(parents=True)
+    (folder / 'package.json').write_text('{}')
+    (folder / 'blocks' / 'a.ice').write_text('a' * 100)
+    (folder / 'blocks' / 'ice-build' / 'top' / 'hw.bin').write_text('b' * 50)
+
+
+def test_disk_usage(tmp_path):
+    make_collection(tmp_path / 'iceK-0.1.4')
+    make_collection(tmp_path / 'iceIO-0.1.0')
+    (tmp_path / 'iceIO-0.1.0' / 'more.ice').write_text('c' * 1000)
+    cache = UsageCache(tmp_path / 'usage.json')
+    collections = [tmp_path / 'iceK-0.1.4', tmp_path / 'iceIO-0.1.0']
+
+    first = disk_usage(collections, cache)
+    assert [usage.nametag for usage in first] == ['iceIO-0.1.0', 'iceK-0.1.4']
+    assert first[1].totals == (152, 3, 1, 50, 1)
+    assert first[1].subfolders == [('blocks', 150)]
+
+    # -- Cached: the same result
+    assert disk_usage(collections, cache) == first
+
+    # -- Only one collection: the cache of the other one is kept
+    disk_usage(collections[:1], cache)
+    assert str(collections[1]) in cache.load()
+
+    # -- New file: the folder mtime changes
+    (tmp_path / 'iceK-0.1.4' / 'blocks' / 'b.ice').write_text('b')
+    stat = os.stat(tmp_path / 'iceK-0.1.4' / 'blocks')
+    os.utime(
+        tmp_path / 'iceK-0.1.4' / 'blocks',
+        ns=(stat.st_atime_ns, stat.st_mtime_ns + 1),
+    )
+    usage = disk_usage(collections[:1], cache)[0]
+    assert usage.totals == (153, 4, 2, 50, 1)
+
+    # -- File rewritten in place: the folder mtime does not change
+    blocks = tmp_path / 'iceK-0.1.4' / 'blocks'
+    stat = os.stat(blocks)
+    (blocks / 'a.ice').write_text('a' * 300)
+    os.utime(blocks, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+    usage = disk_usage(collections[:1], cache)[0]
+    assert usage.totals == (353, 4, 2, 50, 1)
@@ -0,0 +1,38 @@
+import pytest
+
+from icm.commons import watch
+from icm.commons.watch import InotifyWatcher, PollingWatcher
+
+
+def watchers():
+    yield PollingWatcher
+    try:
+        InotifyWatcher('.', (), ()).close()
+        yield InotifyWatcher
+    except OSError:
+        pass
+
+
+@pytest.mark.parametrize('kind', list(watchers()))
+def test_watcher(tmp_path, monkeypatch, kind):
+    monkeypatch.setattr(watch, 'POLL_INTERVAL', 0.05)
+    monkeypatch.setattr(watch, 'DEBOUNCE', 0.1)
+    (tmp_path / 'blocks').mkdir()
+    (tmp_path / 'package.json').write_text('{}')
+
+    files = kind(str(tmp_path), ('blocks', 'examples'), ('package.json',))
+    assert files.wait(0.1) == set()
+
+    # -- A burst of changes is returned at once
+    (tmp_path / 'blocks' / 'Logic').mkdir()
+    (tmp_path / 'blocks' / 'Logic' / 'and.ice').write_text('{}')
+    (tmp_path / 'package.json').write_text('{"name": "X"}')
+    (tmp_path / 'README.md').write_text('Not watched')
+    changed = files.wait(2)
+    assert {'blocks/Logic', 'package.json'} <= changed
+    assert 'README.md' not in changed
+
+    # -- The new folders are watched too
+    (tmp_path / 'blocks' / 'Logic' / 'and.ice').write_text('{"a": 1}')
+    assert 'blocks/Logic/and.ice' in files.wait(2)
+    files.close()